@@ -0,0 +1,84 @@
+'''
+Checkpointing benchmark: the cost of persisting an agent after each change in a long run, by re-saving it
+in full (Agent.save) vs journaling just the change (Agent.enable_journal).
+
+Agents hold a chain of N executed actions; each checkpoint follows one node update (as when an action finishes).
+Full saves are timed over a bounded sample (--ops / --budget) since each one scales with graph size.
+
+Usage:
+    python benchmarks/checkpoint_bench.py run --sizes 1000,10000 --out baseline.json
+    python benchmarks/checkpoint_bench.py compare baseline.json current.json
+'''
+import os
+import tempfile
+
+from common import Results, bounded, main
+
+from langur.agent import Agent
+from langur.connector import Connector, action
+from langur.llm import LLMConfig
+
+
+class BenchConnector(Connector):
+    @action
+    def noop(self, x: int):
+        '''Do nothing'''
+        return x
+
+
+def build_agent(size: int) -> Agent:
+    connector = BenchConnector()
+    agent = Agent(workers=[connector], llm_config=LLMConfig(provider="anthropic", options={}))
+    action_type = next(iter(connector.get_action_node_types()))
+    for i in range(size):
+        agent.cg.add_node(action_type(id=f"a{i}", inputs={"x": i}, purpose="Benchmark action", connector_id=connector.id, output=f"Output {i}"))
+        if i > 0:
+            agent.cg.add_edge_by_ids(f"a{i - 1}", "dependency", f"a{i}")
+    return agent
+
+
+def bench_size(results: Results, size: int, args, tmp_dir: str):
+    agent = build_agent(size)
+    updates = range(min(args.ops, size))
+
+    path = os.path.join(tmp_dir, f"save_{size}.json")
+    with results.measure(f"{size}/save", ops=len(updates)) as result:
+        result["ops"] = 0
+        for i in bounded(updates, args.budget):
+            agent.cg.query_node_by_id(f"a{i}").output = f"Updated {i}"
+            agent.save(path)
+            result["ops"] += 1
+    result["file_bytes"] = os.path.getsize(path)
+
+    path = os.path.join(tmp_dir, f"journal_{size}.json")
+    with results.measure(f"{size}/journal_enable", ops=1):
+        journal = agent.enable_journal(path, compact_every=args.compact_every, sync=args.sync)
+    with results.measure(f"{size}/journal", ops=len(updates)) as result:
+        for i in updates:
+            agent.cg.query_node_by_id(f"a{i}").output = f"Journaled {i}"
+    journal.close()
+    result["journal_bytes"] = os.path.getsize(path + ".journal")
+
+    with results.measure(f"{size}/load_journal", ops=1):
+        Agent.load_journal(path, resume=False)
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = Results("checkpoint", memory=False, sizes=sizes, ops=args.ops, budget=args.budget, compact_every=args.compact_every, sync=args.sync)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            bench_size(results, size, args, tmp_dir)
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="1000,10000", help="Comma separated numbers of actions in the graph")
+    parser.add_argument("--ops", type=int, default=1000, help="Max checkpoints per size")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds before sampled operations stop early")
+    parser.add_argument("--compact-every", type=int, default=10000)
+    parser.add_argument("--sync", action="store_true", help="fsync every journal entry")
+
+if __name__ == "__main__":
+    main(run, add_run_args)
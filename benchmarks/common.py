@@ -0,0 +1,175 @@
+'''
+Shared helpers for the benchmark scripts: timing / peak memory measurement, saving results as a JSON baseline,
+comparing two result files, and the command line they all share.
+'''
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bounded(items, seconds: Optional[float]):
+    '''Iterate over items until `seconds` have passed (or all of them, if None), so slow sampled benchmarks still finish.'''
+    deadline = time.perf_counter() + seconds if seconds else None
+    for i, item in enumerate(items):
+        if deadline is not None and i > 0 and time.perf_counter() > deadline:
+            return
+        yield item
+
+
+class Results:
+    def __init__(self, suite: str, **meta):
+        self.suite = suite
+        self.meta = {
+            "suite": suite,
+            "time": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            **meta
+        }
+        self.results: dict[str, dict] = {}
+
+    @contextmanager
+    def measure(self, name: str, ops: int = 1, memory: bool = True):
+        '''
+        Time the body as a benchmark doing `ops` operations, tracking peak memory allocated within it if memory is enabled
+        (tracemalloc should already be running, see start_memory_tracking).
+        Yields the result dict, which extra fields can be added to (including updating ops, if fewer were done).
+        '''
+        result = {"ops": ops}
+        if memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield result
+        elapsed = time.perf_counter() - start
+        result["seconds"] = elapsed
+        result["per_op_us"] = elapsed / max(result["ops"], 1) * 1e6
+        if memory and tracemalloc.is_tracing():
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1] - base
+        self.results[name] = result
+        print(f"{name:<48} {format_seconds(elapsed):>10} {format_seconds(result['per_op_us'] / 1e6):>10}/op {format_bytes(result.get('peak_bytes')):>10} peak")
+
+    def add(self, name: str, seconds: float, ops: int = 1, **extra):
+        '''Add a result measured some other way (e.g. in a subprocess)'''
+        self.results[name] = {"ops": ops, "seconds": seconds, "per_op_us": seconds / max(ops, 1) * 1e6, **extra}
+        print(f"{name:<48} {format_seconds(seconds):>10} {format_seconds(seconds / max(ops, 1)):>10}/op")
+
+    def to_json(self) -> dict:
+        return {"meta": self.meta, "results": self.results}
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+        print(f"Saved {len(self.results)} results to {path}")
+
+
+def start_memory_tracking():
+    '''
+    Memory is measured with tracemalloc, which slows down allocation heavy code considerably -
+    only compare timings between runs which both did (or both didn't) track memory.
+    '''
+    tracemalloc.start()
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.2f}us"
+
+
+def format_bytes(n: Optional[int]) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def compare(baseline_path: str, current_path: str, threshold: float = 0.1, metric: str = "per_op_us") -> bool:
+    '''
+    Print a comparison of two result files. Returns False if anything regressed by more than threshold
+    (as a fraction, e.g. 0.1 for 10% slower / more memory).
+    '''
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+
+    for key in ("suite", "memory"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"WARNING: results differ in {key} ({baseline['meta'].get(key)} vs {current['meta'].get(key)}), comparison may not be meaningful")
+
+    ok = True
+    print(f"{'benchmark':<48} {'baseline':>10} {'current':>10} {'change':>8}   {'peak mem change':>15}")
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            print(f"{name:<48} {'(missing from current)':>30}")
+            continue
+        if metric not in base or metric not in cur:
+            print(f"{name:<48} {'(failed: ' + cur.get('error', base.get('error', '?'))[:40] + ')':>30}")
+            continue
+        change = cur[metric] / base[metric] - 1 if base[metric] else 0.0
+        mem_change = None
+        if base.get("peak_bytes") and cur.get("peak_bytes") is not None:
+            mem_change = cur["peak_bytes"] / base["peak_bytes"] - 1
+        flag = ""
+        if change > threshold or (mem_change is not None and mem_change > threshold):
+            flag = "  REGRESSION"
+            ok = False
+        elif change < -threshold:
+            flag = "  improved"
+        mem = f"{mem_change:+.1%}" if mem_change is not None else "-"
+        print(f"{name:<48} {format_seconds(base[metric] / 1e6):>10} {format_seconds(cur[metric] / 1e6):>10} {change:>+8.1%}   {mem:>15}{flag}")
+    for name in current["results"].keys() - baseline["results"].keys():
+        print(f"{name:<48} {'(new)':>30}")
+    return ok
+
+
+def main(run: Callable, add_run_args: Callable, run_help: str = "Run benchmarks", commands: dict[str, tuple[Callable, Callable]] = None):
+    '''
+    Command line of a benchmark script, with its module docstring as the description:
+    `run` (with the flags add_run_args adds to its parser, and --out) and `compare`.
+
+    Args:
+        commands: Other commands (e.g. for subprocesses), as name -> (function adding its flags, function run with the args).
+    '''
+    parser = argparse.ArgumentParser(description=sys.modules[run.__module__].__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help=run_help)
+    add_run_args(run_parser)
+    run_parser.add_argument("--out", help="Save results as JSON")
+
+    handlers = {"run": run}
+    for name, (add_args, handler) in (commands or {}).items():
+        add_args(subparsers.add_parser(name))
+        handlers[name] = handler
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(0 if compare(args.baseline, args.current, args.threshold) else 1)
+    handlers[args.command](args)
@@ -0,0 +1,108 @@
+'''
+Graph compaction benchmark: memory held by a long running agent's graph before and after compact_graph, and the
+cost of the queries and saves that keep paying for finished work.
+
+The graph is --size actions in chains of --chain-length, each chain achieving one task node, with outputs of
+--output-bytes. The last --pending fraction of chains are left unexecuted (and so are kept by compaction).
+
+Usage:
+    python benchmarks/compaction_bench.py run --sizes 5000,20000 --out baseline.json
+    python benchmarks/compaction_bench.py compare baseline.json current.json
+'''
+import gc
+import os
+import random
+import string
+import tempfile
+import tracemalloc
+
+from common import Results, format_bytes, main
+
+from langur.actions import ActionNode
+from langur.agent import Agent
+from langur.connector import Connector, action
+from langur.llm import LLMConfig
+from langur.workers.task import TaskNode
+
+
+class BenchConnector(Connector):
+    @action
+    def read(self, path: str):
+        '''Read a file'''
+        return path
+
+
+def build_agent(size: int, args, rng: random.Random) -> Agent:
+    connector = BenchConnector()
+    agent = Agent(workers=[connector], llm_config=LLMConfig(provider="anthropic", options={}))
+    cg = agent.cg
+    action_type = next(iter(connector.get_action_node_types()))
+    cg.add_node(TaskNode(id="task", task="Read everything"))
+    chains = size // args.chain_length
+    pending_from = chains - int(chains * args.pending)
+    for chain in range(chains):
+        for i in range(args.chain_length):
+            node_id = f"c{chain}-{i}"
+            # Unique outputs, as they would be in practice
+            output = None if chain >= pending_from else "".join(rng.choices(string.ascii_lowercase, k=args.output_bytes))
+            cg.add_node(action_type(id=node_id, inputs={"path": f"file_{node_id}"}, purpose="Read a file", connector_id=connector.id, output=output))
+            if i > 0:
+                cg.add_edge_by_ids(f"c{chain}-{i - 1}", "dependency", node_id)
+        cg.add_edge_by_ids(f"c{chain}-{args.chain_length - 1}", "achieves", "task")
+    return agent
+
+
+def bench_queries(results: Results, prefix: str, agent: Agent, tmp_dir: str):
+    with results.measure(f"{prefix}/query_nodes_by_type", memory=False):
+        agent.cg.query_nodes_by_type(ActionNode)
+    path = os.path.join(tmp_dir, "agent.json")
+    with results.measure(f"{prefix}/save", memory=False) as result:
+        agent.save(path)
+    result["file_bytes"] = os.path.getsize(path)
+    print(f"{'':<48} {format_bytes(result['file_bytes'])} file")
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = Results(
+        "compaction", memory=False, sizes=sizes, chain_length=args.chain_length, pending=args.pending,
+        output_bytes=args.output_bytes, archive=args.archive, seed=args.seed
+    )
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            gc.collect()
+            base = tracemalloc.get_traced_memory()[0]
+            with results.measure(f"{size}/build", ops=size, memory=False) as result:
+                agent = build_agent(size, args, random.Random(args.seed))
+            gc.collect()
+            result.update(nodes=agent.cg.node_count(), retained_bytes=tracemalloc.get_traced_memory()[0] - base)
+            print(f"{'':<48} {result['nodes']} nodes, {format_bytes(result['retained_bytes'])} retained")
+            bench_queries(results, f"{size}/before", agent, tmp_dir)
+
+            archive = os.path.join(tmp_dir, f"archive_{size}.jsonl") if args.archive else None
+            with results.measure(f"{size}/compact", ops=size, memory=False) as result:
+                report = agent.compact_graph(archive=archive)
+            gc.collect()
+            result.update(
+                nodes=agent.cg.node_count(), retained_bytes=tracemalloc.get_traced_memory()[0] - base,
+                compacted_actions=report.compacted_actions, compacted_bytes=report.compacted_bytes
+            )
+            print(f"{'':<48} {result['nodes']} nodes, {format_bytes(result['retained_bytes'])} retained")
+            bench_queries(results, f"{size}/after", agent, tmp_dir)
+            del agent
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="5000,20000", help="Comma separated numbers of actions")
+    parser.add_argument("--chain-length", type=int, default=5, help="Actions per chain")
+    parser.add_argument("--pending", type=float, default=0.05, help="Fraction of chains not executed yet")
+    parser.add_argument("--output-bytes", type=int, default=1000, help="Length of each executed action's output")
+    parser.add_argument("--archive", action="store_true", help="Archive compacted actions to a file")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
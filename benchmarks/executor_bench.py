@@ -0,0 +1,215 @@
+'''
+End-to-end throughput benchmark for ExecutorWorker: how many actions per second can be driven through Agent.run
+when the actions themselves are instantaneous, and how that changes with plan width and depth.
+
+Plans are generated as layered DAGs (WIDTHxDEPTH: DEPTH layers of WIDTH actions, each depending on --fanin
+actions from the previous layer) and injected straight into the graph, so no planning LLM calls are made.
+Any inputs left unbound (--unbound) are filled by a stubbed FillParams, either in-process ("stub") or
+through BAML against the fake LLM server ("server", which includes BAML's own overhead).
+
+Usage:
+    python benchmarks/executor_bench.py run --plans 1000x1,100x10,10x100 --out baseline.json
+    python benchmarks/executor_bench.py compare baseline.json current.json
+
+The per-op time of each "<plan>/<action mode>/run" result is the scheduling overhead per action.
+'''
+import asyncio
+import logging
+import random
+import sys
+import time
+
+from common import Results, main
+
+from langur.agent import Agent
+from langur.connector import Connector, action
+from langur.graph.graph import CognitionGraph
+from langur.llm import LLMClient, LLMConfig
+from langur.log import configure_logging
+from langur.workers.executor import ExecutorWorker
+
+DEFAULT_PLANS = "100x1,1000x1,10000x1,100000x1,10x10,100x10,100x100,1x100,1x500"
+
+
+class BenchConnector(Connector):
+    @action
+    def noop_sync(self, x: int):
+        '''Do nothing'''
+        return x
+
+    @action
+    async def noop_async(self, x: int):
+        '''Do nothing, asynchronously'''
+        return x
+
+
+class FilledParams:
+    def __init__(self, params: dict):
+        self.params = params
+
+    def model_dump(self) -> dict:
+        return self.params
+
+
+class StubLLMClient(LLMClient):
+    '''Answers FillParams instantly without going through BAML'''
+    def __init__(self, config: LLMConfig):
+        super().__init__(config)
+        self.calls = 0
+
+    async def call(self, function_name: str, args: dict, tb=None, worker=None, node_id: str = None, truncate: str = None):
+        if function_name != "FillParams":
+            raise NotImplementedError(f"Stub LLM can't answer {function_name}")
+        self.calls += 1
+        return FilledParams({name: 0 for name in args["needed_inputs"].split("\n")})
+
+
+class TimedExecutor(ExecutorWorker):
+    '''Records how long each action's execution (context building, filling params and the action itself) takes'''
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._durations = []
+        self._frontier_time = 0.0
+
+    def get_frontier(self):
+        start = time.perf_counter()
+        frontier = super().get_frontier()
+        self._frontier_time += time.perf_counter() - start
+        return frontier
+
+    async def execute_node(self, action_node):
+        start = time.perf_counter()
+        output = await super().execute_node(action_node)
+        self._durations.append(time.perf_counter() - start)
+        return output
+
+
+class CountingAgent(Agent):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cycle_durations = []
+
+    async def cycle(self):
+        start = time.perf_counter()
+        signals = await super().cycle()
+        self.cycle_durations.append(time.perf_counter() - start)
+        return signals
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def build_agent(width: int, depth: int, fanin: int, mode: str, unbound: float, fill: str, llm_config: LLMConfig, rng: random.Random) -> CountingAgent:
+    connector = BenchConnector()
+    executor = TimedExecutor()
+    workers = [connector, executor]
+    llm = StubLLMClient(llm_config) if fill == "stub" else LLMClient(llm_config)
+    cg = CognitionGraph(workers=workers, llm_config=llm_config, llm=llm)
+    agent = CountingAgent(workers=workers, llm_config=llm_config, cg=cg)
+
+    action_types = {typ.action_type_name(): typ for typ in connector.get_action_node_types()}
+    modes = ["noop_sync", "noop_async"] if mode == "mixed" else [f"noop_{mode}"]
+
+    previous = []
+    for layer in range(depth):
+        current = []
+        for i in range(width):
+            action_type = action_types[modes[(layer * width + i) % len(modes)]]
+            node = action_type(
+                id=f"a{layer}_{i}",
+                inputs={"x": None if rng.random() < unbound else i},
+                purpose="Benchmark action",
+                connector_id=connector.id
+            )
+            cg.add_node(node)
+            current.append(node)
+            for upstream in rng.sample(previous, min(fanin, len(previous))):
+                cg.add_edge_by_ids(upstream.id, "dependency", node.id)
+        previous = current
+    return agent
+
+
+def bench_plan(results: Results, plan: str, mode: str, args, llm_config: LLMConfig):
+    width, depth = (int(v) for v in plan.split("x"))
+    n = width * depth
+    name = f"{plan}/{mode}"
+    rng = random.Random(args.seed)
+
+    start = time.perf_counter()
+    agent = build_agent(width, depth, args.fanin, mode, args.unbound, args.fill, llm_config, rng)
+    build_seconds = time.perf_counter() - start
+
+    executor = agent.cg.query_workers(TimedExecutor).pop()
+    try:
+        with results.measure(f"{name}/run", ops=n, memory=False) as result:
+            asyncio.run(agent.run(until=None))
+    except Exception as e:
+        print(f"{name:<48} failed: {e!r}")
+        results.results[f"{name}/run"] = {"ops": n, "error": repr(e)}
+        return
+
+    durations = executor._durations
+    result.update({
+        "actions": len(durations),
+        "actions_per_second": len(durations) / result["seconds"] if result["seconds"] else 0.0,
+        "build_seconds": build_seconds,
+        "cycles": len(agent.cycle_durations),
+        "frontier_seconds": executor._frontier_time,
+        "cycle_p50_ms": percentile(agent.cycle_durations, 50) * 1e3,
+        "cycle_p99_ms": percentile(agent.cycle_durations, 99) * 1e3,
+        "action_p50_us": percentile(durations, 50) * 1e6,
+        "action_p95_us": percentile(durations, 95) * 1e6,
+        "action_p99_us": percentile(durations, 99) * 1e6,
+        "fill_params_calls": agent.cg.llm.calls if args.fill == "stub" else agent.usage.total.calls,
+    })
+    print(
+        f"{'':<48} {result['actions_per_second']:,.0f} actions/s, {result['cycles']} cycles "
+        f"(p50 {result['cycle_p50_ms']:.2f}ms, p99 {result['cycle_p99_ms']:.2f}ms), "
+        f"action p50/p95/p99 {result['action_p50_us']:.0f}/{result['action_p95_us']:.0f}/{result['action_p99_us']:.0f}us, "
+        f"frontier {result['frontier_seconds']:.2f}s"
+    )
+
+
+def run(args):
+    configure_logging(level=logging.WARNING)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), args.recursion_limit))
+    plans = args.plans.split(",")
+    modes = args.modes.split(",")
+    results = Results("executor", memory=False, plans=plans, modes=modes, fanin=args.fanin, unbound=args.unbound, fill=args.fill, seed=args.seed)
+
+    server = None
+    if args.fill == "server":
+        from langur.testing import FakeLLMServer
+        server = FakeLLMServer()
+        server.start_in_thread()
+        llm_config = server.llm_config()
+    else:
+        llm_config = LLMConfig(provider="anthropic", options={})
+
+    try:
+        for plan in plans:
+            for mode in modes:
+                bench_plan(results, plan, mode, args, llm_config)
+    finally:
+        if server is not None:
+            server.stop_thread()
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--plans", default=DEFAULT_PLANS, help="Comma separated WIDTHxDEPTH plan shapes")
+    parser.add_argument("--modes", default="sync,async", help="Comma separated action modes, from: sync, async, mixed")
+    parser.add_argument("--fanin", type=int, default=1, help="Dependencies per action on the previous layer. Context is rebuilt from all ancestors without memoization, so >1 gets exponentially slower with depth")
+    parser.add_argument("--unbound", type=float, default=0.0, help="Fraction of actions with inputs left for FillParams")
+    parser.add_argument("--fill", choices=["stub", "server"], default="stub", help="How FillParams is answered")
+    parser.add_argument("--recursion-limit", type=int, default=10000, help="Context building recurses once per ancestor, so deep plans need a higher limit")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
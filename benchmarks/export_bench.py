@@ -0,0 +1,101 @@
+'''
+Graph export benchmark: time, peak memory and file size of rendering / exporting a large plan in full detail
+(to_networkx + Sigma HTML, as save_graph_html did) vs streaming exports and level of detail options.
+
+The graph is --sizes actions in chains of --chain-length, with --tasks task nodes each achieved by an equal share
+of the chains, and outputs of --output-bytes for all but the last tenth of chains. Full detail HTML is only
+rendered for sizes up to --html-max, as it becomes unusable past that.
+
+Usage:
+    python benchmarks/export_bench.py run --sizes 10000,100000 --out baseline.json
+    python benchmarks/export_bench.py compare baseline.json current.json
+'''
+import os
+import random
+import string
+import tempfile
+
+from common import Results, format_bytes, main, start_memory_tracking
+
+from langur.connector import Connector, action
+from langur.graph.export import ExportOptions, export_graph
+from langur.graph.graph import CognitionGraph
+from langur.llm import LLMConfig
+from langur.workers.task import TaskNode
+
+
+class BenchConnector(Connector):
+    @action
+    def read(self, path: str):
+        '''Read a file'''
+        return path
+
+
+def build_graph(size: int, args, rng: random.Random) -> CognitionGraph:
+    connector = BenchConnector()
+    action_type = next(iter(connector.get_action_node_types()))
+    cg = CognitionGraph(workers=[connector], llm_config=LLMConfig(provider="anthropic", options={}))
+    for task in range(args.tasks):
+        cg.add_node(TaskNode(id=f"task{task}", task=f"Task {task}"))
+    chains = size // args.chain_length
+    output = "".join(rng.choices(string.ascii_lowercase, k=args.output_bytes))
+    for chain in range(chains):
+        for i in range(args.chain_length):
+            node_id = f"c{chain}-{i}"
+            cg.add_node(action_type(
+                id=node_id, inputs={"path": f"file_{node_id}"}, purpose="Read a file", connector_id=connector.id,
+                output=output if chain < chains * 9 // 10 else None
+            ))
+            if i > 0:
+                cg.add_edge_by_ids(f"c{chain}-{i - 1}", "dependency", node_id)
+        cg.add_edge_by_ids(f"c{chain}-{args.chain_length - 1}", "achieves", f"task{chain * args.tasks // chains}")
+    return cg
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = Results(
+        "export", memory=not args.no_memory, sizes=sizes, tasks=args.tasks, chain_length=args.chain_length,
+        output_bytes=args.output_bytes, seed=args.seed
+    )
+    if not args.no_memory:
+        start_memory_tracking()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            cg = build_graph(size, args, random.Random(args.seed))
+
+            def measure_file(name, path, fn):
+                with results.measure(f"{size}/{name}", ops=size, memory=not args.no_memory) as result:
+                    fn(path)
+                result["file_bytes"] = os.path.getsize(path)
+                print(f"{'':<48} {format_bytes(result['file_bytes'])} file")
+
+            if size <= args.html_max:
+                measure_file("html_full", os.path.join(tmp_dir, "full.html"), cg.save_graph_html)
+            for name, options in [
+                ("json_full", ExportOptions(max_attribute_chars=None)),
+                ("json", ExportOptions()),
+                ("graphml", ExportOptions()),
+                ("json_collapse_chains", ExportOptions(collapse_chains=True)),
+                ("json_cluster_task", ExportOptions(cluster_by="task")),
+            ]:
+                extension = "graphml" if name == "graphml" else "json"
+                measure_file(name, os.path.join(tmp_dir, f"{name}.{extension}"), lambda path: export_graph(cg, path, options=options))
+            measure_file("html_collapse_chains", os.path.join(tmp_dir, "chains.html"), lambda path: cg.save_graph_html(path, collapse_chains=True))
+            measure_file("html_cluster_task", os.path.join(tmp_dir, "clusters.html"), lambda path: cg.save_graph_html(path, cluster_by="task"))
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="10000,100000", help="Comma separated action counts")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--chain-length", type=int, default=10)
+    parser.add_argument("--output-bytes", type=int, default=2000)
+    parser.add_argument("--html-max", type=int, default=20000, help="Largest size to render in full detail HTML")
+    parser.add_argument("--no-memory", action="store_true", help="Don't track peak memory (faster, and timings aren't skewed by tracemalloc)")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
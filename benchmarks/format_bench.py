@@ -0,0 +1,95 @@
+'''
+Agent save format benchmark: file size, save / load time and peak memory of the JSON format vs the binary
+streaming format (langur.serialize), for agents with N executed actions whose outputs are --output-bytes long
+(e.g. file contents read by an action). With --distinct-outputs, actions share that many distinct outputs (as when
+the same files are read repeatedly), and with --blobs those are kept once in an in memory BlobStore.
+Binary saves are also loaded lazily (Agent.load(path, lazy=True)), reading back one action and its output.
+
+Usage:
+    python benchmarks/format_bench.py run --sizes 1000,5000 --output-bytes 4000 --out baseline.json
+    python benchmarks/format_bench.py compare baseline.json current.json
+'''
+import gc
+import os
+import random
+import string
+import tempfile
+
+from common import Results, format_bytes, main, start_memory_tracking
+
+from langur.agent import Agent
+from langur.blobs import BlobStore
+from langur.connector import Connector, action
+from langur.llm import LLMConfig
+
+FORMATS = ("json", "binary")
+
+
+class BenchConnector(Connector):
+    @action
+    def read(self, path: str):
+        '''Read a file'''
+        return path
+
+
+def build_agent(size: int, output_bytes: int, rng: random.Random, distinct_outputs: int = 0, blobs: bool = False) -> Agent:
+    connector = BenchConnector()
+    agent = Agent(workers=[connector], llm_config=LLMConfig(provider="anthropic", options={}), blobs=BlobStore() if blobs else None)
+    action_type = next(iter(connector.get_action_node_types()))
+    # Text-like outputs (words from a small vocabulary), so they compress about as well as real files
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(500)]
+    make_output = lambda: " ".join(rng.choices(words, k=output_bytes // 5))[:output_bytes]
+    pool = [make_output() for _ in range(distinct_outputs)]
+    for i in range(size):
+        output = rng.choice(pool) if pool else make_output()
+        output = agent.cg.store_output(output)
+        agent.cg.add_node(action_type(id=f"a{i}", inputs={"path": f"file_{i}.txt"}, purpose="Read a file", connector_id=connector.id, output=output))
+        if i > 0:
+            agent.cg.add_edge_by_ids(f"a{rng.randrange(i)}", "dependency", f"a{i}")
+    return agent
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    formats = args.formats.split(",")
+    results = Results(
+        "format", memory=True, sizes=sizes, formats=formats, output_bytes=args.output_bytes,
+        distinct_outputs=args.distinct_outputs, blobs=args.blobs, seed=args.seed
+    )
+    start_memory_tracking()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            agent = build_agent(size, args.output_bytes, random.Random(args.seed), args.distinct_outputs, args.blobs)
+            for format in formats:
+                path = os.path.join(tmp_dir, f"agent_{size}.{format}")
+                gc.collect()
+                with results.measure(f"{size}/{format}/save", ops=size) as result:
+                    agent.save(path, format=format)
+                result["file_bytes"] = os.path.getsize(path)
+                print(f"{'':<48} {format_bytes(result['file_bytes'])} file")
+                gc.collect()
+                with results.measure(f"{size}/{format}/load", ops=size):
+                    Agent.load(path)
+                if format == "binary":
+                    gc.collect()
+                    with results.measure(f"{size}/{format}/lazy_load", ops=size):
+                        loaded = Agent.load(path, lazy=True)
+                        loaded.cg.resolve_output(loaded.cg.query_node_by_id(f"a{size - 1}").output)
+                    loaded.cg.storage.close()
+            del agent
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="1000,5000", help="Comma separated numbers of actions in the graph")
+    parser.add_argument("--formats", default=",".join(FORMATS), help=f"Comma separated, from: {', '.join(FORMATS)}")
+    parser.add_argument("--output-bytes", type=int, default=4000, help="Length of each action's output")
+    parser.add_argument("--distinct-outputs", type=int, default=0, help="Number of distinct outputs shared by actions (0 for all unique)")
+    parser.add_argument("--blobs", action="store_true", help="Keep outputs in a BlobStore")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
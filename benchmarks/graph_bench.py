@@ -0,0 +1,164 @@
+'''
+Micro-benchmarks for CognitionGraph operations on synthetic graphs (chains, wide fan-outs, diamonds and random DAGs).
+
+Usage:
+    python benchmarks/graph_bench.py run --sizes 1000,10000,100000 --out baseline.json
+    python benchmarks/graph_bench.py run --sizes 1000,10000,100000 --out current.json
+    python benchmarks/graph_bench.py compare baseline.json current.json
+
+Operations which are expected to scale with graph size (e.g. add_edge, query_nodes_by_tag, remove_node) are timed
+over a bounded sample (at most --ops operations, stopping early after --budget seconds) rather than the whole graph,
+so large sizes finish in reasonable time - compare per-op times.
+Whole graph operations (to_json, from_json, to_networkx) can't be sampled, use --skip to leave them out at large sizes.
+'''
+import gc
+import random
+
+from common import Results, bounded, main, start_memory_tracking
+
+from langur.graph.edge import Edge
+from langur.graph.graph import CognitionGraph
+from langur.graph.node import Node
+from langur.llm import LLMConfig
+
+SHAPES = ("chain", "fanout", "diamond", "random")
+RELATION = "dependency"
+
+
+class BenchNode(Node):
+    tags = ["bench"]
+    content: str = ""
+
+
+class HotBenchNode(BenchNode):
+    '''Every 10th node, so tag / type queries return a subset of the graph'''
+    tags = ["hot"]
+
+
+def make_graph() -> CognitionGraph:
+    return CognitionGraph(workers=[], llm_config=LLMConfig(provider="anthropic", options={}))
+
+
+def make_node(i: int) -> Node:
+    cls = HotBenchNode if i % 10 == 0 else BenchNode
+    return cls(id=f"n{i}", content=f"Synthetic node {i}")
+
+
+def edge_ids(shape: str, n: int, rng: random.Random, degree: int = 2) -> list[tuple[int, int]]:
+    '''Edges for a DAG with n nodes, as (src, dest) indexes'''
+    if shape == "chain":
+        return [(i, i + 1) for i in range(n - 1)]
+    if shape == "fanout":
+        return [(0, i) for i in range(1, n)]
+    if shape == "diamond":
+        # Chained diamonds: a -> b, a -> c, b -> d, c -> d, where d is the next diamond's a
+        edges = []
+        for a in range(0, n - 3, 3):
+            b, c, d = a + 1, a + 2, a + 3
+            edges.extend([(a, b), (a, c), (b, d), (c, d)])
+        return edges
+    if shape == "random":
+        edges = set()
+        for dest in range(1, n):
+            for _ in range(min(degree, dest)):
+                edges.add((rng.randrange(dest), dest))
+        return sorted(edges)
+    raise ValueError(f"Unknown shape: {shape}")
+
+
+def bench_shape(results: Results, shape: str, size: int, ops: int, budget: float, skip: set[str], memory: bool, seed: int):
+    rng = random.Random(seed)
+    prefix = f"{shape}/{size}"
+    edges = edge_ids(shape, size, rng)
+    nodes = [make_node(i) for i in range(size)]
+
+    def sampled(name: str, items: list):
+        '''Measure a loop over items, which may stop early if over budget'''
+        with results.measure(f"{prefix}/{name}", ops=len(items), memory=memory) as result:
+            result["ops"] = 0
+            for item in bounded(items, budget):
+                yield item
+                result["ops"] += 1
+
+    cg = make_graph()
+    with results.measure(f"{prefix}/add_node", ops=size, memory=memory):
+        for node in nodes:
+            cg.add_node(node)
+
+    with results.measure(f"{prefix}/add_edge_by_ids", ops=len(edges), memory=memory) as result:
+        for src, dest in edges:
+            cg.add_edge_by_ids(f"n{src}", RELATION, f"n{dest}")
+    result["graph_edges"] = cg.edge_count()
+
+    if "add_edge" not in skip:
+        # Extra edges between existing nodes (always forwards, so it's still a DAG)
+        sample = [tuple(sorted(rng.sample(range(size), 2))) for _ in range(min(ops, size))]
+        for src, dest in sampled("add_edge", sample):
+            cg.add_edge(Edge(nodes[src], "extra", nodes[dest]))
+
+    if "query_nodes_by_type" not in skip:
+        for _ in sampled("query_nodes_by_type", range(max(1, min(ops, 100)))):
+            cg.query_nodes_by_type(HotBenchNode)
+
+    if "query_nodes_by_tag" not in skip:
+        for _ in sampled("query_nodes_by_tag", range(max(1, min(ops, 10)))):
+            cg.query_nodes_by_tag("hot")
+
+    if not {"to_json", "from_json"} <= skip:
+        with results.measure(f"{prefix}/to_json", memory=memory):
+            data = cg.to_json()
+        if "from_json" not in skip:
+            with results.measure(f"{prefix}/from_json", memory=memory):
+                CognitionGraph.from_json(data, workers=[], llm_config=cg.llm_config)
+        del data
+        gc.collect()
+
+    if "to_networkx" not in skip:
+        with results.measure(f"{prefix}/to_networkx", memory=memory):
+            g = cg.to_networkx()
+        del g
+        gc.collect()
+
+    # Mutations last, since they change the graph
+    targets = rng.sample(range(1, size), min(ops, size - 1))
+    count = len(targets) // 2
+    if "substitute" not in skip:
+        for i in sampled("substitute", targets[:count]):
+            cg.substitute(f"n{i}", [BenchNode(id=f"n{i}_a"), BenchNode(id=f"n{i}_b")])
+
+    if "remove_node" not in skip:
+        for i in sampled("remove_node", targets[count:]):
+            cg.remove_node(cg.query_node_by_id(f"n{i}"))
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    shapes = args.shapes.split(",")
+    memory = not args.no_memory
+    skip = set(args.skip.split(",")) if args.skip else set()
+    results = Results("graph", memory=memory, sizes=sizes, shapes=shapes, ops=args.ops, budget=args.budget, skip=sorted(skip), seed=args.seed)
+    if memory:
+        start_memory_tracking()
+
+    for size in sizes:
+        for shape in shapes:
+            gc.collect()
+            with results.measure(f"{shape}/{size}/total", ops=size, memory=memory):
+                bench_shape(results, shape, size, args.ops, args.budget, skip, memory, args.seed)
+            gc.collect()
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma separated node counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help=f"Comma separated, from: {', '.join(SHAPES)}")
+    parser.add_argument("--ops", type=int, default=1000, help="Max operations for sampled benchmarks")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds after which sampled benchmarks stop early (0 for no limit)")
+    parser.add_argument("--skip", default="", help="Comma separated operations to skip, e.g. from_json,to_networkx")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Don't track peak memory (faster, and timings aren't skewed by tracemalloc)")
+
+if __name__ == "__main__":
+    main(run, add_run_args)
@@ -0,0 +1,140 @@
+'''
+Graph core benchmark: memory per node and per edge, and the cost of the set operations graph traversal is built on
+(edge membership, incoming / outgoing edges, upstream nodes, the executor's frontier), for in-memory graphs of
+--sizes action nodes with about --edges-per-node dependency edges each. Also the cost of adding --plan-size node
+plans to the graph (with a listener attached, then querying tasks), one mutation at a time vs in a batch, and of
+keeping count of executed actions as they're executed by re-scanning the graph vs with a subscription.
+
+Usage:
+    python benchmarks/graph_core_bench.py run --sizes 10000,100000 --out baseline.json
+    python benchmarks/graph_core_bench.py compare baseline.json current.json
+'''
+import gc
+from contextlib import nullcontext
+import random
+import tracemalloc
+
+from common import Results, bounded, format_bytes, main
+
+from langur.actions import ActionNode
+from langur.connector import Connector, action
+from langur.graph.edge import Edge
+from langur.graph.events import NodeUpdated
+from langur.graph.graph import CognitionGraph
+from langur.llm import LLMConfig
+from langur.workers.executor import ExecutorWorker
+from langur.workers.task import TaskNode
+
+
+class BenchConnector(Connector):
+    @action
+    def read(self, path: str):
+        '''Read a file'''
+        return path
+
+
+def bench(results: Results, size: int, args):
+    rng = random.Random(args.seed)
+    connector = BenchConnector()
+    executor = ExecutorWorker()
+    action_type = next(iter(connector.get_action_node_types()))
+    cg = CognitionGraph(workers=[connector, executor], llm_config=LLMConfig(provider="anthropic", options={}))
+
+    # Nodes and edges are measured separately, with tracing only on while each is built
+    gc.collect()
+    tracemalloc.start()
+    with results.measure(f"{size}/add_nodes", ops=size, memory=False) as node_result:
+        for i in range(size):
+            # Most of the graph is executed, as in a long run
+            output = None if i >= size - size // 20 else "done"
+            cg.add_node(action_type(id=f"a{i}", inputs={"path": f"file_{i}"}, purpose="Read a file", connector_id=connector.id, output=output))
+    gc.collect()
+    node_result["bytes_per_node"] = tracemalloc.get_traced_memory()[0] / size
+    tracemalloc.stop()
+
+    pairs = [(f"a{rng.randrange(max(0, i - 100), i)}", f"a{i}") for i in range(1, size) for _ in range(args.edges_per_node)]
+    gc.collect()
+    tracemalloc.start()
+    with results.measure(f"{size}/add_edges", ops=len(pairs), memory=False) as result:
+        for src_id, dest_id in pairs:
+            cg.add_edge_by_ids(src_id, "dependency", dest_id)
+    gc.collect()
+    result["bytes_per_edge"] = tracemalloc.get_traced_memory()[0] / cg.edge_count()
+    tracemalloc.stop()
+    print(f"{'':<48} {format_bytes(node_result['bytes_per_node'])}/node, {format_bytes(result['bytes_per_edge'])}/edge")
+
+    sample = [cg.query_node_by_id(f"a{rng.randrange(size)}") for _ in range(args.ops)]
+    probes = [Edge.detached(cg.query_node_by_id(src_id), "dependency", cg.query_node_by_id(dest_id)) for src_id, dest_id in rng.sample(pairs, min(args.ops, len(pairs)))]
+    edges = cg.get_edges()
+    with results.measure(f"{size}/edge_membership", ops=len(probes), memory=False):
+        for edge in probes:
+            edge in edges
+
+    with results.measure(f"{size}/incoming_outgoing", ops=len(sample), memory=False) as result:
+        result["ops"] = 0
+        for node in bounded(sample, args.budget):
+            node.incoming_edges() | node.outgoing_edges()
+            result["ops"] += 1
+
+    with results.measure(f"{size}/upstream_nodes", ops=len(sample), memory=False) as result:
+        result["ops"] = 0
+        for node in bounded(sample, args.budget):
+            node.upstream_nodes()
+            result["ops"] += 1
+
+    with results.measure(f"{size}/get_frontier", ops=size, memory=False):
+        executor.get_frontier()
+
+    pending = [node for node in cg.query_nodes_by_type(ActionNode) if node.output is None][:2 * args.ops]
+    with results.measure(f"{size}/count_executed_rescan", ops=len(pending) // 2, memory=False) as result:
+        result["ops"] = 0
+        for node in bounded(pending[::2], args.budget):
+            node.output = "done"
+            sum(1 for node in cg.query_nodes_by_type(ActionNode) if node.output is not None)
+            result["ops"] += 1
+
+    executed = [0]
+    def count(event):
+        executed[0] += 1
+    subscription = cg.subscribe(count, events=[NodeUpdated], fields=["output"])
+    with results.measure(f"{size}/count_executed_subscribed", ops=len(pending) // 2, memory=False):
+        for node in pending[1::2]:
+            node.output = "done"
+    subscription.close()
+
+    events = []
+    cg.add_listener(lambda op, data: events.append(op))
+    for batched in (False, True):
+        name = "batched" if batched else "unbatched"
+        events.clear()
+        with results.measure(f"{size}/add_plan_{name}", ops=args.plans, memory=False) as result:
+            for plan in range(args.plans):
+                with cg.batch() if batched else nullcontext():
+                    for i in range(args.plan_size):
+                        cg.add_node(action_type(id=f"{name}{plan}-{i}", inputs={"path": "file"}, purpose="Read a file", connector_id=connector.id))
+                        if i > 0:
+                            cg.add_edge_by_ids(f"{name}{plan}-{i - 1}", "dependency", f"{name}{plan}-{i}")
+                cg.query_nodes_by_type(TaskNode)
+        result["notifications"] = len(events)
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = Results("graph_core", memory=False, sizes=sizes, edges_per_node=args.edges_per_node, seed=args.seed)
+    for size in sizes:
+        bench(results, size, args)
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="10000,100000", help="Comma separated node counts")
+    parser.add_argument("--edges-per-node", type=int, default=2, help="Dependency edges into each node")
+    parser.add_argument("--ops", type=int, default=10000, help="Max sampled lookups")
+    parser.add_argument("--plans", type=int, default=100, help="Plans added")
+    parser.add_argument("--plan-size", type=int, default=20, help="Actions per plan")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds before sampled lookups stop early")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
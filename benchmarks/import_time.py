@@ -0,0 +1,86 @@
+'''
+Import time benchmark: how long `import langur` (and other entry points) take in a fresh interpreter,
+which dominates latency for short-lived CLI / serverless runs.
+
+Usage:
+    python benchmarks/import_time.py run --out baseline.json
+    python benchmarks/import_time.py compare baseline.json current.json
+
+Also lists the slowest imported modules (from python -X importtime) and any heavy optional dependencies
+which were imported eagerly.
+'''
+import json
+import statistics
+import subprocess
+import sys
+
+from common import Results, main
+
+DEFAULT_STATEMENTS = [
+    "import langur",
+    "from langur import Langur",
+    "from langur.connectors import Workspace, Terminal, LLM",
+]
+
+# Should only be imported once actually used
+LAZY_MODULES = ["networkx", "ipysigma", "IPython", "cuid2", "fs", "langur.baml_client"]
+
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "lazy_loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+'''
+
+
+def time_import(statement: str) -> dict:
+    script = SCRIPT.format(statement=statement, lazy=LAZY_MODULES)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_modules(statement: str, top: int) -> list[tuple[str, int]]:
+    '''(module, cumulative microseconds), slowest first'''
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(cumulative)))
+    return sorted(modules, key=lambda m: m[1], reverse=True)[:top]
+
+
+def run(args):
+    statements = args.statements or DEFAULT_STATEMENTS
+    results = Results("import", memory=False, repeats=args.repeats, statements=statements)
+    for statement in statements:
+        samples = [time_import(statement) for _ in range(args.repeats)]
+        seconds = [sample["seconds"] for sample in samples]
+        results.add(
+            statement,
+            statistics.median(seconds),
+            min_seconds=min(seconds),
+            max_seconds=max(seconds),
+            eagerly_loaded=samples[0]["lazy_loaded"]
+        )
+        if samples[0]["lazy_loaded"]:
+            print(f"{'':<48} also imported: {', '.join(samples[0]['lazy_loaded'])}")
+
+    if args.top:
+        print(f"\nSlowest modules for `{statements[0]}` (cumulative):")
+        for name, micros in slowest_modules(statements[0], args.top):
+            print(f"  {micros / 1000:>8.1f}ms  {name}")
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--repeats", type=int, default=10, help="Fresh interpreters per statement (median is reported)")
+    parser.add_argument("--statement", dest="statements", action="append", help="Import statement to time (repeatable)")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to list")
+
+if __name__ == "__main__":
+    main(run, add_run_args)
@@ -0,0 +1,119 @@
+'''
+Load test for hosting many agents in one process: N agents planning and executing against the fake LLM server,
+all scheduled on one event loop by langur.runtime.Runtime.
+
+Reports aggregate actions/s and LLM calls/s, and memory per agent (allocated while building and running the agents,
+and still held once they're done) as N grows.
+
+Usage:
+    python benchmarks/load_test.py run --agents 1,10,100,1000 --latency lognormal:0.2,0.3 --out baseline.json
+    python benchmarks/load_test.py compare baseline.json current.json
+'''
+import gc
+import logging
+import time
+import tracemalloc
+
+from common import Results, format_bytes, main
+
+from langur import Langur, Connector, action
+from langur.actions import ActionNode
+from langur.log import configure_logging
+from langur.runtime import Runtime
+from langur.testing import FakeLLMServer, Latency
+
+
+class Calculator(Connector):
+    @action
+    def add(self, x: int, y: int):
+        '''Add two numbers'''
+        return x + y
+
+    @action
+    async def multiply(self, x: int, y: int):
+        '''Multiply two numbers'''
+        return x * y
+
+
+def run_agents(results: Results, n: int, server: FakeLLMServer, args):
+    runtime = Runtime(
+        max_concurrent_agents=args.max_agents or None,
+        max_concurrent_llm_calls=args.max_llm_calls or None,
+        cache_llm_responses=args.cache
+    )
+    gc.collect()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    requests_before = sum(server.requests.values())
+
+    for i in range(n):
+        agent = Langur(f"Calculate something ({i})", llm_config=server.llm_config(max_retries=args.retries))
+        agent.use(Calculator())
+        runtime.add(agent)
+
+    with results.measure(f"{n}/run", ops=n, memory=False) as result:
+        runs = runtime.run()
+
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    actions = sum(
+        sum(1 for node in agent_run.agent.agent.cg.query_nodes_by_type(ActionNode) if node.output is not None)
+        for agent_run in runs
+    )
+    llm_calls = sum(agent_run.agent.usage.total.calls for agent_run in runs)
+    result.update({
+        "agents": n,
+        "failed_agents": sum(1 for agent_run in runs if agent_run.error is not None),
+        "actions": actions,
+        "actions_per_second": actions / result["seconds"],
+        "llm_calls": llm_calls,
+        "llm_calls_per_second": llm_calls / result["seconds"],
+        "server_requests": sum(server.requests.values()) - requests_before,
+        "retained_bytes_per_agent": (current - base) / n,
+        "peak_bytes_per_agent": (peak - base) / n,
+    })
+    print(
+        f"{'':<48} {result['actions_per_second']:,.1f} actions/s, {result['llm_calls_per_second']:,.1f} LLM calls/s, "
+        f"{format_bytes(result['retained_bytes_per_agent'])} retained / {format_bytes(result['peak_bytes_per_agent'])} peak per agent, "
+        f"{result['failed_agents']} failed"
+    )
+
+
+def run(args):
+    configure_logging(level=logging.WARNING)
+    counts = [int(n) for n in args.agents.split(",")]
+    results = Results(
+        "load", memory=True, agents=counts, latency=args.latency, error_rate=args.error_rate, plan_size=args.plan_size,
+        max_agents=args.max_agents, max_llm_calls=args.max_llm_calls, cache=args.cache
+    )
+    tracemalloc.start()
+
+    server = FakeLLMServer(
+        latency=Latency.parse(args.latency),
+        error_rate=args.error_rate,
+        plan_size=args.plan_size,
+        plan_shape=args.plan_shape,
+        seed=args.seed
+    )
+    with server:
+        for n in counts:
+            run_agents(results, n, server, args)
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--agents", default="1,10,100", help="Comma separated numbers of concurrent agents")
+    parser.add_argument("--latency", default="0.05", help='Fake LLM latency, e.g. "0.2", "uniform:0.1,0.3", "lognormal:0.5,0.25"')
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--plan-size", type=int, default=5)
+    parser.add_argument("--plan-shape", choices=["chain", "parallel"], default="parallel")
+    parser.add_argument("--max-agents", type=int, default=0, help="Limit on agents running at once (0 for none)")
+    parser.add_argument("--max-llm-calls", type=int, default=0, help="Limit on LLM calls in flight at once (0 for none)")
+    parser.add_argument("--cache", action="store_true", help="Share responses between identical LLM calls")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args, run_help="Run load test")
@@ -0,0 +1,102 @@
+'''
+Event loop benchmark: agent cycle throughput and raw task step overhead under
+- asyncio: the default event loop
+- nest_asyncio: the default loop with nest_asyncio's patch applied (what `import langur` used to always do)
+- uvloop: uvloop's event loop via loop_factory (if installed)
+
+Each variant runs in a fresh interpreter since the nest_asyncio patch can't be undone.
+
+Usage:
+    python benchmarks/loop_bench.py run --out baseline.json
+    python benchmarks/loop_bench.py compare baseline.json current.json
+'''
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import sys
+import time
+
+from common import Results, main
+
+VARIANTS = ("asyncio", "nest_asyncio", "uvloop")
+
+
+async def task_steps(tasks: int, steps: int):
+    async def step():
+        for _ in range(steps):
+            await asyncio.sleep(0)
+    await asyncio.gather(*[step() for _ in range(tasks)])
+
+
+def child(args):
+    '''Run the workloads for one variant and print the results as JSON'''
+    from langur.llm import LLMConfig
+    from langur.log import configure_logging
+    from langur.util.event_loop import enable_nested_event_loops, run_sync
+    from executor_bench import build_agent
+
+    configure_logging(level=logging.WARNING)
+    loop_factory = None
+    if args.variant == "nest_asyncio":
+        enable_nested_event_loops()
+    elif args.variant == "uvloop":
+        import uvloop
+        loop_factory = uvloop.new_event_loop
+
+    start = time.perf_counter()
+    run_sync(task_steps(args.tasks, args.steps), loop_factory=loop_factory)
+    steps_seconds = time.perf_counter() - start
+
+    # A chain of instant actions, so each cycle executes exactly one action
+    agent = build_agent(1, args.cycles, 1, "async", 0.0, "stub", LLMConfig(provider="anthropic", options={}), random.Random(0))
+    start = time.perf_counter()
+    run_sync(agent.run(until=None), loop_factory=loop_factory)
+    cycles_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "task_steps": {"seconds": steps_seconds, "ops": args.tasks * args.steps},
+        "agent_cycles": {"seconds": cycles_seconds, "ops": len(agent.cycle_durations)},
+    }))
+
+
+def run(args):
+    results = Results("loop", memory=False, tasks=args.tasks, steps=args.steps, cycles=args.cycles)
+    for variant in args.variants.split(","):
+        if variant == "uvloop":
+            try:
+                import uvloop
+            except ImportError:
+                print("uvloop not installed, skipping")
+                continue
+        command = [
+            sys.executable, __file__, "_child", "--variant", variant,
+            "--tasks", str(args.tasks), "--steps", str(args.steps), "--cycles", str(args.cycles)
+        ]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        measured = json.loads(output.strip().splitlines()[-1])
+        for workload, result in measured.items():
+            results.add(f"{variant}/{workload}", result["seconds"], ops=result["ops"], per_second=result["ops"] / result["seconds"])
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_workload_args(parser):
+    parser.add_argument("--tasks", type=int, default=10000, help="Concurrent tasks for the task step workload")
+    parser.add_argument("--steps", type=int, default=20, help="Steps (awaits) per task")
+    parser.add_argument("--cycles", type=int, default=300, help="Agent cycles (chained actions) for the cycle workload")
+
+
+def add_run_args(parser):
+    parser.add_argument("--variants", default=",".join(VARIANTS), help=f"Comma separated, from: {', '.join(VARIANTS)}")
+    add_workload_args(parser)
+
+
+def add_child_args(parser):
+    parser.add_argument("--variant", choices=VARIANTS, required=True)
+    add_workload_args(parser)
+
+if __name__ == "__main__":
+    main(run, add_run_args, commands={"_child": (add_child_args, child)})
@@ -0,0 +1,84 @@
+'''
+Plan optimization benchmark: cost of optimize_plan on generated plans, and how much it removes.
+
+Plans are layered DAGs (WIDTHxDEPTH: DEPTH layers of WIDTH actions, each depending on --fanin actions from the
+previous layer), as PlanActions would return them: with --redundant of the actions also depending directly on
+one of their grandparents (implied by the parent between them), and --duplicates of the actions repeating the
+inputs of another action in their layer.
+
+Usage:
+    python benchmarks/plan_bench.py run --plans 10x10,100x10,100x100 --out baseline.json
+    python benchmarks/plan_bench.py compare baseline.json current.json
+'''
+import random
+
+from common import Results, main
+
+from langur.connector import Connector, action
+from langur.graph.optimize import optimize_plan
+
+
+class BenchConnector(Connector):
+    @action(idempotent=True)
+    def read(self, path: str):
+        '''Read a file'''
+        return path
+
+
+def build_plan(width: int, depth: int, args, rng: random.Random):
+    connector = BenchConnector()
+    action_type = next(iter(connector.get_action_node_types()))
+    nodes, edges = [], []
+    parents: dict[str, list[str]] = {}
+    layers = []
+    for layer in range(depth):
+        ids = []
+        for i in range(width):
+            node_id = f"l{layer}-{i}"
+            path = f"file_{layer}_{i}"
+            if i > 0 and rng.random() < args.duplicates:
+                path = f"file_{layer}_{rng.randrange(i)}"
+            nodes.append(action_type(id=node_id, inputs={"path": path}, purpose="Read a file", connector_id=connector.id))
+            parents[node_id] = rng.sample(layers[-1], min(args.fanin, width)) if layers else []
+            edges.extend((parent_id, node_id) for parent_id in parents[node_id])
+            if layer > 1 and rng.random() < args.redundant:
+                parent_id = rng.choice(parents[node_id])
+                edges.append((rng.choice(parents[parent_id]), node_id))
+            ids.append(node_id)
+        layers.append(ids)
+    return nodes, edges
+
+
+def run(args):
+    plans = [tuple(int(n) for n in plan.split("x")) for plan in args.plans.split(",")]
+    results = Results(
+        "plan", memory=False, plans=args.plans, fanin=args.fanin, redundant=args.redundant,
+        duplicates=args.duplicates, seed=args.seed
+    )
+    for width, depth in plans:
+        nodes, edges = build_plan(width, depth, args, random.Random(args.seed))
+        with results.measure(f"{width}x{depth}/optimize", ops=len(nodes), memory=False) as result:
+            _, _, report = optimize_plan(nodes, edges)
+        result.update(
+            nodes_removed=report.nodes_removed, redundant_edges=report.redundant_edges,
+            edges_before=report.edges_before, edges_after=report.edges_after,
+            critical_path_before=report.critical_path_before, critical_path_after=report.critical_path_after
+        )
+        print(
+            f"{'':<48} {report.nodes_removed}/{report.nodes_before} actions merged, "
+            f"{report.edges_before} -> {report.edges_after} edges, critical path {report.critical_path_before} -> {report.critical_path_after}"
+        )
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--plans", default="10x10,100x10,100x100", help="Comma separated WIDTHxDEPTH plans")
+    parser.add_argument("--fanin", type=int, default=2)
+    parser.add_argument("--redundant", type=float, default=0.3, help="Fraction of actions with a redundant dependency")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Fraction of actions duplicating another")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
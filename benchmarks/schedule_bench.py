@@ -0,0 +1,120 @@
+'''
+Executor scheduling benchmark: makespan (time to execute a whole plan) under a concurrency limit, starting ready
+actions in arbitrary order vs on the longest remaining path first.
+
+Plans are --actions actions in chains of random length (1 to --max-chain), so the frontier is much wider than the
+limit early on while a few long chains decide when the plan can finish. Each action is of a random type from
+--latencies, sleeping that many seconds. Priorities are measured cold (no latency estimates yet, so they count
+actions per path) and warm (with the estimates the cold run recorded).
+
+Usage:
+    python benchmarks/schedule_bench.py run --actions 100,500 --concurrency 4,16 --out baseline.json
+    python benchmarks/schedule_bench.py compare baseline.json current.json
+
+Each result's "vs_bound" is its makespan over the best possible one (the larger of the critical path and the total
+latency divided by the limit).
+'''
+import asyncio
+import logging
+import random
+
+from common import Results, main
+
+from langur.agent import Agent
+from langur.connector import Connector, action
+from langur.log import configure_logging
+from langur.workers.executor import ExecutorWorker
+
+
+class BenchConnector(Connector):
+    @action
+    async def fast(self, seconds: float):
+        '''Sleep'''
+        await asyncio.sleep(seconds)
+
+    @action
+    async def medium(self, seconds: float):
+        '''Sleep'''
+        await asyncio.sleep(seconds)
+
+    @action
+    async def slow(self, seconds: float):
+        '''Sleep'''
+        await asyncio.sleep(seconds)
+
+
+class ArbitraryOrderExecutor(ExecutorWorker):
+    '''Starts ready actions in random order, like picking them from the frontier set without priorities'''
+    def get_priorities(self, nodes):
+        rng = random.Random(0)
+        return {node_id: rng.random() for node_id in sorted(super().get_priorities(nodes))}
+
+
+def build_plan(n: int, args, rng: random.Random) -> list[list[str]]:
+    '''Chains of action types'''
+    types = list(args.latencies)
+    chains = []
+    while n > 0:
+        length = min(n, rng.randint(1, args.max_chain))
+        chains.append([rng.choice(types) for _ in range(length)])
+        n -= length
+    return chains
+
+
+def build_agent(chains: list[list[str]], executor: ExecutorWorker, args) -> Agent:
+    connector = BenchConnector()
+    agent = Agent(workers=[connector, executor])
+    action_types = {typ.action_type_name(): typ for typ in connector.get_action_node_types()}
+    for c, chain in enumerate(chains):
+        for i, type_name in enumerate(chain):
+            agent.cg.add_node(action_types[type_name](
+                id=f"c{c:05}_{i:03}",
+                inputs={"seconds": args.latencies[type_name]},
+                purpose="Benchmark action",
+                connector_id=connector.id
+            ))
+            if i > 0:
+                agent.cg.add_edge_by_ids(f"c{c:05}_{i - 1:03}", "dependency", f"c{c:05}_{i:03}")
+    return agent
+
+
+def run(args):
+    configure_logging(level=logging.WARNING)
+    args.latencies = {name: float(seconds) for name, seconds in (item.split(":") for item in args.latencies.split(","))}
+    sizes = [int(n) for n in args.actions.split(",")]
+    limits = [int(n) for n in args.concurrency.split(",")]
+    results = Results("schedule", memory=False, actions=sizes, concurrency=limits, max_chain=args.max_chain, latencies=args.latencies, seed=args.seed)
+
+    for n in sizes:
+        chains = build_plan(n, args, random.Random(args.seed))
+        critical_path = max(sum(args.latencies[t] for t in chain) for chain in chains)
+        total = sum(args.latencies[t] for chain in chains for t in chain)
+        for limit in limits:
+            bound = max(critical_path, total / limit)
+            estimates = {}
+            for mode in ["arbitrary", "priority_cold", "priority_warm"]:
+                if mode == "arbitrary":
+                    executor = ArbitraryOrderExecutor(max_concurrency=limit)
+                else:
+                    executor = ExecutorWorker(max_concurrency=limit, latency_estimates=estimates if mode == "priority_warm" else {})
+                agent = build_agent(chains, executor, args)
+                with results.measure(f"{n}/limit_{limit}/{mode}", ops=n, memory=False) as result:
+                    asyncio.run(agent.run(until=None))
+                result["vs_bound"] = result["seconds"] / bound
+                if mode == "priority_cold":
+                    estimates = executor.latency_estimates
+            print(f"{'':<48} best possible {bound:.3f}s")
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--actions", default="100,500", help="Comma separated plan sizes")
+    parser.add_argument("--concurrency", default="4,16", help="Comma separated concurrency limits")
+    parser.add_argument("--max-chain", type=int, default=20, help="Longest chain of dependent actions")
+    parser.add_argument("--latencies", default="fast:0.005,medium:0.02,slow:0.05", help="Seconds per action type")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
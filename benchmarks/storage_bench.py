@@ -0,0 +1,101 @@
+'''
+Graph storage benchmark: memory held and operation times for CognitionGraph with MemoryStorage vs SQLiteStorage,
+as graphs of action nodes with --output-bytes long outputs grow.
+
+Retained memory is what's still allocated (by Python) once the graph is built, so for SQLite it should stay flat
+as the graph grows (SQLite's own page cache isn't included).
+
+Usage:
+    python benchmarks/storage_bench.py run --sizes 10000,100000 --out baseline.json
+    python benchmarks/storage_bench.py compare baseline.json current.json
+'''
+import gc
+import os
+import random
+import tempfile
+import tracemalloc
+
+from common import Results, bounded, format_bytes, main
+
+from langur.actions import ActionNode
+from langur.connector import Connector, action
+from langur.graph.graph import CognitionGraph
+from langur.graph.storage import MemoryStorage, SQLiteStorage
+from langur.llm import LLMConfig
+
+STORAGES = ("memory", "sqlite")
+
+
+class BenchConnector(Connector):
+    @action
+    def read(self, path: str):
+        '''Read a file'''
+        return path
+
+
+def bench(results: Results, storage_name: str, size: int, args, tmp_dir: str):
+    prefix = f"{storage_name}/{size}"
+    rng = random.Random(args.seed)
+    connector = BenchConnector()
+    action_type = next(iter(connector.get_action_node_types()))
+    output = "x" * args.output_bytes
+
+    gc.collect()
+    base = tracemalloc.get_traced_memory()[0]
+    storage = MemoryStorage() if storage_name == "memory" else SQLiteStorage(os.path.join(tmp_dir, f"{size}.db"), cache_size=args.cache_size)
+    cg = CognitionGraph(workers=[connector], llm_config=LLMConfig(provider="anthropic", options={}), storage=storage)
+
+    with results.measure(f"{prefix}/build", ops=size, memory=False) as result:
+        for i in range(size):
+            # Unique outputs, as they would be in practice
+            cg.add_node(action_type(id=f"a{i}", inputs={"path": f"file_{i}"}, purpose="Read a file", connector_id=connector.id, output=f"{i}{output}"))
+            if i > 0:
+                cg.add_edge_by_ids(f"a{rng.randrange(max(0, i - 100), i)}", "dependency", f"a{i}")
+    gc.collect()
+    result["retained_bytes"] = tracemalloc.get_traced_memory()[0] - base
+    print(f"{'':<48} {format_bytes(result['retained_bytes'])} retained")
+
+    sample = [f"a{rng.randrange(size)}" for _ in range(args.ops)]
+    with results.measure(f"{prefix}/query_node_by_id", ops=len(sample), memory=False) as result:
+        result["ops"] = 0
+        for node_id in bounded(sample, args.budget):
+            cg.query_node_by_id(node_id)
+            result["ops"] += 1
+
+    with results.measure(f"{prefix}/upstream_nodes", ops=len(sample), memory=False) as result:
+        result["ops"] = 0
+        for node_id in bounded(sample, args.budget):
+            cg.query_node_by_id(node_id).upstream_nodes()
+            result["ops"] += 1
+
+    with results.measure(f"{prefix}/query_nodes_by_type", ops=1, memory=False):
+        cg.query_nodes_by_type(ActionNode)
+
+    storage.close()
+    del cg, storage
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    storages = args.storages.split(",")
+    results = Results("storage", memory=False, sizes=sizes, storages=storages, output_bytes=args.output_bytes, cache_size=args.cache_size, seed=args.seed)
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            for storage_name in storages:
+                bench(results, storage_name, size, args, tmp_dir)
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="10000,100000", help="Comma separated node counts")
+    parser.add_argument("--storages", default=",".join(STORAGES), help=f"Comma separated, from: {', '.join(STORAGES)}")
+    parser.add_argument("--output-bytes", type=int, default=1000, help="Length of each action's output")
+    parser.add_argument("--cache-size", type=int, default=1000, help="SQLite node cache size")
+    parser.add_argument("--ops", type=int, default=10000, help="Max sampled lookups")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds before sampled lookups stop early")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
@@ -0,0 +1,116 @@
+'''
+Graph viewer benchmark: what it costs to show an agent's graph as it changes, re-rendering a full Sigma HTML file
+(save_graph_html) vs the live viewer's snapshot and incremental diffs, for graphs of --sizes action nodes.
+
+For each, the time and size of one full update, then the time and bytes per executed action with the live viewer
+attached (how much each action slows the agent, and what's sent to the browser).
+
+Then the size of a --cycles cycle timeline saved by TimelineRecorder, vs one HTML export per cycle (as used by
+generate_viewer, estimated from the size of the last export).
+
+Usage:
+    python benchmarks/viewer_bench.py run --sizes 1000,10000 --out baseline.json
+    python benchmarks/viewer_bench.py compare baseline.json current.json
+'''
+import json
+import os
+import random
+import tempfile
+
+from common import Results, format_bytes, main
+
+from langur.actions import ActionNode
+from langur.connector import Connector, action
+from langur.graph.graph import CognitionGraph
+from langur.llm import LLMConfig
+from langur.viewer import TimelineRecorder, serve_viewer
+
+
+class BenchConnector(Connector):
+    @action
+    def read(self, path: str):
+        '''Read a file'''
+        return path
+
+
+def build_graph(size: int, rng: random.Random) -> CognitionGraph:
+    connector = BenchConnector()
+    action_type = next(iter(connector.get_action_node_types()))
+    cg = CognitionGraph(workers=[connector], llm_config=LLMConfig(provider="anthropic", options={}))
+    for i in range(size):
+        # The last tenth still to be executed
+        output = "done " * 20 if i < size * 9 // 10 else None
+        cg.add_node(action_type(id=f"a{i}", inputs={"path": f"file_{i}"}, purpose="Read a file", connector_id=connector.id, output=output))
+        if i > 0:
+            cg.add_edge_by_ids(f"a{rng.randrange(max(0, i - 50), i)}", "dependency", f"a{i}")
+    return cg
+
+
+def run(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = Results("viewer", memory=False, sizes=sizes, seed=args.seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            cg = build_graph(size, random.Random(args.seed))
+            path = os.path.join(tmp_dir, f"graph_{size}.html")
+            with results.measure(f"{size}/save_graph_html", memory=False) as result:
+                cg.save_graph_html(path)
+            result["bytes"] = os.path.getsize(path)
+            print(f"{'':<48} {format_bytes(result['bytes'])} file")
+
+            pending = [node for node in cg.query_nodes_by_type(ActionNode) if node.output is None][:args.actions]
+            half = len(pending) // 2
+            with results.measure(f"{size}/execute_without_viewer", ops=half, memory=False):
+                for node in pending[:half]:
+                    node.output = "done"
+
+            viewer = serve_viewer(cg, port=0)
+            with results.measure(f"{size}/live_snapshot", memory=False) as result:
+                seq, payload = viewer.snapshot()
+                result["bytes"] = len(json.dumps(payload, separators=(",", ":")))
+            print(f"{'':<48} {format_bytes(result['bytes'])} snapshot")
+
+            with results.measure(f"{size}/execute_with_viewer", ops=len(pending) - half, memory=False) as result:
+                for node in pending[half:]:
+                    node.output = "done"
+            _, ops = viewer.changes_since(seq)
+            result["diff_bytes_per_op"] = len(json.dumps({"ops": ops}, separators=(",", ":"))) / max(len(ops), 1)
+            print(f"{'':<48} {result['diff_bytes_per_op']:.0f}B sent per action")
+            viewer.shutdown()
+
+            # A run of --cycles cycles, each executing some actions and planning new ones
+            cg = build_graph(size, random.Random(args.seed))
+            pending = [node for node in cg.query_nodes_by_type(ActionNode) if node.output is None]
+            action_type = type(pending[0])
+            per_cycle = max(1, len(pending) // args.cycles)
+            recorder = TimelineRecorder()
+            recorder.start(cg)
+            with results.measure(f"{size}/record_cycles", ops=args.cycles, memory=False):
+                for cycle in range(args.cycles):
+                    for node in pending[cycle * per_cycle:(cycle + 1) * per_cycle]:
+                        node.output = "done"
+                    cg.add_node(action_type(id=f"new{cycle}", inputs={"path": "new"}, purpose="Read a file", connector_id=pending[0].connector_id))
+                    cg.add_edge_by_ids(pending[0].id, "dependency", f"new{cycle}")
+                    recorder.end_cycle()
+            recorder.stop()
+            path = os.path.join(tmp_dir, f"timeline_{size}.html")
+            with results.measure(f"{size}/save_timeline", memory=False) as result:
+                recorder.save(path)
+            result["bytes"] = os.path.getsize(path)
+            export_path = os.path.join(tmp_dir, f"export_{size}.html")
+            cg.save_graph_html(export_path)
+            result["per_cycle_exports_bytes"] = os.path.getsize(export_path) * args.cycles
+            print(f"{'':<48} {format_bytes(result['bytes'])} timeline vs ~{format_bytes(result['per_cycle_exports_bytes'])} of per cycle exports")
+
+    if args.out:
+        results.save(args.out)
+
+
+def add_run_args(parser):
+    parser.add_argument("--sizes", default="1000,10000", help="Comma separated node counts")
+    parser.add_argument("--actions", type=int, default=1000, help="Max actions executed per graph")
+    parser.add_argument("--cycles", type=int, default=50, help="Cycles recorded in a timeline")
+    parser.add_argument("--seed", type=int, default=0)
+
+if __name__ == "__main__":
+    main(run, add_run_args)
@@ -37,12 +37,23 @@ def run_challenge(path: Path):
         os.chdir(original_dir)
 
 def main():
-   if len(sys.argv) < 2:
+   args = sys.argv[1:]
+   # --record saves each challenge's LLM calls to <challenge>/cassette.jsonl, --replay runs offline from it
+   cassette_mode = None
+   for flag in ("--record", "--replay"):
+       if flag in args:
+           args.remove(flag)
+           cassette_mode = flag[2:]
+
+   if len(args) < 1:
        print("Please provide at least one directory name")
        return
    
-   for directory in sys.argv[1:]:
+   for directory in args:
        print(f"\nRunning {directory}:")
+       if cassette_mode:
+           os.environ["LANGUR_CASSETTE_MODE"] = cassette_mode
+           os.environ["LANGUR_CASSETTE"] = os.path.abspath(Path(directory) / "cassette.jsonl")
        run_challenge(Path(directory))
 
 if __name__ == "__main__":
@@ -4,6 +4,10 @@ from langur.connectors import Workspace, LLM, Terminal
 '''
 Example that designs and runs two methods for generating prime numbers,
 then compares them.
+
+To run offline / reproducibly, record the LLM calls once and then replay them:
+LANGUR_CASSETTE_MODE=record LANGUR_CASSETTE=prime_methods.jsonl python prime_methods.py
+LANGUR_CASSETTE_MODE=replay LANGUR_CASSETTE=prime_methods.jsonl python prime_methods.py
 '''
 
 agent = Langur("Compare speed for two methods of prime number generation")
@@ -1,10 +1,8 @@
-import os
-# tmp hack until controls implemented
-os.environ['BAML_LOG'] = 'warn'
+# Sets up logging defaults, including for BAML - must be imported before baml_py is
+from . import log
 
-# Ensure async stuff works in jupyter notebooks
-import nest_asyncio
-nest_asyncio.apply()
+# Running agents in jupyter notebooks (nest_asyncio) is enabled automatically when needed
+from .util.event_loop import enable_nested_event_loops
 
 from .langur import Langur
 from .connector import Connector, action
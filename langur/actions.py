@@ -19,6 +19,8 @@ class ActionContext:
     conn: 'Connector'
     ctx: str
     purpose: str
+    # Action node being executed
+    node: Optional['ActionNode'] = None
 
 class ActionNode(Node):
     definition: ClassVar[str]
@@ -26,6 +28,10 @@ class ActionNode(Node):
     #input_schema: ClassVar[dict[str, Any]]#TODO
     # Should maybe just be one FieldType to captured required properly?
     input_schema: ClassVar[dict[str, FieldType]]
+    # JSON schema of each input, which unlike the BAML types can be compared (e.g. for LLM response cache keys)
+    input_json_schema: ClassVar[dict[str, dict]] = {}
+    # Running it again with the same inputs has no further effect (e.g. reads), so duplicates in a plan can be merged
+    idempotent: ClassVar[bool] = False
 
     tags: ClassVar[list[str]] = ["action"]
 
@@ -2,9 +2,24 @@
 
 import asyncio
 import json
-from langur.llm import LLMConfig
+import os
+import time
+from typing import TYPE_CHECKING, Literal
+from langur.blobs import BlobStore
+from langur.llm import LLMClient, LLMConfig
+from langur.log import log_context
+from langur import metrics
+from langur.trace import Tracer, span, use_tracer
+from langur.usage import LLMBudget, UsageTracker
 from langur.workers.worker import Worker
+from langur.graph.compaction import CompactionReport, compact_graph
 from langur.graph.graph import CognitionGraph
+from langur.graph.journal import Journal
+from langur.graph.storage import GraphStorage
+from langur import serialize
+
+if TYPE_CHECKING:
+    from langur.viewer import TimelineRecorder
 
 # TODO: Combine with CognitionGraph
 
@@ -13,7 +28,7 @@ class Agent:
     Lower level agent representation.
     Use Langur instead for high level usage.
     '''
-    def __init__(self, workers: list[Worker], llm_config: LLMConfig = None, cg: CognitionGraph = None):
+    def __init__(self, workers: list[Worker], llm_config: LLMConfig = None, cg: CognitionGraph = None, budget: LLMBudget = None, storage: GraphStorage = None, blobs: BlobStore = None):
         self.llm_config = llm_config if llm_config else LLMConfig(
             provider="anthropic",
             options={
@@ -22,34 +37,79 @@ class Agent:
             }
         )
         
-        self.cg = cg if cg else CognitionGraph(workers=workers, llm_config=self.llm_config)
+        self.cg = cg if cg else CognitionGraph(
+            workers=workers,
+            llm_config=self.llm_config,
+            llm=LLMClient(self.llm_config, budget=budget),
+            storage=storage,
+            blobs=blobs
+        )
         self.workers = workers
-        
+        self.journal: Journal | None = None
+
+    @property
+    def usage(self) -> UsageTracker:
+        '''LLM usage accumulated by this agent, across runs (and saves/loads).'''
+        return self.cg.llm.usage
+
+    @property
+    def budget(self) -> LLMBudget | None:
+        return self.cg.llm.budget
+
     def add_worker(self, worker: Worker):
         self.workers.append(worker)
         self.cg.add_worker(worker)
 
-    async def run(self, until: str):
+    async def run(self, until: str, tracer: Tracer = None, recorder: 'TimelineRecorder' = None):
+        '''
+        Run the agent's workers until they are all done, or until the given signal is produced.
+
+        Args:
+            tracer: Record spans of the run (cycles, workers, action execution, LLM calls) to this tracer.
+            recorder: Record the graph's changes each cycle, to save as an HTML timeline.
+        '''
         #print("Workers:", self.workers)
-        
-        # could be helpful info to load/save cycle count instead of resetting if we loaded a prev agent, idk
-        cycle_count = 0
-        while not self.cg.are_workers_done():
-            # a lil jank calling the graph thing here
-            # would be cool to live update num done workers mid-cycle based on state changes - if workers were to use some hook to update state
-            #print(f"[Cycle {cycle_count+1}]: {self.cg.worker_count(state=STATE_DONE)}/{self.cg.worker_count()} workers done")
-            signals = await self.cycle()
-            if until in signals:
-                break
-            cycle_count += 1
+        if tracer is not None and tracer.baml_spans:
+            tracer.attach_baml()
+        if recorder is not None:
+            recorder.start(self.cg)
+        try:
+            with use_tracer(tracer), span("Agent.run", until=until):
+                # could be helpful info to load/save cycle count instead of resetting if we loaded a prev agent, idk
+                cycle_count = 0
+                while not self.cg.are_workers_done():
+                    # a lil jank calling the graph thing here
+                    # would be cool to live update num done workers mid-cycle based on state changes - if workers were to use some hook to update state
+                    #print(f"[Cycle {cycle_count+1}]: {self.cg.worker_count(state=STATE_DONE)}/{self.cg.worker_count()} workers done")
+                    cycle_start = time.perf_counter()
+                    with span("Agent.cycle", cycle=cycle_count), log_context(cycle=cycle_count):
+                        signals = await self.cycle()
+                    metrics.CYCLES.inc()
+                    metrics.CYCLE_DURATION.observe(time.perf_counter() - cycle_start)
+                    metrics.GRAPH_NODES.set(self.cg.node_count())
+                    metrics.GRAPH_EDGES.set(self.cg.edge_count())
+                    if recorder is not None:
+                        recorder.end_cycle()
+                    if until in signals:
+                        break
+                    cycle_count += 1
+        finally:
+            if tracer is not None:
+                tracer.detach_baml()
+            if recorder is not None:
+                recorder.stop()
         #print("Agent done!")
 
+    async def cycle_worker(self, worker: Worker) -> str | None:
+        with span(f"{worker.__class__.__name__}.cycle", worker_id=worker.id, state=worker.state), log_context(worker_type=worker.__class__.__name__, worker_id=worker.id):
+            return await worker.cycle()
+
     async def cycle(self) -> list[str]:#, cycles=1):
         #workers: list[Worker] = [DependencyDecomposer(), IntermediateProductBuilder(), IntermediateProductBuilder()]
         #for _ in range(cycles):
         jobs = []
         for worker in self.workers:
-            jobs.append(worker.cycle())
+            jobs.append(self.cycle_worker(worker))
         # naive async implementation, don't need to necessarily block gather here
         results = await asyncio.gather(*jobs)
         # return signals
@@ -59,6 +119,9 @@ class Agent:
     def to_json(self) -> dict:
         return {
             "llm": self.llm_config.model_dump(mode="json"),
+            "budget": self.budget.model_dump(mode="json") if self.budget else None,
+            "usage": self.usage.to_json(),
+            "blobs": self.cg.blobs.to_json() if self.cg.blobs else None,
             "workers": [worker.to_json() for worker in self.workers],
             "graph": self.cg.to_json(),
         }
@@ -67,10 +130,17 @@ class Agent:
     def from_json(cls, data: dict) -> 'Agent':
         workers = [Worker.from_json(worker_data) for worker_data in data["workers"]]
         llm_config = LLMConfig.model_validate(data["llm"])
+        llm = LLMClient(
+            llm_config,
+            usage=UsageTracker.from_json(data["usage"]) if data.get("usage") else None,
+            budget=LLMBudget.model_validate(data["budget"]) if data.get("budget") else None
+        )
         graph = CognitionGraph.from_json(
             data=data["graph"],
             workers=workers,
             llm_config=llm_config,
+            llm=llm,
+            blobs=BlobStore.from_json(data["blobs"]) if data.get("blobs") else None,
         )
         agent = Agent(
             workers=workers,
@@ -80,13 +150,61 @@ class Agent:
         return agent
 
 
-    def save(self, path: str="./agent.json"):
+    def save(self, path: str="./agent.json", format: Literal["json", "binary"] = "json"):
+        '''
+        Args:
+            format: "json" for a readable JSON document, or "binary" for a compact streamed format
+                (smaller and faster for large agents, see langur.serialize). Either can be loaded with Agent.load.
+        '''
+        if format == "binary":
+            # Written alongside then renamed, since a lazily loaded agent may still be reading the old file
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                serialize.write_agent(self, f)
+            os.replace(tmp_path, path)
+            return
         with open(path, "w") as f:
             json.dump(self.to_json(), f, indent=2)
             #pickle.dump(self, f)
 
+    def compact_graph(self, archive: str = None) -> CompactionReport:
+        '''
+        Replace executed actions no pending action depends on with summary nodes, optionally archiving them to a
+        JSON lines file first. See langur.graph.compaction.
+        '''
+        return compact_graph(self.cg, archive=archive)
+
+    def enable_journal(self, path: str, compact_every: int = 10000, sync: bool = False) -> Journal:
+        '''
+        Continuously checkpoint the agent to path by journaling each graph mutation, instead of re-saving everything.
+        Load it back with Agent.load_journal. See langur.graph.journal for details.
+        '''
+        if self.journal is not None:
+            self.journal.detach()
+        self.journal = Journal(path, compact_every=compact_every, sync=sync)
+        self.journal.attach(self)
+        return self.journal
+
+    @classmethod
+    def load_journal(cls, path: str, resume: bool = True, **kwargs) -> 'Agent':
+        '''Load an agent checkpointed with enable_journal, and keep journaling to the same path if resume.'''
+        return Journal.load(path, resume=resume, **kwargs)
+
     @classmethod
-    def load(cls, path: str="./agent.json") -> 'Agent':
+    def load(cls, path: str="./agent.json", lazy: bool = False) -> 'Agent':
+        '''
+        Load an agent saved in either format.
+
+        Args:
+            lazy: For binary saves, only read nodes (and large outputs) from the file when they're accessed,
+                which is much faster for inspecting or resuming large agents. The file is kept open until
+                agent.cg.storage.close().
+        '''
+        if serialize.is_binary(path):
+            if lazy:
+                return serialize.read_agent_lazy(open(path, "rb"))
+            with open(path, "rb") as f:
+                return serialize.read_agent(f)
         with open(path, "r") as f:
             #agent = pickle.load(f)
             agent = cls.from_json(json.load(f))
@@ -71,9 +71,14 @@ class Execute(BaseBehavior):
     '''
     # def __init__(self, *plans: Plan):
     #     self.plans: list[Plan] = plans
+    def __init__(self, max_concurrency: int = None):
+        # Limit on actions running at once, see ExecutorWorker.max_concurrency
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        self.max_concurrency = max_concurrency
     
     def compile(self, behavior: 'AgentBehavior'):
-        return [ExecutorWorker()]
+        return [ExecutorWorker(max_concurrency=self.max_concurrency)]
         # nested_workers = []
         # for plan in self.plans:
         #     nested_workers.extend(plan.compile())
@@ -0,0 +1,98 @@
+'''
+Content-addressed store for large action outputs (whole files, pages, etc).
+
+With a blob store set on the graph, outputs at least `threshold` characters long are stored once, keyed by their
+SHA-256, and the action node holds a handle ("blob:sha256:<hex>") instead. Handles are resolved back into the
+content only when it's needed, e.g. when rendering an action's context into a prompt. Identical outputs are only
+stored (and saved) once.
+
+Usage:
+    agent = Langur("Summarize the repo", blobs=BlobStore("./blobs"))   # on disk
+    agent = Langur("Summarize the repo", blobs=BlobStore())            # in memory, saved along with the agent
+'''
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Optional
+
+HANDLE_PREFIX = "blob:sha256:"
+
+
+def is_handle(value) -> bool:
+    return isinstance(value, str) and value.startswith(HANDLE_PREFIX)
+
+
+class BlobStore:
+    def __init__(self, path: Optional[str] = None, threshold: int = 4096, cache_size: int = 128):
+        '''
+        Args:
+            path: Directory to keep blobs in, or None to keep them in memory (and in saved agents).
+            threshold: Minimum output length (in characters) to store as a blob.
+            cache_size: Number of recently read blobs kept in memory, when stored on disk.
+        '''
+        self.path = path
+        self.threshold = threshold
+        self.cache_size = cache_size
+        # In memory blobs, or recently read ones if on disk
+        self._blobs: OrderedDict[str, str] = OrderedDict()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, digest[:2], digest)
+
+    def put(self, data: str) -> tuple[str, bool]:
+        '''Store data, returning (its handle, whether it wasn't already stored)'''
+        digest = hashlib.sha256(data.encode()).hexdigest()
+        handle = HANDLE_PREFIX + digest
+        if self.path is None:
+            if digest in self._blobs:
+                return handle, False
+            self._blobs[digest] = data
+            return handle, True
+
+        blob_path = self._blob_path(digest)
+        if os.path.exists(blob_path):
+            return handle, False
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Write then rename, so a blob is never seen partially written
+        tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, blob_path)
+        return handle, True
+
+    def get(self, handle: str) -> str:
+        digest = handle[len(HANDLE_PREFIX):]
+        data = self._blobs.get(digest)
+        if data is not None:
+            self._blobs.move_to_end(digest)
+            return data
+        if self.path is None:
+            raise KeyError(f"Blob not found: {handle}")
+        try:
+            with open(self._blob_path(digest), "r", encoding="utf-8") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise KeyError(f"Blob not found: {handle}") from None
+        self._blobs[digest] = data
+        if len(self._blobs) > self.cache_size:
+            self._blobs.popitem(last=False)
+        return data
+
+    def resolve(self, value: Optional[str]) -> Optional[str]:
+        '''Content for a value which may be a handle'''
+        return self.get(value) if is_handle(value) else value
+
+    def to_json(self) -> dict:
+        data = {"path": self.path, "threshold": self.threshold, "cache_size": self.cache_size}
+        if self.path is None:
+            data["blobs"] = dict(self._blobs)
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'BlobStore':
+        store = cls(path=data["path"], threshold=data["threshold"], cache_size=data.get("cache_size", 128))
+        if store.path is None:
+            store._blobs.update(data.get("blobs", {}))
+        return store
@@ -0,0 +1,119 @@
+'''
+Record / replay of BAML function calls, so agents can be benchmarked and regression tested offline and deterministically.
+
+In "record" mode every call's inputs and parsed output are appended to a JSON-lines cassette file.
+In "replay" mode calls are served from the cassette instead of hitting the LLM provider.
+'''
+import hashlib
+import json
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Literal, Optional
+
+from pydantic import BaseModel
+
+CassetteMode = Literal["live", "record", "replay"]
+
+
+class CassetteMissError(RuntimeError):
+    pass
+
+
+def call_key(function_name: str, args: Dict[str, Any]) -> str:
+    data = json.dumps({"function": function_name, "args": args}, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def encode_output(value: Any) -> Any:
+    '''Encode a parsed BAML output such that the right BAML types can be rebuilt from it.'''
+    if isinstance(value, BaseModel):
+        return {"baml_type": value.__class__.__name__, "value": value.model_dump(mode="json")}
+    if isinstance(value, list):
+        return {"list": [encode_output(item) for item in value]}
+    return {"value": value}
+
+def decode_output(data: Any) -> Any:
+    from langur.baml_client import types
+    if "list" in data:
+        return [decode_output(item) for item in data["list"]]
+    if "baml_type" in data:
+        return getattr(types, data["baml_type"]).model_validate(data["value"])
+    return data["value"]
+
+
+class CassetteEntry(BaseModel):
+    function: str
+    key: str
+    node_id: Optional[str] = None
+    args: Dict[str, Any]
+    output: Any
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+
+
+class Cassette:
+    '''
+    Replayed calls are matched to recorded ones by (in order of preference):
+    1. Function name and exact inputs
+    2. Function name and the node the call was made for (inputs can differ, e.g. if an action's output includes timings)
+    3. Function name, in recorded order
+
+    Unless strict, in which case only exact matches are allowed.
+    '''
+    def __init__(self, path: str, mode: CassetteMode, strict: bool = False):
+        self.path = path
+        self.mode = mode
+        self.strict = strict
+        self._by_key: Dict[str, Deque[CassetteEntry]] = defaultdict(deque)
+        self._by_node: Dict[tuple, Deque[CassetteEntry]] = defaultdict(deque)
+        self._by_function: Dict[str, Deque[CassetteEntry]] = defaultdict(deque)
+        self._used: set[int] = set()
+
+        if mode == "replay":
+            with open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self._add(CassetteEntry.model_validate_json(line))
+        elif mode == "record":
+            # Start a fresh recording
+            open(path, "w").close()
+
+    def _add(self, entry: CassetteEntry):
+        self._by_key[entry.key].append(entry)
+        if entry.node_id is not None:
+            self._by_node[(entry.function, entry.node_id)].append(entry)
+        self._by_function[entry.function].append(entry)
+
+    def _take(self, queue: Deque[CassetteEntry]) -> Optional[CassetteEntry]:
+        while queue:
+            entry = queue.popleft()
+            if id(entry) not in self._used:
+                self._used.add(id(entry))
+                return entry
+        return None
+
+    def record(self, function_name: str, args: Dict[str, Any], output: Any, node_id: str = None, prompt_tokens: int = 0, completion_tokens: int = 0, latency: float = 0.0):
+        entry = CassetteEntry(
+            function=function_name,
+            key=call_key(function_name, args),
+            node_id=node_id,
+            args=args,
+            output=encode_output(output),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency=latency
+        )
+        # Append as we go so a crashed run still leaves a usable cassette
+        with open(self.path, "a") as f:
+            f.write(entry.model_dump_json() + "\n")
+
+    def replay(self, function_name: str, args: Dict[str, Any], node_id: str = None) -> CassetteEntry:
+        entry = self._take(self._by_key[call_key(function_name, args)])
+        if entry is None and not self.strict:
+            if node_id is not None:
+                entry = self._take(self._by_node[(function_name, node_id)])
+            if entry is None:
+                entry = self._take(self._by_function[function_name])
+        if entry is None:
+            raise CassetteMissError(f"No recorded {function_name} call left in cassette `{self.path}` (node: {node_id})")
+        return entry
@@ -3,11 +3,14 @@ General connector cognitive worker - binds real-world connectors to the Langur c
 '''
 
 from abc import ABC
+import time
 from typing import TYPE_CHECKING, Any, Callable, ClassVar, Dict, List, Optional, Type
 import inspect
 from pydantic import BaseModel, Field
 from langur.actions import ActionContext, ActionNode
 from langur.graph.node import Node
+from langur.trace import span
+from langur import metrics
 from langur.util.schema import ActionSchema, schema_from_function, schema_from_lc_tool
 from langur.util.model_builder import create_dynamic_model
 from langur.workers.worker import STATE_DONE, STATE_SETUP, Worker
@@ -20,7 +23,8 @@ def register_action(
     action: ActionSchema,
     tags: Optional[List[str]] = None,
     extra_context: Optional[Callable[[Dict[str, Any], Optional[ActionContext]], str]] = None,
-    override_connector_name: str = None
+    override_connector_name: str = None,
+    idempotent: bool = False
 ):
     #print("action.name:", action.name)
     tags = tags if tags else []
@@ -89,7 +93,9 @@ def register_action(
         {
             "definition": (ClassVar[str], action.description),
             #"input_schema": (ClassVar[dict[str, Any]], schema.json_schema["properties"])#TODO
-            "input_schema": (ClassVar[dict[str, Any]], action.baml_types)
+            "input_schema": (ClassVar[dict[str, Any]], action.baml_types),
+            "input_json_schema": (ClassVar[dict[str, dict]], action.json_schema.get("properties", {})),
+            "idempotent": (ClassVar[bool], idempotent)
         },
         func_dict,
         ActionNode
@@ -116,7 +122,8 @@ def register_action(
 def action(
     fn: Optional[Callable] = None,
     tags: Optional[List[str]] = None,
-    extra_context: Optional[Callable[[Dict[str, Any], Optional[ActionContext]], str]] = None
+    extra_context: Optional[Callable[[Dict[str, Any], Optional[ActionContext]], str]] = None,
+    idempotent: bool = False
 ):
     """
     Decorator that can be used either as @action or @action(kw1=...)
@@ -124,6 +131,8 @@ def action(
     extra_context: An additional function to return more context whenever this action is being executed.
     - The fields of this function need to match the fields of the action, except each needs a None default!
     - Should return a str which serves as context for the LLM when deciding on inputs for the action.
+    idempotent: Running the action again with the same inputs has no further effect (e.g. it only reads), so
+    planned duplicates of it can be merged. Leave False for anything with side effects.
     """
 
     def decorator(fn):
@@ -131,7 +140,8 @@ def action(
         register_action(
             action=schema,
             tags=tags,
-            extra_context=extra_context
+            extra_context=extra_context,
+            idempotent=idempotent
         )
         return fn
 
@@ -193,7 +203,10 @@ class Connector(Worker, ABC):
         return None
 
     async def cycle(self):
-        overview = self.overview()
+        start = time.perf_counter()
+        with span("overview", worker_id=self.id):
+            overview = self.overview()
+        metrics.CONNECTOR_OVERVIEW_DURATION.labels(self.__class__.__name__).observe(time.perf_counter() - start)
         has_overview = overview is not None
         connector_overview_node_id = self.__class__.__name__
 
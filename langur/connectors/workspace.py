@@ -53,7 +53,7 @@ class Workspace(Connector):
         s += "\n".join(file_list)
         return s
 
-    @action(tags=["read"])
+    @action(tags=["read"], idempotent=True)
     def read_file(self, file_path: str):#, ctx: ActionContext
         '''Read a single file's contents'''
         with self.get_fs().open(file_path, "r") as f:
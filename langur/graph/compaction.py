@@ -0,0 +1,192 @@
+'''
+Compaction of finished parts of a cognition graph, so long running agents don't keep paying for work that's done.
+
+Executed actions which no pending action depends on (even indirectly) are no longer needed as context, since an
+action's context is built from all of its upstream actions. compact_graph removes them, replacing each connected
+group of them with an ActionSummary node, which takes over the group's edges to the rest of the graph
+(e.g. "achieves" edges to the task). Pending actions and everything upstream of them are left as they are.
+
+If an archive path is given, the removed nodes (with their outputs resolved) and edges are first appended to it,
+one JSON line per summary, and can be read back with read_archive.
+
+Usage:
+    report = agent.compact_graph(archive="./archive.jsonl")   # or Langur.compact_graph
+    print(report.nodes_before, report.nodes_after, report.compacted_bytes)
+'''
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, ClassVar, Iterator, Optional
+
+from langur.blobs import HANDLE_PREFIX, is_handle
+from .edge import Edge
+from .node import Node
+
+if TYPE_CHECKING:
+    from .graph import CognitionGraph
+
+
+class ActionSummary(Node):
+    '''Stands in for a group of executed actions removed by compaction'''
+    tags: ClassVar[list[str]] = ["summary"]
+
+    action_ids: list[str]
+    # Action type name -> number of those actions
+    action_types: dict[str, int]
+    # Where the actions were archived, if they were
+    archive: Optional[str] = None
+
+
+@dataclass
+class CompactionReport:
+    nodes_before: int
+    nodes_after: int
+    edges_before: int
+    edges_after: int
+    compacted_actions: int
+    summaries: int
+    # Serialized size (JSON, outputs resolved) of the removed actions
+    compacted_bytes: int
+    # Blobs dropped from an in memory blob store because nothing refers to them anymore
+    released_blobs: int = 0
+    archive: Optional[str] = None
+
+
+def _pending_dependencies(cg: 'CognitionGraph') -> set[str]:
+    '''Ids of pending actions and of every node upstream of one'''
+    from langur.actions import ActionNode
+
+    needed = set()
+    stack = list(cg.query_pending_nodes_by_type(ActionNode))
+    while stack:
+        node = stack.pop()
+        if node.id in needed:
+            continue
+        needed.add(node.id)
+        stack.extend(node.upstream_nodes())
+    return needed
+
+
+def _groups(candidates: dict[str, Node]) -> list[list[Node]]:
+    '''Connected groups of the candidate nodes (ignoring edge direction)'''
+    groups = []
+    seen = set()
+    for node in candidates.values():
+        if node.id in seen:
+            continue
+        seen.add(node.id)
+        group = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            group.append(current)
+            for neighbor in current.upstream_nodes() | current.downstream_nodes():
+                if neighbor.id in candidates and neighbor.id not in seen:
+                    seen.add(neighbor.id)
+                    stack.append(neighbor)
+        groups.append(group)
+    return groups
+
+
+def compact_graph(cg: 'CognitionGraph', archive: Optional[str] = None) -> CompactionReport:
+    '''
+    Replace executed actions that no pending action depends on with summary nodes.
+
+    Args:
+        archive: File to append the removed nodes and edges to (as JSON lines), or None to discard them.
+    '''
+    from langur.actions import ActionNode
+
+    nodes_before, edges_before = cg.node_count(), cg.edge_count()
+    needed = _pending_dependencies(cg)
+    candidates = {
+        node.id: node for node in cg.query_nodes_by_type(ActionNode)
+        if node.output is not None and node.id not in needed
+    }
+
+    compacted_bytes = 0
+    summaries = 0
+    archive_file = open(archive, "a", encoding="utf-8") if archive and candidates else None
+    try:
+        # All or nothing, and reported to listeners as one change
+        with cg.batch():
+            for group in _groups(candidates):
+                ids = {node.id for node in group}
+                edges: set[Edge] = set()
+                for node in group:
+                    edges |= node.incoming_edges() | node.outgoing_edges()
+                # Edges to the rest of the graph, kept as (relation, other node id, whether it's outgoing)
+                external = {
+                    (edge.relation, edge.dest_node.id, True) if edge.src_node.id in ids else (edge.relation, edge.src_node.id, False)
+                    for edge in edges if not (edge.src_node.id in ids and edge.dest_node.id in ids)
+                }
+
+                nodes_data = []
+                for node in group:
+                    data = node.to_json()
+                    data["output"] = cg.resolve_output(data["output"])
+                    nodes_data.append(data)
+                compacted_bytes += sum(len(json.dumps(data)) for data in nodes_data)
+
+                action_types: dict[str, int] = {}
+                for node in group:
+                    action_types[node.action_type_name()] = action_types.get(node.action_type_name(), 0) + 1
+                summary = ActionSummary(
+                    id=f"summary-{min(ids)}",
+                    action_ids=sorted(ids),
+                    action_types=action_types,
+                    archive=archive
+                )
+                if archive_file is not None:
+                    archive_file.write(json.dumps({
+                        "summary_id": summary.id,
+                        "nodes": nodes_data,
+                        "edges": [edge.to_json() for edge in edges]
+                    }) + "\n")
+
+                for node in group:
+                    cg.remove_node(node)
+                cg.add_node(summary)
+                for relation, other_id, outgoing in external:
+                    if outgoing:
+                        cg.add_edge_by_ids(summary.id, relation, other_id)
+                    else:
+                        cg.add_edge_by_ids(other_id, relation, summary.id)
+                summaries += 1
+    finally:
+        if archive_file is not None:
+            archive_file.close()
+
+    return CompactionReport(
+        nodes_before=nodes_before,
+        nodes_after=cg.node_count(),
+        edges_before=edges_before,
+        edges_after=cg.edge_count(),
+        compacted_actions=len(candidates),
+        summaries=summaries,
+        compacted_bytes=compacted_bytes,
+        released_blobs=_release_blobs(cg) if candidates else 0,
+        archive=archive if archive_file is not None else None
+    )
+
+
+def _release_blobs(cg: 'CognitionGraph') -> int:
+    '''Drop blobs in an in memory store that no node refers to anymore'''
+    blobs = cg.blobs
+    if blobs is None or blobs.path is not None:
+        return 0
+    from langur.actions import ActionNode
+
+    referenced = {
+        node.output[len(HANDLE_PREFIX):] for node in cg.query_nodes_by_type(ActionNode) if is_handle(node.output)
+    }
+    unused = [digest for digest in blobs._blobs if digest not in referenced]
+    for digest in unused:
+        del blobs._blobs[digest]
+    return len(unused)
+
+
+def read_archive(path: str) -> Iterator[dict]:
+    '''Archived groups, as dicts of summary_id, nodes (Node.to_json) and edges (Edge.to_json)'''
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
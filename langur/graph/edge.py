@@ -1,30 +1,45 @@
+import sys
 from typing import TYPE_CHECKING
 
-from pydantic import BaseModel, Field
-
 if TYPE_CHECKING:
     from .node import Node
 
 class Edge():
-    '''Graph Edge'''
+    '''
+    Graph Edge. Slotted, since graphs have a lot of them, and compared by the identity of its nodes
+    (there are cases where multiple nodes have the same ID), with the hash computed once from their IDs.
+    '''
+    __slots__ = ("src_node", "relation", "dest_node", "_hash")
 
     def __init__(self, src_node: 'Node', relation: str, dest_node: 'Node'):
         # note: don't reassign src_node / dest_node directly cus edges wont be tracked correctly, should redesign to make this clearer
-        self.src_node = src_node
-        self.dest_node = dest_node
-        self.relation = relation
+        self._set(src_node, relation, dest_node)
         src_node.add_edge(self)
         dest_node.add_edge(self)
+
+    def _set(self, src_node: 'Node', relation: str, dest_node: 'Node'):
+        self.src_node = src_node
+        self.dest_node = dest_node
+        # Only a handful of distinct relations, so share one string for each
+        self.relation = sys.intern(relation)
+        self._hash = hash((src_node.id, self.relation, dest_node.id))
+
+    @classmethod
+    def detached(cls, src_node: 'Node', relation: str, dest_node: 'Node') -> 'Edge':
+        '''Edge which isn't added to its nodes' edges, for storage that keeps edges elsewhere'''
+        edge = cls.__new__(cls)
+        edge._set(src_node, relation, dest_node)
+        return edge
     
     def __hash__(self):
-        return hash((self.src_node.id, self.relation, self.dest_node.id))
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Edge):
             return False
-        # There are cases where multiple nodes have same ID, so check node refs here
-        return (self.src_node, self.relation, self.dest_node) == (other.src_node, other.relation, other.dest_node)
-        #return hash(self) == hash(other)
+        return self.src_node is other.src_node and self.dest_node is other.dest_node and self.relation == other.relation
 
     def __str__(self):
         return f"{self.src_node.id} {self.relation} {self.dest_node.id}"
@@ -39,4 +54,4 @@ class Edge():
             "relation": self.relation,
             "src_node_id": self.src_node.id,
             "dest_node_id": self.dest_node.id
-        }
\ No newline at end of file
+        }
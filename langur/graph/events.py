@@ -0,0 +1,200 @@
+'''
+Typed events for changes to a cognition graph, so consumers (viewers, savers, counters, schedulers) can follow
+what changed instead of re-scanning the graph.
+
+Subscribe with a handler called synchronously for each event, or with a bounded asyncio queue:
+    cg.subscribe(on_output, events=[NodeUpdated], fields=["output"])
+
+    subscription = cg.subscribe_queue(maxsize=1000)
+    async for event in subscription:
+        ...
+
+Changes made in a CognitionGraph.batch() are delivered once it's committed (and never if it's rolled back).
+Node and worker field changes are only seen when fields are reassigned (node.output = ...), not mutated in place.
+'''
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, ClassVar, Iterable, Literal, Optional, Type
+
+
+@dataclass
+class GraphEvent:
+    # Mutation op this event is made from, see CognitionGraph.add_listener
+    op: ClassVar[str]
+
+
+@dataclass
+class NodeAdded(GraphEvent):
+    op: ClassVar[str] = "add_node"
+    node_id: str
+    node_type: str
+    # Node.to_json
+    data: dict
+
+
+@dataclass
+class NodeRemoved(GraphEvent):
+    op: ClassVar[str] = "remove_node"
+    node_id: str
+
+
+@dataclass
+class NodeUpdated(GraphEvent):
+    '''A node's field was reassigned, e.g. an ActionNode's output when it's executed, or inputs when filled'''
+    op: ClassVar[str] = "update_node"
+    node_id: str
+    node_type: str
+    field: str
+    # New value, as JSON
+    value: Any
+
+
+@dataclass
+class EdgeAdded(GraphEvent):
+    op: ClassVar[str] = "add_edge"
+    src_node_id: str
+    relation: str
+    dest_node_id: str
+
+
+@dataclass
+class EdgeRemoved(GraphEvent):
+    op: ClassVar[str] = "remove_edge"
+    src_node_id: str
+    relation: str
+    dest_node_id: str
+
+
+@dataclass
+class WorkerAdded(GraphEvent):
+    op: ClassVar[str] = "add_worker"
+    worker_id: str
+    # Worker.to_json
+    data: dict
+
+
+@dataclass
+class WorkerUpdated(GraphEvent):
+    '''A worker's field was reassigned, most often its state'''
+    op: ClassVar[str] = "update_worker"
+    worker_id: str
+    field: str
+    value: Any
+
+
+@dataclass
+class BlobAdded(GraphEvent):
+    '''A new output was put in an in memory blob store'''
+    op: ClassVar[str] = "add_blob"
+    handle: str
+
+
+def to_events(op: str, data: dict) -> list[GraphEvent]:
+    '''Typed events for a mutation reported to a graph listener (a batch is flattened into its events)'''
+    if op == "batch":
+        return [event for entry in data["ops"] for event in to_events(entry["op"], entry)]
+    if op == "add_node":
+        return [NodeAdded(node_id=data["node"]["id"], node_type=data["node"]["node_type"], data=data["node"])]
+    if op == "remove_node":
+        return [NodeRemoved(node_id=data["id"])]
+    if op == "update_node":
+        return [NodeUpdated(node_id=data["id"], node_type=data["node_type"], field=data["field"], value=data["value"])]
+    if op == "add_edge":
+        return [EdgeAdded(src_node_id=data["src_node_id"], relation=data["relation"], dest_node_id=data["dest_node_id"])]
+    if op == "remove_edge":
+        return [EdgeRemoved(src_node_id=data["src_node_id"], relation=data["relation"], dest_node_id=data["dest_node_id"])]
+    if op == "add_worker":
+        return [WorkerAdded(worker_id=data["worker"]["id"], data=data["worker"])]
+    if op == "update_worker":
+        return [WorkerUpdated(worker_id=data["id"], field=data["field"], value=data["value"])]
+    if op == "add_blob":
+        return [BlobAdded(handle=data["handle"])]
+    raise ValueError(f"Unknown graph mutation: {op}")
+
+
+class Subscription:
+    '''
+    Graph listener which turns mutations into typed events and passes on those wanted to a handler.
+    Created by CognitionGraph.subscribe, stop it with close().
+    '''
+    def __init__(self, handler: Callable[[GraphEvent], None], events: Iterable[Type[GraphEvent]] = None, fields: Iterable[str] = None):
+        '''
+        Args:
+            events: Event types wanted, or None for all.
+            fields: Only pass on NodeUpdated / WorkerUpdated events for these fields, or None for all.
+        '''
+        self.handler = handler
+        self.events = tuple(events) if events is not None else None
+        # Ops wanted, checked before creating events
+        self._ops = {event_type.op for event_type in self.events} | {"batch"} if self.events is not None else None
+        self.fields = set(fields) if fields is not None else None
+        self.cg = None
+
+    def wants(self, event: GraphEvent) -> bool:
+        if self.events is not None and not isinstance(event, self.events):
+            return False
+        if self.fields is not None and isinstance(event, (NodeUpdated, WorkerUpdated)) and event.field not in self.fields:
+            return False
+        return True
+
+    def __call__(self, op: str, data: dict):
+        if self._ops is not None and op not in self._ops:
+            return
+        for event in to_events(op, data):
+            if self.wants(event):
+                self.handler(event)
+
+    def close(self):
+        if self.cg is not None:
+            self.cg.remove_listener(self)
+            self.cg = None
+
+
+class QueueSubscription(Subscription):
+    '''
+    Subscription buffering events for an asyncio consumer, up to maxsize of them.
+    When full, the oldest (or newest) events are dropped and counted in `dropped`, since changes can't wait for
+    the consumer. A consumer which sees drops should re-read what it needs from the graph.
+    '''
+    def __init__(self, maxsize: int = 1000, overflow: Literal["drop_oldest", "drop_newest"] = "drop_oldest", **kwargs):
+        super().__init__(handler=self._put, **kwargs)
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self._buffer: deque[GraphEvent] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    def _put(self, event: GraphEvent):
+        if len(self._buffer) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return
+            self._buffer.popleft()
+        self._buffer.append(event)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def qsize(self) -> int:
+        return len(self._buffer)
+
+    def get_nowait(self) -> GraphEvent:
+        '''Next buffered event, raises asyncio.QueueEmpty if there isn't one'''
+        if not self._buffer:
+            raise asyncio.QueueEmpty()
+        return self._buffer.popleft()
+
+    async def get(self) -> GraphEvent:
+        while not self._buffer:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._buffer.popleft()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> GraphEvent:
+        return await self.get()
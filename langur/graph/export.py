@@ -0,0 +1,254 @@
+'''
+Export of cognition graphs to files for other tools, with levels of detail for graphs too large to view whole.
+
+Nodes and edges are streamed from the graph's storage straight to the file (GraphML, or graphology's JSON format
+which Sigma.js and Gephi Lite read), without building a networkx graph. For large plans, ExportOptions can:
+    - cluster actions into one node per connector, or per task they contribute to
+    - collapse chains of executed actions into single nodes
+    - cap how much of each node's attributes (e.g. action outputs) is exported
+
+Usage:
+    export_graph(cg, "plan.graphml", cluster_by="task", collapse_chains=True)
+    agent.save_graph_html("plan.html", cluster_by="connector")
+'''
+import json
+import os
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Iterator, Literal, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from .graph import CognitionGraph
+
+
+class ExportOptions(BaseModel):
+    '''Level of detail of an exported graph'''
+    # Replace actions with one node per connector, or per task they (eventually) achieve
+    cluster_by: Optional[Literal["connector", "task"]] = None
+    # Replace chains of executed actions, each the only dependency of the next, with one node per chain.
+    # Not used for actions which are clustered.
+    collapse_chains: bool = False
+    # Truncate attributes (nested ones as JSON) longer than this many characters, None to export them whole
+    max_attribute_chars: Optional[int] = 200
+    # Only export these node fields (besides node_class and status), None for all
+    fields: Optional[list[str]] = None
+
+
+class _Group:
+    '''Actions exported as one node'''
+    def __init__(self, node_class: str, label: str):
+        self.node_class = node_class
+        self.label = label
+        self.count = 0
+        self.done = 0
+        self.action_types: dict[str, int] = defaultdict(int)
+
+    def attributes(self) -> dict:
+        return {
+            "node_class": self.node_class,
+            "label": self.label,
+            "status": "done" if self.done == self.count else "pending",
+            "count": self.count,
+            "done": self.done,
+            "action_types": json.dumps(dict(self.action_types))
+        }
+
+
+def _attribute(value: Any, max_chars: Optional[int]) -> Any:
+    if isinstance(value, (dict, list)):
+        # Nested values as JSON so they can be read in viewers instead of [object Object]
+        value = json.dumps(value)
+    if max_chars is not None and isinstance(value, str) and len(value) > max_chars:
+        value = value[:max_chars] + f"... ({len(value)} chars)"
+    return value
+
+
+def _groups(cg: 'CognitionGraph', options: ExportOptions) -> dict[str, str]:
+    '''Node id -> id of the node it's exported as, for actions which are clustered or in collapsed chains'''
+    from langur.actions import ActionNode
+
+    actions = {node.id: node for node in cg.query_nodes_by_type(ActionNode)}
+    group_of: dict[str, str] = {}
+    if options.cluster_by == "connector":
+        for node in actions.values():
+            group_of[node.id] = f"cluster:{node.connector_id}"
+        return group_of
+
+    incoming = defaultdict(list)
+    outgoing = defaultdict(list)
+    for edge in cg.storage.iter_edges():
+        incoming[edge.dest_node.id].append(edge.src_node.id)
+        outgoing[edge.src_node.id].append(edge.dest_node.id)
+
+    if options.cluster_by == "task":
+        from langur.workers.task import TaskNode
+
+        # Each action goes with the first task found downstream of it
+        for task in sorted(cg.query_nodes_by_type(TaskNode), key=lambda node: node.id):
+            stack = list(incoming[task.id])
+            while stack:
+                node_id = stack.pop()
+                if node_id in actions and node_id not in group_of:
+                    group_of[node_id] = f"cluster:{task.id}"
+                    stack.extend(incoming[node_id])
+        for node_id in actions.keys() - group_of.keys():
+            group_of[node_id] = "cluster:unassigned"
+        return group_of
+
+    if options.collapse_chains:
+        def executed(node_id: str) -> bool:
+            return node_id in actions and actions[node_id].output is not None
+
+        def linked(src_id: str) -> Optional[str]:
+            '''The next action in a chain after src_id, if there is one'''
+            if len(outgoing[src_id]) == 1:
+                dest_id = outgoing[src_id][0]
+                if len(incoming[dest_id]) == 1 and executed(dest_id):
+                    return dest_id
+            return None
+
+        for node_id in actions:
+            # Start chains at executed actions which don't continue one
+            if not executed(node_id):
+                continue
+            previous_id = incoming[node_id][0] if len(incoming[node_id]) == 1 else None
+            if previous_id is not None and executed(previous_id) and linked(previous_id) == node_id:
+                continue
+            chain = [node_id]
+            while (next_id := linked(chain[-1])) is not None:
+                chain.append(next_id)
+            if len(chain) > 1:
+                for chain_id in chain:
+                    group_of[chain_id] = f"chain:{node_id}"
+    return group_of
+
+
+def iter_graph(cg: 'CognitionGraph', options: ExportOptions = None) -> Iterator[tuple]:
+    '''
+    Nodes then edges of the graph at the given level of detail, as ("node", id, attributes) and
+    ("edge", src id, dest id, attributes). Edges between grouped nodes are merged, with a count.
+    '''
+    from langur.actions import ActionNode
+
+    options = options if options is not None else ExportOptions()
+    group_of = _groups(cg, options) if options.cluster_by or options.collapse_chains else {}
+    groups: dict[str, _Group] = {}
+
+    for node in cg.storage.iter_nodes():
+        group_id = group_of.get(node.id)
+        if group_id is not None:
+            group = groups.get(group_id)
+            if group is None:
+                kind, _, key = group_id.partition(":")
+                group = groups[group_id] = _Group("Cluster" if kind == "cluster" else "Chain", key)
+            group.count += 1
+            group.done += node.output is not None
+            group.action_types[node.action_type_name()] += 1
+            continue
+
+        data = node.to_json()
+        attributes = {"node_class": type(node).__name__}
+        if isinstance(node, ActionNode):
+            attributes["status"] = "pending" if node.output is None else "done"
+        for key, value in data.items():
+            if key == "id" or (options.fields is not None and key not in options.fields):
+                continue
+            attributes[key] = _attribute(value, options.max_attribute_chars)
+        yield "node", node.id, attributes
+
+    for group_id, group in groups.items():
+        yield "node", group_id, group.attributes()
+
+    merged: dict[tuple[str, str, str], int] = defaultdict(int)
+    for edge in cg.storage.iter_edges():
+        src_id, dest_id = edge.src_node.id, edge.dest_node.id
+        if src_id not in group_of and dest_id not in group_of:
+            yield "edge", src_id, dest_id, {"label": edge.relation}
+            continue
+        src_id, dest_id = group_of.get(src_id, src_id), group_of.get(dest_id, dest_id)
+        if src_id != dest_id:
+            merged[(src_id, edge.relation, dest_id)] += 1
+    for (src_id, relation, dest_id), count in merged.items():
+        yield "edge", src_id, dest_id, {"label": relation, "count": count}
+
+
+def _write_json(records: Iterator[tuple], f):
+    '''Graphology's serialization format'''
+    f.write('{"options":{"type":"directed","multi":true,"allowSelfLoops":true},"nodes":[')
+    first = True
+    in_edges = False
+    for record in records:
+        if record[0] == "node":
+            entry = {"key": record[1], "attributes": record[2]}
+        else:
+            if not in_edges:
+                f.write('],"edges":[')
+                in_edges, first = True, True
+            entry = {"source": record[1], "target": record[2], "attributes": record[3]}
+        f.write(("" if first else ",") + json.dumps(entry))
+        first = False
+    if not in_edges:
+        f.write('],"edges":[')
+    f.write("]}\n")
+
+
+_GRAPHML_TYPES = {bool: "boolean", int: "long", float: "double", str: "string"}
+
+
+def _write_graphml(records: Iterator[tuple], f, path: str):
+    # GraphML declares attribute keys before the graph, so the graph is written to a temporary file first
+    # while the keys used are collected
+    keys: dict[tuple[str, str], str] = {}
+    body_path = path + ".body.tmp"
+    try:
+        with open(body_path, "w", encoding="utf-8") as body:
+            for record in records:
+                if record[0] == "node":
+                    domain, attributes = "node", record[2]
+                    body.write(f"<node id={quoteattr(record[1])}>")
+                else:
+                    domain, attributes = "edge", record[3]
+                    body.write(f"<edge source={quoteattr(record[1])} target={quoteattr(record[2])}>")
+                for key, value in attributes.items():
+                    if value is None:
+                        continue
+                    value_type = _GRAPHML_TYPES.get(type(value), "string")
+                    # Keys with values of different types are declared as strings, which any value can be read as
+                    if keys.setdefault((domain, key), value_type) != value_type:
+                        keys[(domain, key)] = "string"
+                    if isinstance(value, bool):
+                        value = str(value).lower()
+                    body.write(f"<data key={quoteattr(domain[0] + '_' + key)}>{escape(str(value))}</data>")
+                body.write(f"</{domain}>\n")
+
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for (domain, key), value_type in keys.items():
+            f.write(f'<key id={quoteattr(domain[0] + "_" + key)} for="{domain}" attr.name={quoteattr(key)} attr.type="{value_type}"/>\n')
+        f.write('<graph edgedefault="directed">\n')
+        with open(body_path, "r", encoding="utf-8") as body:
+            while chunk := body.read(1 << 20):
+                f.write(chunk)
+        f.write("</graph>\n</graphml>\n")
+    finally:
+        if os.path.exists(body_path):
+            os.remove(body_path)
+
+
+def export_graph(cg: 'CognitionGraph', path: str, format: Literal["json", "graphml"] = None, options: ExportOptions = None, **kwargs):
+    '''
+    Stream the graph to a GraphML or (graphology) JSON file, by default chosen by the path's extension.
+    Level of detail options can be given as ExportOptions or as keyword arguments.
+    '''
+    options = options if options is not None else ExportOptions(**kwargs)
+    if format is None:
+        format = "graphml" if path.endswith(".graphml") else "json"
+    records = iter_graph(cg, options)
+    with open(path, "w", encoding="utf-8") as f:
+        if format == "graphml":
+            _write_graphml(records, f, path)
+        elif format == "json":
+            _write_json(records, f)
+        else:
+            raise ValueError(f"Unknown export format: {format}")
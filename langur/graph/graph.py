@@ -1,14 +1,17 @@
 import json
-from typing import Callable, ClassVar, Set, Type, TypeVar
+from contextlib import contextmanager
+from typing import Any, Callable, ClassVar, Iterator, Optional, Set, Type, TypeVar
 from baml_py import ClientRegistry
-import networkx as nx
-from ipysigma import Sigma
 
-from langur.llm import LLMConfig
+from langur.blobs import BlobStore
+from langur.llm import LLMClient, LLMConfig
 from langur.util.type_index import TypeIndex
 from langur.workers.worker import STATE_DONE
 from .node import Node
 from .edge import Edge
+from .events import GraphEvent, QueueSubscription, Subscription
+from .export import ExportOptions, export_graph, iter_graph
+from .storage import GraphStorage, MemoryStorage
 
 from typing import TYPE_CHECKING
 
@@ -21,30 +24,179 @@ class NodeCollisionError(RuntimeError):
 N = TypeVar('N', bound='Node')#, Node)
 W = TypeVar('W', bound='Worker')
 
+# Called with (op, data) after each mutation, see add_listener
+MutationListener = Callable[[str, dict[str, Any]], None]
+
+class GraphBatch:
+    '''Mutations made in a CognitionGraph.batch(), kept until it's committed or rolled back'''
+    def __init__(self):
+        # (op, *args) to undo each mutation, in the order they were made
+        self.undo: list[tuple] = []
+        # Listener events, sent together on commit
+        self.events: list[dict[str, Any]] = []
+
 # TODO: Combine with low-level Agent and factor out actual graph component
 
 class CognitionGraph:
-    def __init__(self, workers: list['Worker'], llm_config: LLMConfig):#cr: ClientRegistry):
-        self._node_map: dict[str, Node] = {}
-        self._node_type_index: TypeIndex[Node] = TypeIndex()
-        self.edges: set[Edge] = set()
+    def __init__(self, workers: list['Worker'], llm_config: LLMConfig, llm: LLMClient = None, storage: GraphStorage = None, blobs: BlobStore = None):#cr: ClientRegistry):
+        # Where nodes and edges are kept, in memory by default (see langur.graph.storage)
+        self.storage = storage if storage else MemoryStorage()
+        self.storage.bind(self)
+        # If set, large action outputs are kept here and nodes hold handles to them (see langur.blobs)
+        self.blobs = blobs
 
         self._worker_map: dict[str, 'Worker'] = {}
         self._worker_type_index: TypeIndex['Worker'] = TypeIndex()
 
+        self._listeners: list[MutationListener] = []
+        self._batch: Optional[GraphBatch] = None
+
         for worker in workers:
             self.add_worker(worker)
 
         self.llm_config = llm_config
+        # All BAML calls made by workers should go through this client so they are accounted for
+        self.llm = llm if llm else LLMClient(llm_config)
 
     def get_client_registry(self) -> ClientRegistry:
-        return self.llm_config.to_registry()
+        return self.llm.get_client_registry()
+
+    def add_listener(self, listener: MutationListener):
+        '''
+        Call listener(op, data) after every mutation of the graph, where op is one of:
+        add_node, remove_node, add_edge, remove_edge, update_node, add_worker, update_worker,
+        add_blob (new output in an in memory blob store).
+        Data is JSON serializable (e.g. see langur.graph.journal).
+
+        Mutations made in a batch() are instead reported once it's committed, as a single "batch" op
+        with data {"ops": [{"op": ..., **data}, ...]}.
+        '''
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: MutationListener):
+        self._listeners.remove(listener)
+
+    def subscribe(self, handler: Callable[[GraphEvent], None], events: list[Type[GraphEvent]] = None, fields: list[str] = None) -> Subscription:
+        '''
+        Call handler with typed events (see langur.graph.events) as the graph changes.
+
+        Args:
+            events: Event types wanted (e.g. [NodeAdded, NodeUpdated]), or None for all.
+            fields: Only report node / worker updates to these fields (e.g. ["output", "inputs"]), or None for all.
+        '''
+        subscription = Subscription(handler, events=events, fields=fields)
+        subscription.cg = self
+        self.add_listener(subscription)
+        return subscription
+
+    def subscribe_queue(self, maxsize: int = 1000, events: list[Type[GraphEvent]] = None, fields: list[str] = None, **kwargs) -> QueueSubscription:
+        '''
+        Buffer typed events as the graph changes for an asyncio consumer to read with `await subscription.get()`
+        or `async for event in subscription`. At most maxsize are kept, see QueueSubscription.
+        '''
+        subscription = QueueSubscription(maxsize=maxsize, events=events, fields=fields, **kwargs)
+        subscription.cg = self
+        self.add_listener(subscription)
+        return subscription
+
+    def _emit(self, op: str, **data):
+        if self._batch is not None:
+            self._batch.events.append({"op": op, **data})
+            return
+        for listener in self._listeners:
+            listener(op, data)
+
+    @contextmanager
+    def batch(self) -> Iterator[GraphBatch]:
+        '''
+        Make a group of mutations all or nothing: if the block raises, every node and edge added, removed or
+        updated in it is put back the way it was. Listeners are notified once, when the outermost batch commits,
+        and storage can defer index maintenance (and SQLite commits) until then.
+
+        Mutations are applied as they're made, so can be queried within the block. Nested batches roll back
+        only their own mutations. Don't await inside a batch, or other tasks' mutations may end up in it.
+
+        Usage:
+            with cg.batch():
+                cg.add_node(...)
+                cg.add_edge_by_ids(...)
+        '''
+        outermost = self._batch is None
+        if outermost:
+            self._batch = GraphBatch()
+            self.storage.begin_batch()
+        batch = self._batch
+        undo_mark, event_mark = len(batch.undo), len(batch.events)
+        try:
+            yield batch
+        except BaseException:
+            self._rollback(batch, undo_mark)
+            del batch.events[event_mark:]
+            raise
+        finally:
+            if outermost:
+                self._batch = None
+                self.storage.end_batch()
+        if outermost and batch.events and self._listeners:
+            self._emit("batch", ops=batch.events)
+
+    def _record(self, *undo):
+        if self._batch is not None:
+            self._batch.undo.append(undo)
+
+    def _rollback(self, batch: GraphBatch, mark: int):
+        '''Undo a batch's mutations (without notifying listeners) back to where it had mark of them'''
+        while len(batch.undo) > mark:
+            op, *args = batch.undo.pop()
+            if op == "add_node":
+                self.storage.remove_node(args[0])
+                args[0]._cg = None
+            elif op == "remove_node":
+                args[0]._cg = self
+                self.storage.add_node(args[0])
+            elif op == "add_edge":
+                self.storage.remove_edge(args[0])
+            elif op == "remove_edge":
+                edge = args[0]
+                edge.src_node.add_edge(edge)
+                edge.dest_node.add_edge(edge)
+                self.storage.add_edge(edge)
+            elif op == "update_node":
+                node, field, old_value = args
+                # Set directly, as reassigning would be reported as another update
+                node.__dict__[field] = old_value
+                self.storage.update_node(node, field)
+
+    def store_output(self, output: str) -> str:
+        '''What to keep as an action node's output: a blob handle if it's large and there's a blob store'''
+        if self.blobs is None or len(output) < self.blobs.threshold:
+            return output
+        handle, new = self.blobs.put(output)
+        if new and self.blobs.path is None and self._listeners:
+            # In memory blobs aren't persisted anywhere else
+            self._emit("add_blob", handle=handle, data=output)
+        return handle
+
+    def resolve_output(self, output: str | None) -> str | None:
+        '''Content of an action node's output, which may be a blob handle'''
+        if self.blobs is None:
+            return output
+        return self.blobs.resolve(output)
+
+    def _node_updated(self, node: Node, field: str, old_value: Any):
+        '''Called when a field of a node in this graph is reassigned'''
+        self._record("update_node", node, field, old_value)
+        self.storage.update_node(node, field)
+        if self._listeners:
+            self._emit("update_node", id=node.id, node_type=type(node).__name__, field=field, value=node.model_dump(mode="json", include={field})[field])
 
     def add_worker(self, worker: 'Worker'):
         worker.cg = self
         self._worker_map[worker.id] = worker
         self._worker_type_index.add(worker)
         #self._workers.append(worker)
+        if self._listeners:
+            self._emit("add_worker", worker=worker.to_json())
     
     def get_workers(self):
         return self._worker_type_index.get_all()
@@ -68,21 +220,36 @@ class CognitionGraph:
         return self.worker_count(state=STATE_DONE) == self.worker_count()
         #return len(self.get_workers_with_state(STATE_DONE)) == len(self.workers)
 
+    def node_count(self) -> int:
+        return self.storage.node_count()
+
+    def edge_count(self) -> int:
+        return self.storage.edge_count()
+
     def get_nodes(self) -> set[Node]:
-        return set(self._node_map.values())
+        return set(self.storage.iter_nodes())
 
     def get_edges(self) -> set[Edge]:
-        return self.edges
+        if isinstance(self.storage, MemoryStorage):
+            return self.storage.edges
+        return set(self.storage.iter_edges())
+
+    @property
+    def edges(self) -> set[Edge]:
+        return self.get_edges()
 
     def add_node(self, node: Node):
-        if node.id in self._node_map:
+        if self.storage.get_node(node.id) is not None:
             raise NodeCollisionError("Node ID collision when adding node:", node)
-        self._node_map[node.id] = node
-        self._node_type_index.add(node)
+        node._cg = self
+        self.storage.add_node(node)
+        self._record("add_node", node)
         #self.nodes.add(node)
+        if self._listeners:
+            self._emit("add_node", node=node.to_json())
     
     def has_node(self, node: Node) -> bool:
-        return node in self.get_nodes()
+        return self.storage.has_node(node)
 
     def add_edge(self, edge: Edge):
         # Make sure nodes are in graph
@@ -92,7 +259,10 @@ class CognitionGraph:
         if not self.has_node(edge.dest_node):
             self.add_node(edge.dest_node)
             #raise RuntimeError(f"Edge includes node not in graph: {edge.dest_node}")
-        self.edges.add(edge)
+        self.storage.add_edge(edge)
+        self._record("add_edge", edge)
+        if self._listeners:
+            self._emit("add_edge", **edge.to_json())
     
     def add_edge_by_ids(self, src_id: str, relation: str, dest_id: str):
         src_node = self.query_node_by_id(src_id)
@@ -101,41 +271,45 @@ class CognitionGraph:
             raise RuntimeError(f"Invalid edge added, missing node with ID: `{src_id}`")
         if not dest_node:
             raise RuntimeError(f"Invalid edge added, missing node with ID: `{dest_id}`")
-        self.edges.add(Edge(src_node, relation, dest_node))
-
-    def to_networkx(self):
+        edge = Edge(src_node, relation, dest_node)
+        self.storage.add_edge(edge)
+        self._record("add_edge", edge)
+        if self._listeners:
+            self._emit("add_edge", **edge.to_json())
+
+    def to_networkx(self, options: ExportOptions = None):
+        '''The graph as networkx, in full detail unless options are given (see langur.graph.export)'''
+        # Visualization dependencies are slow to import, so only load them when used
+        import networkx as nx
         g = nx.DiGraph()
-        for node in self.get_nodes():
-            # Convert any nested json in node properties to string so can be seen properly instead of [object Object]
-            data = node.to_json()
-            for key in data.keys():
-                if isinstance(data[key], dict):
-                    data[key] = json.dumps(data[key])
-            g.add_node(node.id, node_class=node.__class__.__name__, **data)
-        for edge in self.edges:
-            g.add_edge(edge.src_node.id, edge.dest_node.id, label=edge.relation)
+        for record in iter_graph(self, options if options is not None else ExportOptions(max_attribute_chars=None)):
+            if record[0] == "node":
+                g.add_node(record[1], id=record[1], **record[2])
+            else:
+                g.add_edge(record[1], record[2], **record[3])
         return g
 
+    def export(self, path: str, **kwargs):
+        '''Stream the graph to a GraphML or JSON file, see langur.graph.export.export_graph for options'''
+        export_graph(self, path, **kwargs)
+
     def query_node_by_id(self, node_id: str) -> Node | None:
-        try:
-            return self._node_map[node_id]
-        except KeyError:
-            return None
+        return self.storage.get_node(node_id)
     
     def query_nodes_by_tag(self, *tags: str) -> set[Node]:
         '''Get all nodes with at least one of the provided tags'''
-        # could make more efficient with some kind of caching, idk if necessary
-        matches = set()
-        for node in self.get_nodes():
-            for tag in tags:
-                if tag in node.get_tags():
-                    matches.add(node)
-                    break
-        return matches
+        return self.storage.nodes_by_tag(*tags)
 
     def query_nodes_by_type(self, node_type: Type[N]) -> Set[N]:
         """Query nodes by type, including subclass instances"""
-        return self._node_type_index.get_by_type(node_type)
+        return self.storage.nodes_by_type(node_type)
+
+    def query_pending_nodes_by_type(self, node_type: Type[N]) -> Set[N]:
+        """Query nodes by type without an output yet (e.g. unexecuted actions), without loading the rest from storage"""
+        return self.storage.pending_nodes_by_type(node_type)
+
+    def count_nodes_by_type(self, node_type: Type[N]) -> int:
+        return self.storage.count_by_type(node_type)
 
     # TODO: make so can query by type directly or by class name
     def query_workers(self, worker_type: Type[W]) -> Set[W]:
@@ -146,44 +320,59 @@ class CognitionGraph:
         return self._worker_map[worker_id]
 
     def remove_edge(self, edge: Edge):
-        edge.src_node.edges.remove(edge)
-        edge.dest_node.edges.remove(edge)
-        self.edges.remove(edge)
+        self.storage.remove_edge(edge)
+        self._record("remove_edge", edge)
+        if self._listeners:
+            self._emit("remove_edge", **edge.to_json())
     
     def remove_node(self, node: Node):
-        edges = node.edges.copy()
+        edges = node.incoming_edges() | node.outgoing_edges()
         for edge in edges:
             self.remove_edge(edge)
-        del self._node_map[node.id]
-        self._node_type_index.remove(node)
+        self.storage.remove_node(node)
+        node._cg = None
+        self._record("remove_node", node)
+        if self._listeners:
+            self._emit("remove_node", id=node.id)
 
     def substitute(self, node_id: str, replacements: list[Node], keep_incoming=True, keep_outgoing=True):#, ignore_dupe_ids=False):
         '''Replace a node by swapping it out for one or more nodes, which will each assume all incoming and outgoing edges of the replaced node'''
         to_replace = self.query_node_by_id(node_id)
         # copy cus deleting as we go
-        to_replace_edges_copy = to_replace.edges.copy()
-        self.remove_node(to_replace)
-
-        for node in replacements:
-            self.add_node(node)
-            for edge in to_replace_edges_copy:
-                if to_replace == edge.src_node and keep_outgoing:
-                    #new_edge.src_node = node
-                    new_edge = Edge(node, edge.relation, edge.dest_node)
-                    self.add_edge(new_edge)
-                if to_replace == edge.dest_node and keep_incoming:
-                    #new_edge.dest_node = node
-                    new_edge = Edge(edge.src_node, edge.relation, node)
-                    self.add_edge(new_edge)
-
-    def show(self):
+        to_replace_edges_copy = to_replace.incoming_edges() | to_replace.outgoing_edges()
+        with self.batch():
+            self.remove_node(to_replace)
+
+            for node in replacements:
+                self.add_node(node)
+                for edge in to_replace_edges_copy:
+                    if to_replace == edge.src_node and keep_outgoing:
+                        #new_edge.src_node = node
+                        new_edge = Edge(node, edge.relation, edge.dest_node)
+                        self.add_edge(new_edge)
+                    if to_replace == edge.dest_node and keep_incoming:
+                        #new_edge.dest_node = node
+                        new_edge = Edge(edge.src_node, edge.relation, node)
+                        self.add_edge(new_edge)
+
+    def show(self, **kwargs):
+        '''Show the graph in a notebook, with level of detail options as for export (e.g. cluster_by="task")'''
+        from ipysigma import Sigma
         return Sigma(
-            self.to_networkx(),
+            self.to_networkx(ExportOptions(**kwargs) if kwargs else None),
             **self._sigma_params()
         )
 
-    def save_graph_html(self, path: str):
-        Sigma.write_html(self.to_networkx(), path, fullscreen=True, **self._sigma_params())
+    def save_graph_html(self, path: str, **kwargs):
+        '''Save the graph as an HTML page, with level of detail options as for export (e.g. cluster_by="task")'''
+        from ipysigma import Sigma
+        # Same as Sigma.write_html(..., fullscreen=True), but closing the widget after, since exports include the
+        # state of every open widget (so each save would also contain all the graphs saved before it)
+        sigma = Sigma(self.to_networkx(ExportOptions(**kwargs) if kwargs else None), height=None, raw_height="calc(100vh - 16px)", **self._sigma_params())
+        try:
+            sigma.to_html(path)
+        finally:
+            sigma.close()
     
     def _sigma_params(self):
         return dict(
@@ -199,18 +388,18 @@ class CognitionGraph:
     def describe(self) -> str:
         # naive
         s = ""
-        for edge in self.edges:
+        for edge in self.storage.iter_edges():
             s += f"{edge.src_node.id}->{edge.dest_node.id}\n"
         return s
 
     def to_json(self) -> dict:
         return {
-            "nodes": [node.to_json() for node in self.get_nodes()],
-            "edges": [edge.to_json() for edge in self.get_edges()]
+            "nodes": [node.to_json() for node in self.storage.iter_nodes()],
+            "edges": [edge.to_json() for edge in self.storage.iter_edges()]
         }
 
     @classmethod
-    def from_json(cls, data: dict, workers: list['Worker'], llm_config: LLMConfig) -> 'CognitionGraph':
+    def from_json(cls, data: dict, workers: list['Worker'], llm_config: LLMConfig, llm: LLMClient = None, blobs: BlobStore = None) -> 'CognitionGraph':
         # Passing in the actual data with graph stuff as well as workers and llm_config from agent
         nodes = [Node.from_json(node_data) for node_data in data["nodes"]]
         node_map = {node.id: node for node in nodes}
@@ -224,7 +413,7 @@ class CognitionGraph:
             )
             edges.append(edge)
 
-        graph = CognitionGraph(workers=workers, llm_config=llm_config)
+        graph = CognitionGraph(workers=workers, llm_config=llm_config, llm=llm, blobs=blobs)
 
         for node in nodes:
             graph.add_node(node)
@@ -0,0 +1,191 @@
+'''
+Append-only journal of cognition graph mutations, for cheap incremental checkpoints of long runs.
+
+A journaled agent is stored as two files:
+- <path>: a snapshot of the whole agent (same as Agent.save), plus the sequence number of the last mutation it includes
+- <path>.journal: one JSON line per mutation since (or around) that snapshot, flushed as it's written
+
+Every `compact_every` mutations the journal is compacted: a new snapshot is written (atomically, by renaming a
+temp file over the old one) and the journal is truncated. Loading replays the snapshot and then any journaled
+mutations newer than it, so a crash loses at most the mutation being written.
+
+Usage:
+    agent.enable_journal("./agent.json")   # or Langur.enable_journal
+    ...
+    agent = Agent.load_journal("./agent.json")
+
+Notes:
+- Node and worker field updates are seen when fields are reassigned (node.output = ...), not when mutated in place.
+- LLM usage is only saved with snapshots.
+'''
+import json
+import os
+from typing import IO, TYPE_CHECKING, Any, Optional
+
+from langur.graph.node import Node
+from langur.workers.worker import Worker
+
+if TYPE_CHECKING:
+    from langur.agent import Agent
+
+
+def journal_path(path: str) -> str:
+    return path + ".journal"
+
+
+def read_journal(path: str) -> tuple[list[dict], int]:
+    '''
+    Read journal entries, stopping at the first incomplete or corrupt line (e.g. from a crash mid-write).
+    Returns (entries, byte offset where the valid entries end).
+    '''
+    entries = []
+    valid_end = 0
+    if not os.path.exists(path):
+        return entries, valid_end
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            valid_end += len(line)
+    return entries, valid_end
+
+
+def apply_entry(agent: 'Agent', entry: dict):
+    '''Apply one journaled mutation to the agent'''
+    cg = agent.cg
+    op = entry["op"]
+    if op == "add_node":
+        cg.add_node(Node.from_json(entry["node"]))
+    elif op == "remove_node":
+        cg.remove_node(cg.query_node_by_id(entry["id"]))
+    elif op == "add_edge":
+        cg.add_edge_by_ids(entry["src_node_id"], entry["relation"], entry["dest_node_id"])
+    elif op == "remove_edge":
+        src_node = cg.query_node_by_id(entry["src_node_id"])
+        for edge in src_node.outgoing_edges():
+            if edge.relation == entry["relation"] and edge.dest_node.id == entry["dest_node_id"]:
+                cg.remove_edge(edge)
+                break
+    elif op == "update_node":
+        node = cg.query_node_by_id(entry["id"])
+        # Validates the JSON value back into the field's type
+        node.__pydantic_validator__.validate_assignment(node, entry["field"], entry["value"])
+        cg.storage.update_node(node, entry["field"])
+    elif op == "add_blob":
+        cg.blobs.put(entry["data"])
+    elif op == "batch":
+        # Journaled as one line, so a batch is either replayed whole or not at all
+        with cg.batch():
+            for batch_entry in entry["ops"]:
+                apply_entry(agent, batch_entry)
+    elif op == "add_worker":
+        agent.add_worker(Worker.from_json(entry["worker"]))
+    elif op == "update_worker":
+        worker = cg.query_worker_by_id(entry["id"])
+        worker.__pydantic_validator__.validate_assignment(worker, entry["field"], entry["value"])
+    else:
+        raise ValueError(f"Unknown journal op: {op}")
+
+
+class Journal:
+    '''Records an agent's graph mutations to a journal file, see module docs.'''
+    def __init__(self, path: str, compact_every: int = 10000, sync: bool = False):
+        '''
+        Args:
+            path: Snapshot path, the journal is kept next to it at <path>.journal.
+            compact_every: Write a new snapshot and truncate the journal after this many mutations.
+            sync: fsync after each mutation, so it survives the OS crashing too (not just the process). Much slower.
+        '''
+        self.path = path
+        self.compact_every = compact_every
+        self.sync = sync
+        self.seq = 0
+        self.agent: Optional['Agent'] = None
+        self._file: Optional[IO[bytes]] = None
+        self._since_compaction = 0
+
+    def attach(self, agent: 'Agent'):
+        '''Start journaling the agent, from a fresh snapshot of its current state.'''
+        self.agent = agent
+        self.compact()
+        agent.cg.add_listener(self.record)
+
+    def resume(self, agent: 'Agent', seq: int, valid_end: int):
+        '''Continue journaling an agent loaded from this journal, after its last valid entry.'''
+        self.agent = agent
+        self.seq = seq
+        with open(journal_path(self.path), "ab") as f:
+            # Drop any partially written entry so new ones start on a fresh line
+            f.truncate(valid_end)
+        self._file = open(journal_path(self.path), "ab")
+        agent.cg.add_listener(self.record)
+
+    def detach(self):
+        '''Stop journaling (what's been recorded so far stays loadable).'''
+        if self.agent is not None:
+            self.agent.cg.remove_listener(self.record)
+            self.agent = None
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def record(self, op: str, data: dict[str, Any]):
+        self.seq += 1
+        line = json.dumps({"seq": self.seq, "op": op, **data}, separators=(",", ":")) + "\n"
+        self._file.write(line.encode())
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self._since_compaction += 1
+        if self._since_compaction >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        '''Write a snapshot of the agent including all mutations so far, then truncate the journal.'''
+        snapshot = {"journal_seq": self.seq, "agent": self.agent.to_json()}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # If we crash before truncating, the entries left are skipped on load since the snapshot includes them
+        self.close()
+        self._file = open(journal_path(self.path), "wb")
+        self._since_compaction = 0
+
+    @classmethod
+    def load(cls, path: str, resume: bool = True, **kwargs) -> 'Agent':
+        '''
+        Load an agent from its snapshot and journal.
+
+        Args:
+            resume: Keep journaling the loaded agent to the same files (the journal is available as agent.journal).
+            kwargs: Passed to Journal when resuming.
+        '''
+        from langur.agent import Agent
+
+        with open(path, "r") as f:
+            snapshot = json.load(f)
+        agent = Agent.from_json(snapshot["agent"])
+        seq = snapshot["journal_seq"]
+
+        entries, valid_end = read_journal(journal_path(path))
+        for entry in entries:
+            if entry["seq"] <= seq:
+                continue
+            apply_entry(agent, entry)
+            seq = entry["seq"]
+
+        if resume:
+            journal = cls(path, **kwargs)
+            journal.resume(agent, seq, valid_end)
+            agent.journal = journal
+        return agent
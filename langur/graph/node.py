@@ -1,12 +1,25 @@
 from abc import abstractmethod
-from typing import TYPE_CHECKING, Callable, ClassVar, Dict, Set, Type
+from typing import TYPE_CHECKING, Callable, ClassVar, Dict, Optional, Set, Type
 from pydantic import BaseModel, ConfigDict, Field
 
 #if TYPE_CHECKING:
 # Fully import in order for pydantic models to be built
 from .edge import Edge
 
+if TYPE_CHECKING:
+    from .graph import CognitionGraph
+
 class Node(BaseModel):
+    '''
+    Nodes are pydantic models so they're validated when created or loaded, but are compared and hashed as graph
+    objects: by identity, and by ID.
+    '''
+    # Graph this node is in, set by the graph, so field updates can be reported to its listeners.
+    # A slot rather than a pydantic private attribute, which are much slower to read and it's read on every traversal.
+    # Copies (model_copy, deepcopy, pickling) and model_construct don't set it, so it's read with getattr: they
+    # aren't in any graph.
+    __slots__ = ("_cg",)
+
     id: str
     edges: Set['Edge'] = Field(default_factory=set, exclude=True)
 
@@ -21,13 +34,38 @@ class Node(BaseModel):
         super().__init_subclass__(**kwargs)
         Node._subclasses[cls.__name__] = cls
     
+    def model_post_init(self, __context):
+        # Set on the slot directly, since model_construct calls this before pydantic's own setattr can be used
+        object.__setattr__(self, "_cg", None)
+
     def __hash__(self):
         return hash(self.id)
         #return hash((self.__class__.__name__, self.id))
-    
-    # def __eq__(self, other):
-    #     if not isinstance(other, Node):
-    #         return False
+
+    def __eq__(self, other):
+        # Field by field comparison would be far slower, and there are cases where multiple nodes have the same ID
+        return self is other
+
+    # Edges belong to the graph, and following them would copy the whole graph (through half built copies of each
+    # node), so deep copies and pickles of a node have none.
+    def __deepcopy__(self, memo=None):
+        memo = {} if memo is None else memo
+        memo[id(self.edges)] = set()
+        return super().__deepcopy__(memo)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["__dict__"] = {**state["__dict__"], "edges": set()}
+        return state
+
+    def __setattr__(self, name, value):
+        if name not in self.model_fields or name == "edges" or (cg := getattr(self, "_cg", None)) is None:
+            super().__setattr__(name, value)
+            return
+        # Only reassignment is seen, so update fields like dicts by assigning a new value rather than in place
+        old_value = self.__dict__.get(name)
+        super().__setattr__(name, value)
+        cg._node_updated(self, name, old_value)
     
     @classmethod
     def get_tags(cls) -> set[str]:
@@ -41,13 +79,19 @@ class Node(BaseModel):
         self.edges.add(edge)
     
     def incoming_edges(self) -> set['Edge']:
-        return set(filter(lambda edge: edge.dest_node == self, self.edges))
+        cg = getattr(self, "_cg", None)
+        if cg is not None:
+            return cg.storage.incoming_edges(self)
+        return {edge for edge in self.edges if edge.dest_node is self}
     
     def upstream_nodes(self) -> set['Node']:
         return set(edge.src_node for edge in self.incoming_edges())
 
     def outgoing_edges(self) -> set['Edge']:
-        return set(filter(lambda edge: edge.src_node == self, self.edges))
+        cg = getattr(self, "_cg", None)
+        if cg is not None:
+            return cg.storage.outgoing_edges(self)
+        return {edge for edge in self.edges if edge.src_node is self}
 
     def downstream_nodes(self) -> set['Node']:
         return set(edge.dest_node for edge in self.outgoing_edges())
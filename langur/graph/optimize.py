@@ -0,0 +1,221 @@
+'''
+Optimization of plans before they're added to the graph, see PlannerWorker.plan_task.
+
+Plans from the LLM often contain dependency edges implied by others (a -> c alongside a -> b -> c), and duplicate
+actions (two read_file actions for the same file). optimize_plan:
+    - merges idempotent actions (@action(idempotent=True), e.g. reads) of the same type with identical, fully bound
+      inputs, so they're executed once (after everything either of them depended on, as long as that doesn't make
+      the plan's critical path longer). Other actions may be repeated on purpose, so are never merged.
+    - removes redundant dependency edges (transitive reduction), which don't change execution order
+    - rejects plans with dependency cycles, which could never finish executing
+
+Usage:
+    nodes, edges, report = optimize_plan(nodes, edges)
+    print(report.critical_path_before, report.critical_path_after, report.nodes_removed)
+'''
+import json
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from langur.actions import ActionNode
+
+
+class PlanCycleError(RuntimeError):
+    def __init__(self, cycle: list[str]):
+        super().__init__(f"Plan has a dependency cycle: {' -> '.join(cycle + cycle[:1])}")
+        self.cycle = cycle
+
+
+@dataclass
+class PlanReport:
+    nodes_before: int
+    nodes_after: int
+    edges_before: int
+    edges_after: int
+    # Dependency edges implied by others, which were dropped
+    redundant_edges: int
+    # Number of actions on the longest chain of dependencies, i.e. executor cycles needed at best
+    critical_path_before: int
+    critical_path_after: int
+    # Kept action id -> ids of the duplicate actions merged into it
+    merged: dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def nodes_removed(self) -> int:
+        return self.nodes_before - self.nodes_after
+
+    @property
+    def critical_path_saved(self) -> int:
+        return self.critical_path_before - self.critical_path_after
+
+
+def _duplicate_key(node: 'ActionNode') -> Optional[tuple]:
+    '''What makes actions duplicates of each other, None if they can't be merged (not idempotent, or inputs left to be filled)'''
+    if not node.idempotent or any(value is None for value in node.inputs.values()):
+        return None
+    return (node.action_type_name(), node.connector_id, json.dumps(node.inputs, sort_keys=True, default=str))
+
+
+def _topological_order(ids: Iterable[str], succ: dict[str, set[str]]) -> list[str]:
+    '''Raises PlanCycleError if there's a cycle'''
+    indegree = {node_id: 0 for node_id in ids}
+    for node_id in indegree:
+        for dest_id in succ[node_id]:
+            indegree[dest_id] += 1
+    order = [node_id for node_id, degree in indegree.items() if degree == 0]
+    for node_id in order:
+        for dest_id in succ[node_id]:
+            indegree[dest_id] -= 1
+            if indegree[dest_id] == 0:
+                order.append(dest_id)
+    if len(order) < len(indegree):
+        raise PlanCycleError(_find_cycle({node_id for node_id, degree in indegree.items() if degree > 0}, succ))
+    return order
+
+
+def _find_cycle(remaining: set[str], succ: dict[str, set[str]]) -> list[str]:
+    '''A cycle among nodes left over by a topological sort (each has a predecessor among them)'''
+    pred = {node_id: next(src_id for src_id in remaining if node_id in succ[src_id]) for node_id in remaining}
+    path = [next(iter(sorted(remaining)))]
+    seen = {path[0]: 0}
+    while True:
+        node_id = pred[path[-1]]
+        if node_id in seen:
+            return list(reversed(path[seen[node_id]:]))
+        seen[node_id] = len(path)
+        path.append(node_id)
+
+
+def _path_lengths(succ: dict[str, set[str]]) -> tuple[dict[str, int], dict[str, int]]:
+    '''Actions on the longest dependency chain ending at, and starting at, each action'''
+    order = _topological_order(succ.keys(), succ)
+    depth = {node_id: 1 for node_id in order}
+    height = {node_id: 1 for node_id in order}
+    for node_id in order:
+        for dest_id in succ[node_id]:
+            depth[dest_id] = max(depth[dest_id], depth[node_id] + 1)
+    for node_id in reversed(order):
+        for dest_id in succ[node_id]:
+            height[node_id] = max(height[node_id], height[dest_id] + 1)
+    return depth, height
+
+
+def _propagate(next_ids: dict[str, set[str]], lengths: dict[str, int], node_id: str):
+    '''Lengthen chains beyond node_id after its chain got longer (depths along succ, or heights along pred)'''
+    stack = [node_id]
+    while stack:
+        current_id = stack.pop()
+        for next_id in next_ids[current_id]:
+            if lengths[next_id] < lengths[current_id] + 1:
+                lengths[next_id] = lengths[current_id] + 1
+                stack.append(next_id)
+
+
+def _reaches(succ: dict[str, set[str]], depth: dict[str, int], src_id: str, dest_id: str) -> bool:
+    if depth[src_id] >= depth[dest_id]:
+        return False
+    stack = [src_id]
+    seen = {src_id}
+    while stack:
+        for next_id in succ[stack.pop()]:
+            if next_id == dest_id:
+                return True
+            # Anything upstream of dest_id is on a shorter chain than it
+            if next_id not in seen and depth[next_id] < depth[dest_id]:
+                seen.add(next_id)
+                stack.append(next_id)
+    return False
+
+
+def optimize_plan(nodes: list['ActionNode'], edges: list[tuple[str, str]]) -> tuple[list['ActionNode'], list[tuple[str, str]], PlanReport]:
+    '''
+    Optimize a plan's actions and (src id, dest id) dependency edges, returning the ones to add and a report.
+    Edges to ids that aren't in the plan are passed on as they are (with merged ids replaced).
+
+    Raises:
+        PlanCycleError: If the dependencies have a cycle.
+    '''
+    ids = [node.id for node in nodes]
+    succ: dict[str, set[str]] = {node_id: set() for node_id in ids}
+    pred: dict[str, set[str]] = {node_id: set() for node_id in ids}
+    for src_id, dest_id in edges:
+        if src_id in succ and dest_id in succ:
+            succ[src_id].add(dest_id)
+            pred[dest_id].add(src_id)
+    depth, height = _path_lengths(succ)
+    critical_path_before = max(depth.values(), default=0)
+
+    # Merge duplicates into the first of them, unless one depends on the other (so they'd form a cycle)
+    merged_into: dict[str, str] = {}
+    first: dict[tuple, str] = {}
+    for node in nodes:
+        key = _duplicate_key(node)
+        if key is None:
+            continue
+        kept_id = first.setdefault(key, node.id)
+        if kept_id == node.id:
+            continue
+        if _reaches(succ, depth, kept_id, node.id) or _reaches(succ, depth, node.id, kept_id):
+            continue
+        if max(depth[kept_id], depth[node.id]) + max(height[kept_id], height[node.id]) - 1 > critical_path_before:
+            # Dependents of one would have to wait for a longer chain of the other's dependencies
+            continue
+        merged_into[node.id] = kept_id
+        for src_id in pred.pop(node.id):
+            succ[src_id].discard(node.id)
+            succ[src_id].add(kept_id)
+            pred[kept_id].add(src_id)
+        for dest_id in succ.pop(node.id):
+            pred[dest_id].discard(node.id)
+            pred[dest_id].add(kept_id)
+            succ[kept_id].add(dest_id)
+        depth[kept_id] = max(depth[kept_id], depth.pop(node.id))
+        height[kept_id] = max(height[kept_id], height.pop(node.id))
+        _propagate(succ, depth, kept_id)
+        _propagate(pred, height, kept_id)
+
+    # Transitive reduction: drop u -> v if v is also reachable through another of u's dependents
+    order = _topological_order(succ.keys(), succ)
+    bit = {node_id: 1 << i for i, node_id in enumerate(order)}
+    reach = {}
+    for node_id in reversed(order):
+        reachable = 0
+        for dest_id in succ[node_id]:
+            reachable |= bit[dest_id] | reach[dest_id]
+        reach[node_id] = reachable
+    redundant_edges = 0
+    for node_id in order:
+        through_others = 0
+        for dest_id in succ[node_id]:
+            through_others |= reach[dest_id]
+        reduced = {dest_id for dest_id in succ[node_id] if not bit[dest_id] & through_others}
+        redundant_edges += len(succ[node_id]) - len(reduced)
+        succ[node_id] = reduced
+
+    kept_nodes = [node for node in nodes if node.id not in merged_into]
+    kept_edges = []
+    added = set()
+    for src_id, dest_id in edges:
+        edge = (merged_into.get(src_id, src_id), merged_into.get(dest_id, dest_id))
+        if edge in added:
+            continue
+        if edge[0] in succ and edge[1] in succ and edge[1] not in succ[edge[0]]:
+            continue
+        added.add(edge)
+        kept_edges.append(edge)
+
+    merged: dict[str, list[str]] = {}
+    for node_id, kept_id in merged_into.items():
+        merged.setdefault(kept_id, []).append(node_id)
+    report = PlanReport(
+        nodes_before=len(nodes),
+        nodes_after=len(kept_nodes),
+        edges_before=len(edges),
+        edges_after=len(kept_edges),
+        redundant_edges=redundant_edges,
+        critical_path_before=critical_path_before,
+        critical_path_after=max(_path_lengths(succ)[0].values(), default=0),
+        merged=merged
+    )
+    return kept_nodes, kept_edges, report
@@ -0,0 +1,407 @@
+'''
+Pluggable storage for CognitionGraph nodes and edges.
+
+- MemoryStorage (default): everything as Python objects, nodes hold references to their edges.
+- SQLiteStorage: nodes, edges and their indexes live in SQLite, with only recently used nodes (and any still
+  referenced elsewhere) kept as objects, so memory stays flat as the graph grows.
+
+Usage:
+    cg = CognitionGraph(workers=..., llm_config=..., storage=SQLiteStorage("graph.db"))
+'''
+import json
+import sqlite3
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Iterator, Optional, Type
+
+from langur import metrics
+from langur.util.type_index import TypeIndex, TypeKey
+from .edge import Edge
+from .node import Node
+
+if TYPE_CHECKING:
+    from .graph import CognitionGraph
+
+
+def is_pending(node: Node) -> bool:
+    '''Whether a node has an output which isn't set yet, i.e. an unexecuted action'''
+    return "output" in type(node).model_fields and node.output is None
+
+
+class GraphStorage(ABC):
+    '''Where a CognitionGraph keeps its nodes and edges. The graph handles validation and listeners.'''
+    cg: Optional['CognitionGraph'] = None
+
+    def bind(self, cg: 'CognitionGraph'):
+        '''Called once by the graph using this storage'''
+        self.cg = cg
+
+    @abstractmethod
+    def add_node(self, node: Node): ...
+
+    @abstractmethod
+    def remove_node(self, node: Node): ...
+
+    @abstractmethod
+    def get_node(self, node_id: str) -> Node | None: ...
+
+    @abstractmethod
+    def has_node(self, node: Node) -> bool: ...
+
+    @abstractmethod
+    def iter_nodes(self) -> Iterator[Node]: ...
+
+    @abstractmethod
+    def node_count(self) -> int: ...
+
+    @abstractmethod
+    def nodes_by_type(self, node_type: Type[Node]) -> set[Node]: ...
+
+    @abstractmethod
+    def nodes_by_tag(self, *tags: str) -> set[Node]: ...
+
+    def pending_nodes_by_type(self, node_type: Type[Node]) -> set[Node]:
+        '''
+        Nodes of the type (including subclasses) which are pending (see is_pending). Storages which don't keep every
+        node in memory should answer this without loading the others, since the executor asks every cycle.
+        '''
+        return {node for node in self.nodes_by_type(node_type) if is_pending(node)}
+
+    def count_by_type(self, node_type: Type[Node]) -> int:
+        return len(self.nodes_by_type(node_type))
+
+    def update_node(self, node: Node, field: str):
+        '''Persist a change to one of a node's fields'''
+        pass
+
+    def begin_batch(self):
+        '''Called when a CognitionGraph.batch() starts, work like index maintenance can be deferred until end_batch'''
+        pass
+
+    def end_batch(self):
+        '''Called when the batch is committed or rolled back'''
+        pass
+
+    @abstractmethod
+    def add_edge(self, edge: Edge): ...
+
+    @abstractmethod
+    def remove_edge(self, edge: Edge): ...
+
+    @abstractmethod
+    def iter_edges(self) -> Iterator[Edge]: ...
+
+    @abstractmethod
+    def edge_count(self) -> int: ...
+
+    @abstractmethod
+    def incoming_edges(self, node: Node) -> set[Edge]: ...
+
+    @abstractmethod
+    def outgoing_edges(self, node: Node) -> set[Edge]: ...
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(GraphStorage):
+    def __init__(self):
+        self._node_map: dict[str, Node] = {}
+        self._node_type_index: TypeIndex[Node] = TypeIndex()
+        self.edges: set[Edge] = set()
+        # Type index changes deferred during a batch, as (added, node)
+        self._deferred: list[tuple[bool, Node]] | None = None
+
+    def begin_batch(self):
+        self._deferred = []
+
+    def end_batch(self):
+        self._apply_deferred()
+        self._deferred = None
+
+    def _apply_deferred(self):
+        if self._deferred:
+            for added, node in self._deferred:
+                if added:
+                    self._node_type_index.add(node)
+                else:
+                    self._node_type_index.remove(node)
+            self._deferred.clear()
+
+    def add_node(self, node: Node):
+        self._node_map[node.id] = node
+        if self._deferred is not None:
+            self._deferred.append((True, node))
+        else:
+            self._node_type_index.add(node)
+
+    def remove_node(self, node: Node):
+        del self._node_map[node.id]
+        if self._deferred is not None:
+            self._deferred.append((False, node))
+        else:
+            self._node_type_index.remove(node)
+
+    def get_node(self, node_id: str) -> Node | None:
+        return self._node_map.get(node_id)
+
+    def has_node(self, node: Node) -> bool:
+        existing = self._node_map.get(node.id)
+        return existing is node
+
+    def iter_nodes(self) -> Iterator[Node]:
+        return iter(list(self._node_map.values()))
+
+    def node_count(self) -> int:
+        return len(self._node_map)
+
+    def nodes_by_type(self, node_type: Type[Node]) -> set[Node]:
+        self._apply_deferred()
+        return self._node_type_index.get_by_type(node_type)
+
+    def nodes_by_tag(self, *tags: str) -> set[Node]:
+        # could make more efficient with some kind of caching, idk if necessary
+        matches = set()
+        for node in self._node_map.values():
+            for tag in tags:
+                if tag in node.get_tags():
+                    matches.add(node)
+                    break
+        return matches
+
+    def add_edge(self, edge: Edge):
+        self.edges.add(edge)
+
+    def remove_edge(self, edge: Edge):
+        edge.src_node.edges.remove(edge)
+        edge.dest_node.edges.remove(edge)
+        self.edges.remove(edge)
+
+    def iter_edges(self) -> Iterator[Edge]:
+        return iter(self.edges)
+
+    def edge_count(self) -> int:
+        return len(self.edges)
+
+    def incoming_edges(self, node: Node) -> set[Edge]:
+        return {edge for edge in node.edges if edge.dest_node is node}
+
+    def outgoing_edges(self, node: Node) -> set[Edge]:
+        return {edge for edge in node.edges if edge.src_node is node}
+
+
+class NodeTypes:
+    '''
+    Node types seen by a storage which doesn't keep every node as an object,
+    so type and tag queries can be answered by type name (tags are per class).
+    '''
+    def __init__(self):
+        # Node type name -> TypeKeys of its MRO
+        self._type_keys: dict[str, set[TypeKey]] = {}
+
+    def register(self, type_name: str):
+        if type_name not in self._type_keys:
+            node_type = Node._subclasses[type_name]
+            self._type_keys[type_name] = {TypeKey(base) for base in node_type.__mro__[:-1]}
+
+    def matching_type(self, node_type: Type[Node]) -> list[str]:
+        '''Names of the types seen that are node_type or a subclass of it'''
+        key = TypeKey(node_type)
+        return [name for name, keys in self._type_keys.items() if key in keys]
+
+    def matching_tags(self, tags) -> list[str]:
+        '''Names of the types seen with any of the tags'''
+        return [name for name in self._type_keys if Node._subclasses[name].get_tags().intersection(tags)]
+
+
+_CACHE_HIT = metrics.CACHE_LOOKUPS.labels("sqlite_node", "hit")
+_CACHE_MISS = metrics.CACHE_LOOKUPS.labels("sqlite_node", "miss")
+
+
+class SQLiteStorage(GraphStorage):
+    '''
+    Nodes (as their JSON), edges and a node type index in SQLite, in WAL mode. Pending nodes are indexed too,
+    so finding the actions left to execute doesn't load the executed ones.
+
+    Node objects are loaded on demand. The cache_size most recently used are kept in memory, as well as any still
+    referenced elsewhere (so the same node is always the same object). Nodes don't hold their edges, neighbor
+    lookups go through SQLite instead.
+
+    Node field changes are written through when fields are reassigned (node.output = ...); changes made in place
+    (e.g. node.inputs["x"] = 1) are only saved if the node is reassigned or re-added.
+    '''
+    def __init__(self, path: str, cache_size: int = 10000, commit_every: int = 1000):
+        '''
+        Args:
+            path: SQLite database file, created if it doesn't exist. An existing graph in it is opened as is.
+            cache_size: Max unreferenced node objects kept in memory.
+            commit_every: Commit after this many writes (also committed on flush / close).
+        '''
+        self.path = path
+        self.cache_size = cache_size
+        self.commit_every = commit_every
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS nodes (
+                id TEXT PRIMARY KEY, type TEXT NOT NULL, data TEXT NOT NULL, pending INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS nodes_type ON nodes (type);
+            CREATE TABLE IF NOT EXISTS edges (
+                src TEXT NOT NULL, relation TEXT NOT NULL, dest TEXT NOT NULL, PRIMARY KEY (src, relation, dest)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS edges_dest ON edges (dest);
+        ''')
+        if "pending" not in [row[1] for row in self._conn.execute("PRAGMA table_info(nodes)")]:
+            # Graph saved before pending nodes were indexed
+            self._conn.execute("ALTER TABLE nodes ADD COLUMN pending INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE nodes SET pending = json_type(data, '$.output') IS 'null'")
+        # Only pending nodes are in this index, so it stays small as actions are executed
+        self._conn.execute("CREATE INDEX IF NOT EXISTS nodes_pending ON nodes (type) WHERE pending = 1")
+        self._conn.commit()
+        self._cache: OrderedDict[str, Node] = OrderedDict()
+        self._live: weakref.WeakValueDictionary[str, Node] = weakref.WeakValueDictionary()
+        self._pending_writes = 0
+        self._in_batch = False
+        self._types = NodeTypes()
+        for (type_name,) in self._conn.execute("SELECT DISTINCT type FROM nodes"):
+            self._types.register(type_name)
+
+    def _write(self, sql: str, params=()):
+        self._conn.execute(sql, params)
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every and not self._in_batch:
+            self.flush()
+
+    def begin_batch(self):
+        # Batches are committed as one transaction
+        self._in_batch = True
+
+    def end_batch(self):
+        self._in_batch = False
+        self.flush()
+
+    def flush(self):
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def _remember(self, node: Node):
+        self._live[node.id] = node
+        self._cache[node.id] = node
+        self._cache.move_to_end(node.id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _load(self, node_id: str, data: str) -> Node:
+        '''Get the node object for a row, reusing the existing object if there is one'''
+        node = self._live.get(node_id)
+        if node is None:
+            _CACHE_MISS.inc()
+            node = Node.from_json(json.loads(data))
+            node._cg = self.cg
+        else:
+            _CACHE_HIT.inc()
+        self._remember(node)
+        return node
+
+    def add_node(self, node: Node):
+        self._types.register(type(node).__name__)
+        self._write(
+            "INSERT OR REPLACE INTO nodes (id, type, data, pending) VALUES (?, ?, ?, ?)",
+            (node.id, type(node).__name__, json.dumps(node.to_json()), is_pending(node))
+        )
+        self._remember(node)
+
+    def update_node(self, node: Node, field: str):
+        self._write("UPDATE nodes SET data = ?, pending = ? WHERE id = ?", (json.dumps(node.to_json()), is_pending(node), node.id))
+
+    def remove_node(self, node: Node):
+        self._write("DELETE FROM nodes WHERE id = ?", (node.id,))
+        self._write("DELETE FROM edges WHERE src = ? OR dest = ?", (node.id, node.id))
+        self._cache.pop(node.id, None)
+        self._live.pop(node.id, None)
+
+    def get_node(self, node_id: str) -> Node | None:
+        node = self._live.get(node_id)
+        if node is not None:
+            _CACHE_HIT.inc()
+            self._remember(node)
+            return node
+        row = self._conn.execute("SELECT data FROM nodes WHERE id = ?", (node_id,)).fetchone()
+        return self._load(node_id, row[0]) if row else None
+
+    def has_node(self, node: Node) -> bool:
+        if self._live.get(node.id) is node:
+            return True
+        return self._conn.execute("SELECT 1 FROM nodes WHERE id = ?", (node.id,)).fetchone() is not None
+
+    def _query_nodes(self, sql: str, params=()) -> Iterator[Node]:
+        # Rows are read as they're iterated, so only the nodes still referenced stay in memory
+        for node_id, data in self._conn.execute(sql, params):
+            yield self._load(node_id, data)
+
+    def iter_nodes(self) -> Iterator[Node]:
+        return self._query_nodes("SELECT id, data FROM nodes")
+
+    def node_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    def _nodes_of_types(self, type_names: list[str], pending: bool = False) -> set[Node]:
+        if not type_names:
+            return set()
+        placeholders = ",".join("?" * len(type_names))
+        condition = "pending = 1 AND " if pending else ""
+        return set(self._query_nodes(f"SELECT id, data FROM nodes WHERE {condition}type IN ({placeholders})", type_names))
+
+    def nodes_by_type(self, node_type: Type[Node]) -> set[Node]:
+        return self._nodes_of_types(self._types.matching_type(node_type))
+
+    def pending_nodes_by_type(self, node_type: Type[Node]) -> set[Node]:
+        return self._nodes_of_types(self._types.matching_type(node_type), pending=True)
+
+    def count_by_type(self, node_type: Type[Node]) -> int:
+        type_names = self._types.matching_type(node_type)
+        if not type_names:
+            return 0
+        placeholders = ",".join("?" * len(type_names))
+        return self._conn.execute(f"SELECT COUNT(*) FROM nodes WHERE type IN ({placeholders})", type_names).fetchone()[0]
+
+    def nodes_by_tag(self, *tags: str) -> set[Node]:
+        return self._nodes_of_types(self._types.matching_tags(tags))
+
+    def add_edge(self, edge: Edge):
+        self._write(
+            "INSERT OR IGNORE INTO edges (src, relation, dest) VALUES (?, ?, ?)",
+            (edge.src_node.id, edge.relation, edge.dest_node.id)
+        )
+        # Edges are looked up in SQLite rather than kept on the nodes, so nodes don't keep each other in memory
+        edge.src_node.edges.discard(edge)
+        edge.dest_node.edges.discard(edge)
+
+    def remove_edge(self, edge: Edge):
+        self._write(
+            "DELETE FROM edges WHERE src = ? AND relation = ? AND dest = ?",
+            (edge.src_node.id, edge.relation, edge.dest_node.id)
+        )
+
+    def _edges(self, sql: str, params=()) -> Iterator[Edge]:
+        for src, relation, dest in self._conn.execute(sql, params):
+            yield Edge.detached(self.get_node(src), relation, self.get_node(dest))
+
+    def iter_edges(self) -> Iterator[Edge]:
+        return self._edges("SELECT src, relation, dest FROM edges")
+
+    def edge_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+
+    def incoming_edges(self, node: Node) -> set[Edge]:
+        return set(self._edges("SELECT src, relation, dest FROM edges WHERE dest = ?", (node.id,)))
+
+    def outgoing_edges(self, node: Node) -> set[Edge]:
+        return set(self._edges("SELECT src, relation, dest FROM edges WHERE src = ?", (node.id,)))
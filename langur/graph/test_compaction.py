@@ -0,0 +1,38 @@
+from langur.agent import Agent
+from langur.graph.compaction import ActionSummary, read_archive
+from langur.workers.executor import ExecutorWorker
+from langur.workers.task import TaskNode
+from langur.testing import Calculator
+
+def test_compact_finished_actions(tmp_path):
+    """Test that compaction only removes executed actions nothing pending depends on, and archives them"""
+    calculator = Calculator()
+    executor = ExecutorWorker()
+    agent = Agent(workers=[calculator, executor])
+    cg = agent.cg
+    action_type = next(iter(calculator.get_action_node_types()))
+    cg.add_node(TaskNode(id="task", task="Add some numbers"))
+    for node_id, output in [("a1", "1"), ("a2", "2"), ("a3", "3"), ("a4", None)]:
+        cg.add_node(action_type(id=node_id, inputs={"x": 1, "y": 1}, purpose="Add", connector_id=calculator.id, output=output))
+    # a1 -> a2 are done, a3 is done but a4 still needs it
+    cg.add_edge_by_ids("a1", "dependency", "a2")
+    cg.add_edge_by_ids("a3", "dependency", "a4")
+    cg.add_edge_by_ids("a2", "achieves", "task")
+    cg.add_edge_by_ids("a4", "achieves", "task")
+
+    archive = str(tmp_path / "archive.jsonl")
+    report = agent.compact_graph(archive=archive)
+    assert (report.nodes_before, report.nodes_after, report.compacted_actions, report.summaries) == (5, 4, 2, 1)
+
+    summary = next(iter(cg.query_nodes_by_type(ActionSummary)))
+    assert summary.action_ids == ["a1", "a2"]
+    assert [node.id for node in summary.downstream_nodes()] == ["task"]
+    assert cg.query_node_by_id("a3") is not None
+    assert [node.id for node in executor.get_frontier()] == ["a4"]
+
+    archived = list(read_archive(archive))
+    assert archived[0]["summary_id"] == summary.id
+    assert sorted(node["output"] for node in archived[0]["nodes"]) == ["1", "2"]
+
+    # Nothing more to do until a4 is executed
+    assert agent.compact_graph().compacted_actions == 0
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from langur import Langur
+from langur.graph.events import NodeAdded, NodeUpdated, WorkerUpdated
+from langur.testing import Calculator, FakeLLMServer
+
+def test_subscribe_during_run():
+    """Test that a subscriber sees action outputs and worker state changes as an agent runs"""
+    with FakeLLMServer(plan_size=3, plan_action_types=["add"], seed=0) as server:
+        agent = Langur("Add some numbers", llm_config=server.llm_config())
+        agent.use(Calculator())
+        events = []
+        subscription = agent.agent.cg.subscribe(events.append, events=[NodeUpdated, WorkerUpdated], fields=["output", "state"])
+        agent.run()
+    subscription.close()
+
+    outputs = [event for event in events if isinstance(event, NodeUpdated)]
+    assert len(outputs) == 3
+    assert all(event.field == "output" and event.value.endswith("result:\n2") for event in outputs)
+    assert any(isinstance(event, WorkerUpdated) and event.value == "DONE" for event in events)
+
+def test_subscribe_queue_bounded():
+    """Test that a queue subscription drops the oldest events when full, and gets nothing from rolled back batches"""
+    agent = Langur("Add some numbers")
+    cg = agent.agent.cg
+    subscription = cg.subscribe_queue(maxsize=2, events=[NodeAdded])
+    action_type = next(iter(Calculator().get_action_node_types()))
+    for i in range(3):
+        cg.add_node(action_type(id=f"a{i}", inputs={"x": 1, "y": 1}, purpose="Add", connector_id="c"))
+    with pytest.raises(RuntimeError):
+        with cg.batch():
+            cg.add_node(action_type(id="a3", inputs={"x": 1, "y": 1}, purpose="Add", connector_id="c"))
+            raise RuntimeError()
+
+    async def read():
+        return [(await subscription.get()).node_id for _ in range(subscription.qsize())]
+    assert asyncio.run(read()) == ["a1", "a2"]
+    assert subscription.dropped == 1
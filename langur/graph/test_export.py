@@ -0,0 +1,63 @@
+import json
+
+import networkx as nx
+
+from langur.agent import Agent
+from langur.graph.export import _write_graphml, export_graph
+from langur.workers.task import TaskNode
+from langur.testing import Calculator
+
+def make_agent():
+    '''Chain a1 -> a2 -> a3 and b1 both feeding a4, which achieves the task. All but a4 are executed.'''
+    calculator = Calculator()
+    agent = Agent(workers=[calculator])
+    action_type = next(iter(calculator.get_action_node_types()))
+    cg = agent.cg
+    cg.add_node(TaskNode(id="goal", task="Add numbers"))
+    for node_id in ["a1", "a2", "a3", "b1", "a4"]:
+        output = None if node_id == "a4" else "x" * 1000
+        cg.add_node(action_type(id=node_id, inputs={"x": 1, "y": 2}, purpose="Add", connector_id=calculator.id, output=output))
+    for src_id, dest_id in [("a1", "a2"), ("a2", "a3"), ("a3", "a4"), ("b1", "a4")]:
+        cg.add_edge_by_ids(src_id, "dependency", dest_id)
+    cg.add_edge_by_ids("a4", "achieves", "goal")
+    return agent, calculator
+
+def test_graphml_collapses_chains(tmp_path):
+    """Test that GraphML export replaces chains of executed actions with one node and truncates long attributes"""
+    agent, _ = make_agent()
+    export_graph(agent.cg, str(tmp_path / "graph.graphml"), collapse_chains=True, max_attribute_chars=50)
+
+    g = nx.read_graphml(str(tmp_path / "graph.graphml"))
+    assert set(g.nodes) == {"goal", "chain:a1", "b1", "a4"}
+    assert g.nodes["chain:a1"]["count"] == 3 and g.nodes["chain:a1"]["status"] == "done"
+    assert g.nodes["b1"]["output"] == "x" * 50 + "... (1000 chars)"
+    assert json.loads(g.nodes["b1"]["inputs"]) == {"x": 1, "y": 2}
+    assert set(g.edges) == {("chain:a1", "a4"), ("b1", "a4"), ("a4", "goal")}
+    assert not (tmp_path / "graph.graphml.body.tmp").exists()
+
+def test_graphml_mixed_types(tmp_path):
+    """Test that GraphML attributes with values of different types are declared as strings"""
+    path = str(tmp_path / "graph.graphml")
+    records = [("node", "a", {"score": 1, "done": True}), ("node", "b", {"score": "high", "done": False}), ("node", "c", {"score": 2.5})]
+    with open(path, "w", encoding="utf-8") as f:
+        _write_graphml(iter(records), f, path)
+
+    g = nx.read_graphml(path)
+    assert [g.nodes[node_id]["score"] for node_id in "abc"] == ["1", "high", "2.5"]
+    assert g.nodes["a"]["done"] is True and g.nodes["b"]["done"] is False
+
+def test_json_clusters_actions(tmp_path):
+    """Test that JSON export can cluster actions by task or connector, merging their edges"""
+    agent, calculator = make_agent()
+    export_graph(agent.cg, str(tmp_path / "graph.json"), cluster_by="task")
+
+    with open(tmp_path / "graph.json") as f:
+        data = json.load(f)
+    nodes = {node["key"]: node["attributes"] for node in data["nodes"]}
+    assert set(nodes) == {"goal", "cluster:goal"}
+    assert (nodes["cluster:goal"]["count"], nodes["cluster:goal"]["done"]) == (5, 4)
+    assert data["edges"] == [{"source": "cluster:goal", "target": "goal", "attributes": {"label": "achieves", "count": 1}}]
+
+    export_graph(agent.cg, str(tmp_path / "graph.json"), cluster_by="connector")
+    with open(tmp_path / "graph.json") as f:
+        assert {node["key"] for node in json.load(f)["nodes"]} == {"goal", f"cluster:{calculator.id}"}
@@ -0,0 +1,88 @@
+import copy
+import pickle
+
+import pytest
+
+from langur.actions import ActionNode
+from langur.agent import Agent
+from langur.graph.edge import Edge
+from langur.graph.journal import Journal
+from langur.testing import Calculator
+from langur.workers.task import TaskNode
+
+def make_agent():
+    calculator = Calculator()
+    agent = Agent(workers=[calculator])
+    action_type = next(iter(calculator.get_action_node_types()))
+    make_action = lambda node_id: action_type(id=node_id, inputs={"x": 1, "y": 2}, purpose="Add", connector_id=calculator.id)
+    return agent, make_action
+
+def test_batch_rolls_back():
+    """Test that a batch which fails partway leaves the graph as it was, and listeners see nothing"""
+    agent, make_action = make_agent()
+    cg = agent.cg
+    cg.add_node(make_action("a1"))
+    events = []
+    cg.add_listener(lambda op, data: events.append(op))
+
+    with pytest.raises(RuntimeError):
+        with cg.batch():
+            cg.add_node(make_action("a2"))
+            cg.add_edge_by_ids("a1", "dependency", "a2")
+            cg.query_node_by_id("a1").output = "3"
+            cg.remove_node(cg.query_node_by_id("a1"))
+            cg.add_edge_by_ids("a2", "dependency", "missing")
+
+    a1 = cg.query_node_by_id("a1")
+    assert (cg.node_count(), cg.edge_count(), events) == (1, 0, [])
+    assert a1.output is None and a1.edges == set()
+    assert cg.query_nodes_by_type(ActionNode) == {a1}
+
+def test_batch_commits_once(tmp_path):
+    """Test that a committed batch is reported to listeners once, and journaled and replayed whole"""
+    agent, make_action = make_agent()
+    path = str(tmp_path / "agent.json")
+    agent.enable_journal(path)
+    events = []
+    agent.cg.add_listener(lambda op, data: events.append((op, len(data.get("ops", [])))))
+
+    with agent.cg.batch():
+        agent.cg.add_node(make_action("a1"))
+        with agent.cg.batch():
+            agent.cg.add_node(make_action("a2"))
+        agent.cg.add_edge_by_ids("a1", "dependency", "a2")
+    assert events == [("batch", 3)]
+
+    loaded = Journal.load(path, resume=False)
+    assert {node.id for node in loaded.cg.query_nodes_by_type(ActionNode)} == {"a1", "a2"}
+    assert loaded.cg.query_node_by_id("a1").downstream_nodes() == {loaded.cg.query_node_by_id("a2")}
+
+def test_identity_equality():
+    """Test that nodes and edges are compared by identity, with hashes from their IDs"""
+    _, make_action = make_agent()
+    a, a_again, b = make_action("a"), make_action("a"), make_action("b")
+    assert a != a_again and hash(a) == hash(a_again)
+    assert len({a, a_again}) == 2
+
+    edge = Edge(a, "dependency", b)
+    assert edge == Edge.detached(a, "dependency", b)
+    assert edge != Edge.detached(a_again, "dependency", b)
+    assert edge != Edge.detached(a, "other", b)
+    assert hash(edge) == hash(Edge.detached(a_again, "dependency", b))
+
+def test_copied_nodes_usable():
+    """Test that copies of a node in a graph, and constructed nodes, aren't tied to any graph"""
+    agent, make_action = make_agent()
+    cg = agent.cg
+    node = TaskNode(id="t1", task="Add")
+    cg.add_node(node)
+    cg.add_node(make_action("a1"))
+    cg.add_edge_by_ids("t1", "dependency", "a1")
+
+    copies = [node.model_copy(), copy.copy(node), copy.deepcopy(node), pickle.loads(pickle.dumps(node)), TaskNode.model_construct(**dict(node))]
+    for node_copy in copies:
+        node_copy.task = "Subtract"
+        node_copy.incoming_edges()
+        node_copy.outgoing_edges()
+    assert node.task == "Add" and len(node.edges) == 1
+    assert [len(node_copy.edges) for node_copy in copies] == [1, 1, 0, 0, 1]
@@ -0,0 +1,46 @@
+from langur import Langur
+from langur.actions import ActionNode
+from langur.agent import Agent
+from langur.testing import Calculator, FakeLLMServer
+
+def graph_state(agent: Agent) -> tuple:
+    data = agent.to_json()
+    nodes = sorted(data["graph"]["nodes"], key=lambda node: node["id"])
+    edges = sorted(data["graph"]["edges"], key=lambda edge: (edge["src_node_id"], edge["relation"], edge["dest_node_id"]))
+    workers = sorted(data["workers"], key=lambda worker: worker["id"])
+    return nodes, edges, workers
+
+def test_journal_replays_run(tmp_path):
+    """Test that an agent loaded from its journal matches the agent at the end of the run"""
+    path = str(tmp_path / "agent.json")
+    with FakeLLMServer(plan_size=3, plan_action_types=["add"], seed=0) as server:
+        agent = Langur("Add some numbers", llm_config=server.llm_config())
+        agent.use(Calculator())
+        agent.enable_journal(path, compact_every=5)
+        agent.run()
+    agent.agent.journal.close()
+
+    loaded = Langur.load_journal(path, resume=False)
+    assert graph_state(loaded.agent) == graph_state(agent.agent)
+    actions = loaded.agent.cg.query_nodes_by_type(ActionNode)
+    assert len(actions) == 3 and all(node.output.endswith("result:\n2") for node in actions)
+
+def test_journal_ignores_partial_entry(tmp_path):
+    """Test that a partially written entry is dropped on load, and journaling resumes after the last good one"""
+    path = str(tmp_path / "agent.json")
+    calculator = Calculator()
+    agent = Agent(workers=[calculator])
+    agent.enable_journal(path)
+    node = next(iter(calculator.get_action_node_types()))(id="a", inputs={"x": 1, "y": None}, purpose="Add", connector_id=calculator.id)
+    agent.cg.add_node(node)
+    node.inputs = {"x": 1, "y": 2}
+    agent.journal.close()
+    with open(path + ".journal", "a") as f:
+        f.write('{"seq":3,"op":"remove_node","id":"a"')
+
+    loaded = Agent.load_journal(path)
+    assert loaded.cg.query_node_by_id("a").inputs == {"x": 1, "y": 2}
+    loaded.cg.query_node_by_id("a").output = "3"
+    loaded.journal.close()
+
+    assert Agent.load_journal(path, resume=False).cg.query_node_by_id("a").output == "3"
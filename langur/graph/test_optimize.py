@@ -0,0 +1,37 @@
+import pytest
+
+from langur.graph.optimize import PlanCycleError, optimize_plan
+from langur.testing import Calculator, Files
+
+def make_plan(*specs):
+    files = Files()
+    action_type = next(typ for typ in files.get_action_node_types() if typ.action_type_name() == "read_file")
+    return [action_type(id=node_id, inputs={"path": path}, purpose="Read", connector_id=files.id) for node_id, path in specs]
+
+def test_merges_duplicates_and_reduces_edges():
+    """Test that duplicate bound actions are merged and dependencies implied by others are dropped"""
+    nodes = make_plan(("a", "a.txt"), ("a_again", "a.txt"), ("b", "b.txt"), ("c", "c.txt"), ("unbound", None), ("unbound_again", None))
+    edges = [("a", "b"), ("b", "c"), ("a", "c"), ("a_again", "c"), ("a_again", "b"), ("c", "unbound")]
+    nodes, edges, report = optimize_plan(nodes, edges)
+
+    assert [node.id for node in nodes] == ["a", "b", "c", "unbound", "unbound_again"]
+    assert edges == [("a", "b"), ("b", "c"), ("c", "unbound")]
+    assert report.merged == {"a": ["a_again"]} and report.nodes_removed == 1
+    assert report.redundant_edges == 1
+    assert (report.critical_path_before, report.critical_path_after) == (4, 4)
+
+def test_keeps_duplicates_that_depend_on_each_other():
+    """Test that duplicates aren't merged if one depends on the other or they aren't idempotent, and cycles are rejected"""
+    nodes = make_plan(("a", "a.txt"), ("b", "b.txt"), ("a_again", "a.txt"), ("c", "c.txt"), ("d", "d.txt"), ("c_again", "c.txt"))
+    edges = [("a", "b"), ("b", "a_again"), ("d", "c_again")]
+    kept, _, report = optimize_plan(nodes, edges)
+    assert len(kept) == 5 and report.merged == {"c": ["c_again"]}
+
+    calculator = Calculator()
+    add = next(iter(calculator.get_action_node_types()))
+    adds = [add(id=node_id, inputs={"x": 1, "y": 2}, purpose="Add", connector_id=calculator.id) for node_id in ["add", "add_again"]]
+    assert len(optimize_plan(adds, [])[0]) == 2
+
+    with pytest.raises(PlanCycleError) as error:
+        optimize_plan(nodes, edges + [("a_again", "a")])
+    assert set(error.value.cycle) == {"a", "b", "a_again"}
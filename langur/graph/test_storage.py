@@ -0,0 +1,69 @@
+import gc
+import sqlite3
+
+from langur import Langur
+from langur.actions import ActionNode
+from langur.graph.graph import CognitionGraph
+from langur.graph.storage import SQLiteStorage
+from langur.llm import LLMConfig
+from langur.testing import Calculator, FakeLLMServer
+
+def test_sqlite_agent_end_to_end(tmp_path):
+    """Test that an agent can plan and execute with its graph in SQLite"""
+    with FakeLLMServer(plan_size=3, plan_shape="chain", plan_action_types=["add"], seed=0) as server:
+        agent = Langur("Add some numbers", llm_config=server.llm_config(), storage=SQLiteStorage(str(tmp_path / "graph.db"), cache_size=2))
+        agent.use(Calculator())
+        agent.run()
+
+    cg = agent.agent.cg
+    actions = cg.query_nodes_by_type(ActionNode)
+    assert len(actions) == 3
+    assert all(node.output.endswith("result:\n2") for node in actions)
+    assert len(cg.query_nodes_by_tag("action")) == 3
+    assert sum(len(node.upstream_nodes() & actions) for node in actions) == 2
+
+def test_sqlite_cache_and_reopen(tmp_path):
+    """Test that evicted nodes are reloaded with their updates, and that the graph can be reopened"""
+    path = str(tmp_path / "graph.db")
+    calculator = Calculator()
+    action_type = next(iter(calculator.get_action_node_types()))
+    cg = CognitionGraph(workers=[calculator], llm_config=LLMConfig(provider="anthropic", options={}), storage=SQLiteStorage(path, cache_size=10))
+    for i in range(100):
+        cg.add_node(action_type(id=f"a{i}", inputs={"x": i, "y": i}, purpose="Add", connector_id=calculator.id))
+        if i > 0:
+            cg.add_edge_by_ids(f"a{i - 1}", "dependency", f"a{i}")
+    cg.query_node_by_id("a0").output = "0"
+    gc.collect()
+    assert len(cg.storage._live) <= 10
+    assert cg.query_node_by_id("a0").output == "0"
+    assert cg.query_node_by_id("a5") is cg.query_node_by_id("a5")
+    cg.storage.close()
+
+    reopened = CognitionGraph(workers=[calculator], llm_config=cg.llm_config, storage=SQLiteStorage(path))
+    assert reopened.node_count() == 100 and reopened.edge_count() == 99
+    assert [node.id for node in reopened.query_node_by_id("a50").downstream_nodes()] == ["a51"]
+    assert len(reopened.query_nodes_by_type(ActionNode)) == 100
+
+def test_sqlite_pending_actions_only_load_pending(tmp_path):
+    """Test that querying pending actions only loads those nodes, including in graphs saved before they were indexed"""
+    path = str(tmp_path / "graph.db")
+    calculator = Calculator()
+    action_type = next(iter(calculator.get_action_node_types()))
+    cg = CognitionGraph(workers=[calculator], llm_config=LLMConfig(provider="anthropic", options={}), storage=SQLiteStorage(path))
+    for i in range(100):
+        cg.add_node(action_type(id=f"a{i}", inputs={"x": i, "y": i}, purpose="Add", connector_id=calculator.id))
+    for i in range(97):
+        cg.query_node_by_id(f"a{i}").output = str(i)
+    cg.storage.close()
+
+    for migrate in (False, True):
+        if migrate:
+            conn = sqlite3.connect(path)
+            conn.executescript("DROP INDEX nodes_pending; ALTER TABLE nodes DROP COLUMN pending;")
+            conn.close()
+        reopened = CognitionGraph(workers=[calculator], llm_config=cg.llm_config, storage=SQLiteStorage(path))
+        pending = reopened.query_pending_nodes_by_type(ActionNode)
+        assert {node.id for node in pending} == {"a97", "a98", "a99"}
+        assert len(reopened.storage._live) == 3
+        assert reopened.count_nodes_by_type(ActionNode) == 100
+        reopened.storage.close()
@@ -2,16 +2,22 @@
 High level agent interface.
 '''
 import asyncio
-import json
-from typing import TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING, Callable, Literal, Optional
 from langur.behavior import AgentBehavior, BaseBehavior, Plan, Task, Execute
+from langur.blobs import BlobStore
 from langur.agent import Agent
 from langur.connector import Connector, create_connector_type_from_lc_tk, create_oneoff_connector_type, create_oneoff_connector_type_from_fn, create_oneoff_connector_type_from_lc_tool
 from langur.connector import Connector
+from langur.graph.compaction import CompactionReport
+from langur.graph.storage import GraphStorage
 from langur.llm import LLMConfig
+from langur.trace import Tracer
+from langur.usage import LLMBudget, UsageTracker
+from langur.util.event_loop import run_sync
 from langur.workers.worker import Worker
 
 if TYPE_CHECKING:
+    from langur.viewer import LiveViewer, TimelineRecorder
     from langchain_core.tools import BaseTool
     from langchain_core.tools import BaseToolkit
 
@@ -36,7 +42,7 @@ def is_lc_toolkit(obj) -> bool:
 
 
 class Langur:
-    def __init__(self, instructions: str = None, behavior: AgentBehavior = None, agent: Agent=None, llm_config: LLMConfig = None):
+    def __init__(self, instructions: str = None, behavior: AgentBehavior = None, agent: Agent=None, llm_config: LLMConfig = None, budget: LLMBudget = None, storage: GraphStorage = None, blobs: BlobStore = None):
         '''
         High level agent interface with customizable behavior.
         Provide either instructions OR behavior.
@@ -45,6 +51,10 @@ class Langur:
             instructions (str): General directions or task for the agent.
             behavior (AgentBehavior): Custom behavior to use instead of default. If provided, instructions are ignored.
             agent (Agent): Wrap a lower level agent representation - generally can ignore this parameter, used internally.
+            llm_config (LLMConfig): LLM backend to use instead of the default.
+            budget (LLMBudget): Optional token / call limits for the agent's LLM usage.
+            storage (GraphStorage): Where to keep the agent's graph, e.g. SQLiteStorage for graphs larger than memory.
+            blobs (BlobStore): Keep large action outputs here, once per distinct output, instead of in the graph.
         
         Raises:
             RuntimeError: If no instructions or behavior are provided.
@@ -68,7 +78,7 @@ class Langur:
         )
 
         workers = behavior.compile()
-        self.agent = Agent(workers=workers, llm_config=llm_config)
+        self.agent = Agent(workers=workers, llm_config=llm_config, budget=budget, storage=storage, blobs=blobs)
 
 
     def use(self, *peripherals: Connector | Worker | Callable | 'BaseTool' | AgentBehavior | BaseBehavior):
@@ -108,23 +118,89 @@ class Langur:
                 raise TypeError("Invalid peripheral:", peripheral)
         
 
-    def run(self, until: str = None):
-        asyncio.run(self.agent.run(until=until))
+    def run(self, until: str = None, tracer: Tracer = None, recorder: 'TimelineRecorder' = None, loop_factory: Optional[Callable[[], asyncio.AbstractEventLoop]] = None):
+        '''
+        Run the agent.
+
+        Args:
+            until: Stop early once this signal is produced, e.g. Signal.PLAN_DONE.
+            tracer: Record a timeline of the run, which can be saved with tracer.save("trace.json") and opened in Perfetto.
+            recorder: Record the graph's changes each cycle, which can be saved with recorder.save("timeline.html").
+            loop_factory: Create the event loop to run on, e.g. uvloop.new_event_loop (not used if called from a running loop).
+        '''
+        run_sync(self.arun(until=until, tracer=tracer, recorder=recorder), loop_factory=loop_factory)
+
+    async def arun(self, until: str = None, tracer: Tracer = None, recorder: 'TimelineRecorder' = None):
+        '''
+        Run the agent on the current event loop, e.g. to run many agents concurrently (see langur.runtime.Runtime).
+        Takes the same arguments as run.
+        '''
+        await self.agent.run(until=until, tracer=tracer, recorder=recorder)
     
+    @property
+    def usage(self) -> UsageTracker:
+        '''LLM token usage, latency and retries so far, by BAML function, worker and node.'''
+        return self.agent.usage
+
     def show(self):
         return self.agent.cg.show()
 
-    def save(self, path: str):
-        with open(path, "w") as f:
-            json.dump(self.agent.to_json(), f, indent=2)
+    def save(self, path: str, format: Literal["json", "binary"] = "json"):
+        '''
+        Save the agent, as readable JSON or in a compact binary format (better for large agents).
+        Either can be loaded with Langur.load.
+        '''
+        self.agent.save(path, format=format)
     
-    def save_graph_html(self, path: str):
-        self.agent.cg.save_graph_html(path=path)
+    def enable_journal(self, path: str, compact_every: int = 10000, sync: bool = False):
+        '''
+        Continuously checkpoint the agent to path as it runs, by appending each change to a journal (compacted into
+        a full snapshot every compact_every changes). Resume with Langur.load_journal(path).
+        '''
+        self.agent.enable_journal(path, compact_every=compact_every, sync=sync)
+
+    def compact_graph(self, archive: str = None) -> CompactionReport:
+        '''
+        Collapse finished actions that nothing pending depends on into summary nodes, so a long running agent's
+        graph doesn't keep growing. With archive, the removed actions are appended to that file first.
+        '''
+        return self.agent.compact_graph(archive=archive)
+
+    def serve_viewer(self, port: int = 8765, host: str = "127.0.0.1") -> 'LiveViewer':
+        '''
+        Watch the agent's graph live in a browser at http://{host}:{port}/, updated incrementally as it runs.
+        Call .shutdown() on the returned viewer to stop it.
+        '''
+        from langur.viewer import serve_viewer
+        return serve_viewer(self.agent.cg, port=port, host=host)
+
+    def save_graph_html(self, path: str, **kwargs):
+        '''
+        Save the agent's graph as an HTML page. For large graphs, pass level of detail options
+        (see langur.graph.export.ExportOptions), e.g. cluster_by="task" or collapse_chains=True.
+        '''
+        self.agent.cg.save_graph_html(path=path, **kwargs)
+
+    def export_graph(self, path: str, **kwargs):
+        '''
+        Stream the agent's graph to a GraphML (.graphml) or graphology JSON file for other tools, with the same
+        level of detail options as save_graph_html.
+        '''
+        self.agent.cg.export(path, **kwargs)
     
     # def generate_viewer(self, path: str):
 
     @classmethod
-    def load(cls, path: str) -> 'Langur':
-        with open(path, "r") as f:
-            agent = Agent.from_json(json.load(f))
-        return Langur(agent=agent)
\ No newline at end of file
+    def load(cls, path: str, lazy: bool = False) -> 'Langur':
+        '''
+        Load an agent saved with Langur.save.
+
+        Args:
+            lazy: For binary saves, only read nodes and large outputs when they're used (see Agent.load).
+        '''
+        return Langur(agent=Agent.load(path, lazy=lazy))
+
+    @classmethod
+    def load_journal(cls, path: str, resume: bool = True) -> 'Langur':
+        '''Load an agent checkpointed with enable_journal, continuing to journal to the same path if resume.'''
+        return Langur(agent=Agent.load_journal(path, resume=resume))
\ No newline at end of file
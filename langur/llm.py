@@ -1,6 +1,22 @@
-from typing import Any, Dict, Optional
+import asyncio
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, Literal, Optional
 from baml_py import ClientRegistry
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from langur.cassette import Cassette, CassetteMode, decode_output
+from langur.log import get_logger
+from langur import metrics
+from langur.trace import baml_traced, span
+from langur.usage import CHARS_PER_TOKEN, BudgetExceededError, LLMBudget, LLMCallRecord, UsageTracker, estimate_tokens
+
+if TYPE_CHECKING:
+    from baml_py.baml_py import FunctionResult
+    from langur.runtime import SharedLLMResources
+    from langur.baml_client.type_builder import TypeBuilder
+    from langur.workers.worker import Worker
 
 class LLMConfig(BaseModel):
     # Basically params for ClientRegistry
@@ -9,6 +25,18 @@ class LLMConfig(BaseModel):
     provider: str
     options: Dict[str, Any]
     retry_policy: Optional[str] = None
+    # Number of times a failed BAML function call is re-attempted by Langur before giving up
+    max_retries: int = 0
+
+    # Record BAML calls to, or replay them from, a cassette file instead of just calling the LLM ("live").
+    # These are runtime options rather than agent state so aren't saved, and default to the
+    # LANGUR_CASSETTE_MODE / LANGUR_CASSETTE env vars so existing scripts can be run offline as-is.
+    cassette_mode: CassetteMode = Field(default_factory=lambda: os.environ.get("LANGUR_CASSETTE_MODE", "live"), exclude=True)
+    cassette_path: Optional[str] = Field(default_factory=lambda: os.environ.get("LANGUR_CASSETTE"), exclude=True)
+    # Only allow replaying calls with exactly the same inputs as recorded
+    cassette_strict: bool = Field(default=False, exclude=True)
+    # Simulated latency for replayed calls: seconds, "recorded" to use the latency observed while recording, or None for none
+    replay_latency: float | Literal["recorded"] | None = Field(default=None, exclude=True)
 
     def to_registry(self) -> ClientRegistry:
         cr = ClientRegistry()
@@ -20,3 +48,214 @@ class LLMConfig(BaseModel):
         )
         cr.set_primary("Primary")
         return cr
+
+
+def baml_runtime():
+    '''
+    BAML's runtime and context manager. These are built when langur.baml_client is first imported,
+    so it's only imported once a call is actually made to keep `import langur` fast.
+    '''
+    from langur.baml_client import globals as baml_globals
+    return (
+        baml_globals.DO_NOT_USE_DIRECTLY_UNLESS_YOU_KNOW_WHAT_YOURE_DOING_RUNTIME,
+        baml_globals.DO_NOT_USE_DIRECTLY_UNLESS_YOU_KNOW_WHAT_YOURE_DOING_CTX
+    )
+
+
+def parse_token_usage(raw: 'FunctionResult') -> tuple[int, int]:
+    '''
+    Get (prompt_tokens, completion_tokens) reported by the provider for a BAML function result.
+    Relies on BAML's unstable internal repr, so falls back to (0, 0) if the shape is unexpected.
+    '''
+    try:
+        data = json.loads(raw.unstable_internal_repr())
+    except (ValueError, TypeError):
+        return 0, 0
+    # e.g. {"Success": {..., "metadata": {"prompt_tokens": 11, "output_tokens": 3, ...}}}
+    if not isinstance(data, dict):
+        return 0, 0
+    for response in data.values():
+        if isinstance(response, dict) and isinstance(response.get("metadata"), dict):
+            metadata = response["metadata"]
+            return metadata.get("prompt_tokens") or 0, metadata.get("output_tokens") or 0
+    return 0, 0
+
+
+class LLMClient:
+    '''
+    All BAML function calls made by an agent go through here, so that token usage, latency and retries
+    can be accounted for (per function, worker and node) and budgets can be enforced.
+
+    When run in a Runtime, `shared` holds the concurrency limit, response cache and client registries shared between agents.
+    '''
+    def __init__(self, config: LLMConfig, usage: UsageTracker = None, budget: LLMBudget = None, shared: 'SharedLLMResources' = None):
+        self.config = config
+        self.usage = usage if usage else UsageTracker()
+        self.budget = budget
+        self.shared = shared
+        self._registry = None
+        self._cassette = None
+
+    def get_cassette(self) -> Optional[Cassette]:
+        if self.config.cassette_mode == "live":
+            return None
+        if self._cassette is None:
+            if not self.config.cassette_path:
+                raise ValueError(f"A cassette_path is required for cassette mode `{self.config.cassette_mode}`")
+            self._cassette = Cassette(self.config.cassette_path, self.config.cassette_mode, strict=self.config.cassette_strict)
+        return self._cassette
+
+    def get_client_registry(self) -> ClientRegistry:
+        if self.shared is not None:
+            return self.shared.get_client_registry(self.config)
+        if self._registry is None:
+            metrics.CACHE_LOOKUPS.labels("client_registry", "miss").inc()
+            self._registry = self.config.to_registry()
+        else:
+            metrics.CACHE_LOOKUPS.labels("client_registry", "hit").inc()
+        return self._registry
+
+    def apply_budget(self, args: Dict[str, Any], node_id: str = None, truncate: str = None) -> Dict[str, Any]:
+        '''
+        Check budgets before a call is made. Returns args to actually use, which may have a truncated context.
+
+        Raises:
+            BudgetExceededError: If a run budget is exhausted, or the node budget is and the call can't be degraded.
+        '''
+        budget = self.budget
+        if budget is None:
+            return args
+        if budget.max_run_tokens is not None and self.usage.total.total_tokens >= budget.max_run_tokens:
+            raise BudgetExceededError(f"Run token budget exhausted ({self.usage.total.total_tokens}/{budget.max_run_tokens} tokens used)")
+        if budget.max_run_calls is not None and self.usage.total.calls >= budget.max_run_calls:
+            raise BudgetExceededError(f"Run call budget exhausted ({self.usage.total.calls}/{budget.max_run_calls} calls made)")
+        if budget.max_node_tokens is None or node_id is None:
+            return args
+
+        remaining = budget.max_node_tokens - self.usage.node_tokens(node_id)
+        estimated = sum(estimate_tokens(v) for v in args.values() if isinstance(v, str))
+        if estimated <= remaining:
+            return args
+        if budget.on_node_exceeded == "abort" or truncate is None or remaining <= 0:
+            raise BudgetExceededError(f"Token budget for node `{node_id}` exceeded (~{estimated} tokens needed, {max(remaining, 0)} left)")
+        # Keep the tail of the context, since the most immediately relevant information is appended last
+        overflow = (estimated - remaining) * CHARS_PER_TOKEN
+        truncated = {**args, truncate: args[truncate][overflow:]}
+        # The other arguments may not fit on their own
+        estimated = sum(estimate_tokens(v) for v in truncated.values() if isinstance(v, str))
+        if estimated > remaining:
+            raise BudgetExceededError(f"Token budget for node `{node_id}` exceeded even with `{truncate}` truncated (~{estimated} tokens needed, {remaining} left)")
+        return truncated
+
+    def record_metrics(self, record: LLMCallRecord):
+        name = record.function_name
+        metrics.LLM_CALLS.labels(name).inc()
+        metrics.LLM_DURATION.labels(name).observe(record.latency)
+        metrics.LLM_TOKENS.labels(name, "prompt").inc(record.prompt_tokens)
+        metrics.LLM_TOKENS.labels(name, "completion").inc(record.completion_tokens)
+        if record.retries:
+            metrics.LLM_RETRIES.labels(name).inc(record.retries)
+        if record.error is not None:
+            metrics.LLM_ERRORS.labels(name).inc()
+
+    async def call(
+        self,
+        function_name: str,
+        args: Dict[str, Any],
+        tb: 'TypeBuilder' = None,
+        dynamic_types: Any = None,
+        worker: 'Worker' = None,
+        node_id: str = None,
+        truncate: str = None
+    ) -> Any:
+        '''
+        Call a BAML function by name, for example:
+        await cg.llm.call("Think", {"context": ..., "description": ...}, worker=self, node_id=node.id)
+
+        Args:
+            tb: Type builder for functions with dynamic types.
+            dynamic_types: JSON description of the types added to tb. Calls with tb are only cached (see
+                SharedLLMResources.cached) if it's given, since the response depends on them.
+            worker: Worker making the call, for accounting.
+            node_id: Node the call is made on behalf of, for accounting and per-node budgets.
+            truncate: Name of a string argument which may be truncated to fit the per-node budget.
+        '''
+        args = self.apply_budget(args, node_id=node_id, truncate=truncate)
+        record = LLMCallRecord(
+            function_name=function_name,
+            worker_id=worker.id if worker else None,
+            node_id=node_id
+        )
+        cassette = self.get_cassette()
+
+        async def call_function(args: Dict[str, Any]) -> 'FunctionResult':
+            runtime, ctx = baml_runtime()
+            return await runtime.call_function(
+                function_name,
+                args,
+                ctx.get(),
+                tb._tb if tb is not None else None,
+                self.get_client_registry(),
+            )
+        call_function = baml_traced(call_function, worker_id=record.worker_id, node_id=node_id)
+
+        async def invoke(args: Dict[str, Any]) -> Any:
+            if cassette is not None and cassette.mode == "replay":
+                entry = cassette.replay(function_name, args, node_id=node_id)
+                delay = entry.latency if self.config.replay_latency == "recorded" else self.config.replay_latency
+                if delay:
+                    await asyncio.sleep(delay)
+                record.prompt_tokens += entry.prompt_tokens
+                record.completion_tokens += entry.completion_tokens
+                return decode_output(entry.output)
+
+            attempt_start = time.perf_counter()
+            if self.shared is not None:
+                raw = await self.shared.limit(lambda: call_function(args))
+            else:
+                raw = await call_function(args)
+            prompt_tokens, completion_tokens = parse_token_usage(raw)
+            record.prompt_tokens += prompt_tokens
+            record.completion_tokens += completion_tokens
+            from langur.baml_client import types
+            result = raw.cast_to(types, types)
+            if cassette is not None:
+                cassette.record(
+                    function_name, args, result,
+                    node_id=node_id,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    latency=time.perf_counter() - attempt_start
+                )
+            return result
+
+        async def invoke_with_retries() -> Any:
+            for attempt in range(self.config.max_retries + 1):
+                try:
+                    return await invoke(args)
+                except Exception as e:
+                    if attempt == self.config.max_retries:
+                        raise
+                    record.retries += 1
+                    get_logger().warning(f"{function_name} failed ({type(e).__name__}), retrying ({record.retries}/{self.config.max_retries})")
+
+        with span(function_name, cat="llm", worker_id=record.worker_id, node_id=node_id) as span_args:
+            start = time.perf_counter()
+            try:
+                if self.shared is not None and cassette is None and (tb is None or dynamic_types is not None):
+                    result, span_args["cached"] = await self.shared.cached(self.config, function_name, args, invoke_with_retries, dynamic_types=dynamic_types)
+                    return result
+                return await invoke_with_retries()
+            except Exception as e:
+                record.error = type(e).__name__
+                raise
+            finally:
+                record.latency = time.perf_counter() - start
+                self.usage.record(record)
+                self.record_metrics(record)
+                span_args.update(
+                    prompt_tokens=record.prompt_tokens,
+                    completion_tokens=record.completion_tokens,
+                    retries=record.retries,
+                    error=record.error
+                )
@@ -0,0 +1,149 @@
+'''
+Structured logging for Langur.
+
+Records are tagged with the worker, node and cycle they were emitted from, and are handed off to a queue
+so that formatting and writing happen on a background thread instead of blocking the event loop.
+
+By default logs are printed to stdout as text (INFO and up). To change that:
+    from langur.log import configure_logging
+    configure_logging(level="DEBUG", json_lines=True, path="langur.jsonl")
+'''
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, TextIO
+
+# BAML reads BAML_LOG once, when baml_py is first imported, so this module has to be imported before that happens.
+# Quiet BAML's own per-call logging by default, but respect it if set explicitly.
+os.environ.setdefault("BAML_LOG", "warn")
+
+logger = logging.getLogger("langur")
+
+# Fields attached to every record emitted within the current context (e.g. cycle, worker_id, node_id)
+_log_context: ContextVar[dict] = ContextVar("langur_log_context", default={})
+
+CONTEXT_FIELDS = ("cycle", "worker_type", "worker_id", "node_id")
+
+# Attributes every record has, anything else on a record was passed as an extra field
+_RECORD_ATTRIBUTES = {*vars(logging.LogRecord("", 0, "", 0, "", None, None)), "message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_context(**fields: Any):
+    '''Attach fields to all records logged within the body (including from tasks created within it).'''
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    '''Copies the current log context onto records, at the point they are emitted (i.e. on the event loop).'''
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        worker_type = getattr(record, "worker_type", None)
+        worker_id = getattr(record, "worker_id", None)
+        if worker_type is not None:
+            message = f"[{worker_type}::{worker_id}] {message}"
+        if record.levelno >= logging.WARNING:
+            message = f"{record.levelname}: {message}"
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+class JSONFormatter(logging.Formatter):
+    '''One JSON object per line.'''
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": record.created,
+            "elapsed_ms": round(record.relativeCreated, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in data:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def configure_logging(
+    level: int | str = logging.INFO,
+    json_lines: bool = False,
+    stream: Optional[TextIO] = None,
+    path: Optional[str] = None
+):
+    '''
+    (Re)configure Langur's logging.
+
+    Args:
+        level: Minimum level to emit, e.g. "DEBUG" or logging.WARNING.
+        json_lines: Write JSON lines instead of plain text.
+        stream: Stream to write to, defaults to stdout (ignored if path is given).
+        path: File to append logs to.
+    '''
+    global _listener
+    stop_logging()
+
+    if path is not None:
+        handler = logging.FileHandler(path)
+    else:
+        handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(JSONFormatter() if json_lines else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+
+
+def stop_logging():
+    '''Flush any queued records and stop the background writer.'''
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def get_logger() -> logging.Logger:
+    '''Langur's logger, configured with defaults on first use if configure_logging hasn't been called.'''
+    if _listener is None and not logger.handlers:
+        configure_logging()
+    return logger
+
+
+atexit.register(stop_logging)
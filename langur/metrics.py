@@ -0,0 +1,242 @@
+'''
+In-process metrics for long-running agents, exposed in the Prometheus text format.
+
+Metrics are always being recorded (updates are just a dict lookup and an add, so cheap enough for hot paths).
+To expose them over HTTP:
+    from langur.metrics import serve_metrics
+    server = serve_metrics(port=9464)   # then scrape http://127.0.0.1:9464/metrics
+'''
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional, Sequence
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    '''
+    Base for a metric family. Children for particular label values are created on first use and cached,
+    so hold on to a child (metric.labels(...)) if updating it from a very hot path.
+    '''
+    type_name: str = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"Metric {self.name} requires labels {self.labelnames}")
+        return self._children[()]
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples()
+        ]
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().dec(amount)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, description, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as a {metric.type_name}")
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames)
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, labelnames)
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        '''Prometheus text exposition format (version 0.0.4)'''
+        return "\n".join(metric.render() for metric in list(self._metrics.values())) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def serve_metrics(port: int = 9464, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    '''
+    Serve metrics at http://{host}:{port}/metrics from a background thread.
+    Call .shutdown() on the returned server to stop it.
+    '''
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Don't spam stderr on every scrape
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="langur-metrics", daemon=True)
+    thread.start()
+    return server
+
+
+# Built-in metrics
+
+CYCLES = REGISTRY.counter("langur_cycles_total", "Agent cycles completed")
+CYCLE_DURATION = REGISTRY.histogram("langur_cycle_duration_seconds", "Duration of agent cycles")
+GRAPH_NODES = REGISTRY.gauge("langur_graph_nodes", "Nodes in the cognition graph (as of the last cycle)")
+GRAPH_EDGES = REGISTRY.gauge("langur_graph_edges", "Edges in the cognition graph (as of the last cycle)")
+
+READY_ACTIONS = REGISTRY.gauge("langur_ready_actions", "Actions ready to execute (executor frontier size)")
+ACTIONS_EXECUTED = REGISTRY.counter("langur_actions_executed_total", "Actions executed", ["action_type", "status"])
+ACTION_DURATION = REGISTRY.histogram("langur_action_duration_seconds", "Duration of action execution (including filling params)", ["action_type"])
+
+PLANS_CREATED = REGISTRY.counter("langur_plans_created_total", "Plans created by planner workers")
+PLANNED_ACTIONS = REGISTRY.counter("langur_planned_actions_total", "Action nodes created by planner workers")
+PLAN_ACTIONS_MERGED = REGISTRY.counter("langur_plan_actions_merged_total", "Duplicate planned actions merged by plan optimization")
+PLAN_EDGES_REMOVED = REGISTRY.counter("langur_plan_edges_removed_total", "Redundant planned dependencies removed by plan optimization")
+
+CONNECTOR_OVERVIEW_DURATION = REGISTRY.histogram("langur_connector_overview_duration_seconds", "Duration of connector overview refreshes", ["connector"])
+
+LLM_CALLS = REGISTRY.counter("langur_llm_calls_total", "BAML function calls", ["function"])
+LLM_ERRORS = REGISTRY.counter("langur_llm_errors_total", "BAML function calls which failed (after retries)", ["function"])
+LLM_RETRIES = REGISTRY.counter("langur_llm_retries_total", "BAML function call retries", ["function"])
+LLM_TOKENS = REGISTRY.counter("langur_llm_tokens_total", "Tokens used by BAML function calls", ["function", "kind"])
+LLM_DURATION = REGISTRY.histogram("langur_llm_call_duration_seconds", "Duration of BAML function calls (including retries)", ["function"])
+
+CACHE_LOOKUPS = REGISTRY.counter("langur_cache_lookups_total", "Lookups against internal caches", ["cache", "result"])
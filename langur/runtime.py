@@ -0,0 +1,178 @@
+'''
+Host many agents concurrently on one event loop, sharing LLM limits, response caches and client registries.
+
+Usage:
+    runtime = Runtime(max_concurrent_llm_calls=32)
+    for task in tasks:
+        agent = Langur(task)
+        agent.use(...)
+        runtime.add(agent)
+    runtime.run()   # or await runtime.arun() from async code
+'''
+import asyncio
+import copy
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from baml_py import ClientRegistry
+
+from langur import metrics
+from langur.cassette import call_key
+from langur.trace import Tracer
+from langur.util.event_loop import run_sync
+
+if TYPE_CHECKING:
+    from langur.langur import Langur
+    from langur.llm import LLMConfig
+
+
+class SharedLLMResources:
+    '''
+    LLM resources shared by all agents in a runtime (set on each agent's LLMClient).
+    '''
+    def __init__(self, max_concurrent_calls: int = None, cache_responses: bool = False, cache_size: int = 1024):
+        '''
+        Args:
+            max_concurrent_calls: Limit on BAML calls in flight at once, across all agents.
+            cache_responses: Reuse responses for calls with exactly the same function, inputs and LLM config
+                (including calls in flight, which are only made once). Only useful if those are deterministic enough
+                for your use case, e.g. at temperature 0.
+            cache_size: Max responses kept, least recently used are evicted first.
+        '''
+        self.max_concurrent_calls = max_concurrent_calls
+        self.cache_responses = cache_responses
+        self.cache_size = cache_size
+        self._registries: Dict[str, ClientRegistry] = {}
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Semaphores are bound to the loop they're first used on, so one is made per loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_client_registry(self, config: 'LLMConfig') -> ClientRegistry:
+        key = config.model_dump_json()
+        registry = self._registries.get(key)
+        if registry is None:
+            metrics.CACHE_LOOKUPS.labels("shared_client_registry", "miss").inc()
+            registry = self._registries[key] = config.to_registry()
+        else:
+            metrics.CACHE_LOOKUPS.labels("shared_client_registry", "hit").inc()
+        return registry
+
+    def _get_semaphore(self) -> Optional[asyncio.Semaphore]:
+        if self.max_concurrent_calls is None:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_calls)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def limit(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        '''Run fn within the concurrent call limit'''
+        semaphore = self._get_semaphore()
+        if semaphore is None:
+            return await fn()
+        async with semaphore:
+            return await fn()
+
+    async def cached(self, config: 'LLMConfig', function_name: str, args: Dict[str, Any], fn: Callable[[], Awaitable[Any]], dynamic_types: Any = None) -> tuple[Any, bool]:
+        '''
+        Get the response for a call from the cache, or make it with fn.
+        dynamic_types describes the output types of calls with a type builder, as part of the key.
+        Returns (response, whether it came from the cache).
+        '''
+        if not self.cache_responses:
+            return await fn(), False
+
+        key = call_key(function_name, {"config": config.model_dump(mode="json"), "args": args, "dynamic_types": dynamic_types})
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            metrics.CACHE_LOOKUPS.labels("llm_response", "hit").inc()
+            return copy.deepcopy(self._cache[key]), True
+        if key in self._inflight:
+            metrics.CACHE_LOOKUPS.labels("llm_response", "hit").inc()
+            return copy.deepcopy(await asyncio.shield(self._inflight[key])), True
+
+        metrics.CACHE_LOOKUPS.labels("llm_response", "miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            # Don't warn about the exception if no one else was waiting on it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return copy.deepcopy(result), False
+        finally:
+            del self._inflight[key]
+
+
+@dataclass
+class AgentRun:
+    agent: 'Langur'
+    until: Optional[str] = None
+    tracer: Optional[Tracer] = None
+    # Set once run, if the agent failed
+    error: Optional[BaseException] = None
+
+
+class Runtime:
+    '''
+    Runs agents concurrently on a single event loop.
+    Failures are isolated: an agent raising doesn't stop the others, its exception is kept on its AgentRun.
+    '''
+    def __init__(
+        self,
+        max_concurrent_agents: int = None,
+        max_concurrent_llm_calls: int = None,
+        cache_llm_responses: bool = False,
+        llm: SharedLLMResources = None
+    ):
+        '''
+        Args:
+            max_concurrent_agents: Limit on agents running at once, the rest wait for a slot.
+            max_concurrent_llm_calls: Limit on BAML calls in flight at once, across all agents.
+            cache_llm_responses: Share responses between identical calls (see SharedLLMResources).
+            llm: Use these shared LLM resources instead of creating them from the above.
+        '''
+        self.max_concurrent_agents = max_concurrent_agents
+        self.llm = llm if llm else SharedLLMResources(
+            max_concurrent_calls=max_concurrent_llm_calls,
+            cache_responses=cache_llm_responses
+        )
+        self.runs: List[AgentRun] = []
+
+    def add(self, agent: 'Langur', until: str = None, tracer: Tracer = None) -> AgentRun:
+        agent.agent.cg.llm.shared = self.llm
+        agent_run = AgentRun(agent=agent, until=until, tracer=tracer)
+        self.runs.append(agent_run)
+        return agent_run
+
+    async def arun(self) -> List[AgentRun]:
+        '''Run all added agents until they're done.'''
+        semaphore = asyncio.Semaphore(self.max_concurrent_agents) if self.max_concurrent_agents else None
+
+        async def run_one(agent_run: AgentRun):
+            try:
+                if semaphore is None:
+                    await agent_run.agent.arun(until=agent_run.until, tracer=agent_run.tracer)
+                else:
+                    async with semaphore:
+                        await agent_run.agent.arun(until=agent_run.until, tracer=agent_run.tracer)
+            except Exception as e:
+                agent_run.error = e
+
+        await asyncio.gather(*[run_one(agent_run) for agent_run in self.runs])
+        return self.runs
+
+    def run(self, loop_factory: Optional[Callable[[], asyncio.AbstractEventLoop]] = None) -> List[AgentRun]:
+        '''Run all added agents until they're done, on a new event loop (from loop_factory if given, e.g. uvloop.new_event_loop).'''
+        return run_sync(self.arun(), loop_factory=loop_factory)
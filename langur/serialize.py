@@ -0,0 +1,415 @@
+'''
+Compact streaming format for saving / loading agents, as an alternative to one big JSON document.
+
+Nodes and edges are written and read one record at a time, so neither side materializes the whole agent,
+and large records (e.g. action outputs with file contents) are zlib compressed.
+
+Layout:
+    MAGIC
+    records: kind (1 byte) | flags (1 byte) | body length (4 bytes, big endian) | body (compact JSON, UTF-8)
+    footer: offset of the index record (8 bytes, big endian) | INDEX_MAGIC
+
+Records, in order:
+    H: header - llm config, budget, usage and blob store config
+    B: one blob, as [digest, content] - either from an in memory blob store, or a large node output
+       (saved once per distinct output, with the node holding a blob handle instead)
+    W: one worker (Worker.to_json, so dispatched on worker_type when read)
+    N: one node (Node.to_json, so dispatched on node_type when read)
+    E: a batch of edges, as [src_node_id, relation, dest_node_id] lists
+    Z: end, with the number of workers / nodes / edges written, checked when read
+    I: index of where the other records are, for loading lazily (see read_agent_lazy). Nodes are listed as
+       [id, node_type, offset, pending], so pending actions can be found without reading the others.
+'''
+import hashlib
+import json
+import struct
+import zlib
+from typing import IO, TYPE_CHECKING, Iterator, Type
+
+from langur.blobs import HANDLE_PREFIX, BlobStore, is_handle
+from langur.graph.edge import Edge
+from langur.graph.graph import CognitionGraph
+from langur.graph.node import Node
+from langur.graph.storage import GraphStorage, NodeTypes, is_pending
+from langur.llm import LLMClient, LLMConfig
+from langur.usage import LLMBudget, UsageTracker
+from langur.workers.worker import Worker
+
+if TYPE_CHECKING:
+    from langur.agent import Agent
+
+MAGIC = b"LANGUR\x00\x01"
+INDEX_MAGIC = b"LANGURIX"
+RECORD_HEADER = struct.Struct(">cBI")
+FOOTER = struct.Struct(">Q")
+FLAG_ZLIB = 1
+
+# Bodies at least this large are compressed
+COMPRESS_MIN_BYTES = 512
+# Node outputs at least this large are saved as blobs
+OUTLINE_MIN_CHARS = 4096
+EDGES_PER_RECORD = 1024
+
+
+class FormatError(ValueError):
+    pass
+
+
+def is_binary(path: str) -> bool:
+    '''Whether the file at path is in this format (rather than JSON)'''
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_record(f: IO[bytes], kind: bytes, data, compress_level: int) -> int:
+    '''Returns the record's offset'''
+    offset = f.tell()
+    body = json.dumps(data, separators=(",", ":")).encode()
+    flags = 0
+    if compress_level and len(body) >= COMPRESS_MIN_BYTES:
+        body = zlib.compress(body, compress_level)
+        flags |= FLAG_ZLIB
+    f.write(RECORD_HEADER.pack(kind, flags, len(body)))
+    f.write(body)
+    return offset
+
+
+def read_record(f: IO[bytes]) -> tuple[bytes, object]:
+    header = f.read(RECORD_HEADER.size)
+    if len(header) < RECORD_HEADER.size:
+        raise FormatError("Unexpected end of file, agent was not completely saved")
+    kind, flags, length = RECORD_HEADER.unpack(header)
+    body = f.read(length)
+    if len(body) < length:
+        raise FormatError("Unexpected end of file, agent was not completely saved")
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return kind, json.loads(body)
+
+
+def read_record_at(f: IO[bytes], offset: int) -> tuple[bytes, object]:
+    f.seek(offset)
+    return read_record(f)
+
+
+def write_agent(agent: 'Agent', f: IO[bytes], compress_level: int = 1):
+    '''
+    Args:
+        compress_level: zlib level for large records, 0 to not compress.
+    '''
+    index = {"workers": [], "nodes": [], "blobs": [], "edges": []}
+    f.write(MAGIC)
+    blobs = agent.cg.blobs.to_json() if agent.cg.blobs else None
+    blob_data = blobs.pop("blobs", {}) if blobs else {}
+    write_record(f, b"H", {
+        "llm": agent.llm_config.model_dump(mode="json"),
+        "budget": agent.budget.model_dump(mode="json") if agent.budget else None,
+        "usage": agent.usage.to_json(),
+        "blobs": blobs,
+    }, compress_level)
+
+    for digest, content in blob_data.items():
+        index["blobs"].append([digest, write_record(f, b"B", [digest, content], compress_level)])
+
+    for worker in agent.workers:
+        index["workers"].append(write_record(f, b"W", worker.to_json(), compress_level))
+
+    # Outputs in a blob store on disk are left there
+    outline = agent.cg.blobs is None or agent.cg.blobs.path is None
+    outlined = set()
+    for node in agent.cg.storage.iter_nodes():
+        data = node.to_json()
+        output = data.get("output")
+        if outline and isinstance(output, str) and len(output) >= OUTLINE_MIN_CHARS and not is_handle(output):
+            # Saved separately, so lazy loads only read it if it's used
+            digest = hashlib.sha256(output.encode()).hexdigest()
+            if digest not in outlined:
+                outlined.add(digest)
+                index["blobs"].append([digest, write_record(f, b"B", [digest, output], compress_level)])
+            data["output"] = HANDLE_PREFIX + digest
+        index["nodes"].append([node.id, data["node_type"], write_record(f, b"N", data, compress_level), is_pending(node)])
+
+    batch = []
+    for edge in agent.cg.storage.iter_edges():
+        batch.append([edge.src_node.id, edge.relation, edge.dest_node.id])
+        if len(batch) == EDGES_PER_RECORD:
+            index["edges"].append(write_record(f, b"E", batch, compress_level))
+            batch = []
+    if batch:
+        index["edges"].append(write_record(f, b"E", batch, compress_level))
+
+    write_record(f, b"Z", {"workers": len(agent.workers), "nodes": len(index["nodes"]), "edges": agent.cg.edge_count()}, 0)
+    f.write(FOOTER.pack(write_record(f, b"I", index, compress_level)) + INDEX_MAGIC)
+
+
+def read_header(f: IO[bytes]) -> tuple[LLMConfig, LLMClient, dict]:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise FormatError("Not a Langur agent file (or saved by an incompatible version)")
+
+    kind, header = read_record(f)
+    if kind != b"H":
+        raise FormatError(f"Expected header record, got {kind!r}")
+    llm_config = LLMConfig.model_validate(header["llm"])
+    llm = LLMClient(
+        llm_config,
+        usage=UsageTracker.from_json(header["usage"]) if header.get("usage") else None,
+        budget=LLMBudget.model_validate(header["budget"]) if header.get("budget") else None
+    )
+    return llm_config, llm, header
+
+
+def read_agent(f: IO[bytes]) -> 'Agent':
+    from langur.agent import Agent
+
+    llm_config, llm, header = read_header(f)
+    blobs = BlobStore.from_json(header["blobs"]) if header.get("blobs") else None
+    # Large outputs saved as blobs, put back into their nodes when there's no blob store
+    outlined = {}
+
+    workers = []
+    cg = None
+    while True:
+        kind, data = read_record(f)
+        if kind == b"B":
+            if blobs is not None:
+                blobs._blobs[data[0]] = data[1]
+            else:
+                outlined[HANDLE_PREFIX + data[0]] = data[1]
+            continue
+        if kind == b"W":
+            workers.append(Worker.from_json(data))
+            continue
+        if cg is None:
+            # Workers all come first
+            cg = CognitionGraph(workers=workers, llm_config=llm_config, llm=llm, blobs=blobs)
+        if kind == b"N":
+            if is_handle(data.get("output")) and data["output"] in outlined:
+                data["output"] = outlined[data["output"]]
+            cg.add_node(Node.from_json(data))
+        elif kind == b"E":
+            for src_id, relation, dest_id in data:
+                cg.add_edge_by_ids(src_id, relation, dest_id)
+        elif kind == b"Z":
+            if (data["workers"], data["nodes"], data["edges"]) != (len(workers), cg.node_count(), cg.edge_count()):
+                raise FormatError("Agent file is inconsistent, counts don't match what was read")
+            break
+        else:
+            raise FormatError(f"Unknown record kind: {kind!r}")
+    check_index(f)
+
+    return Agent(workers=workers, llm_config=llm_config, cg=cg)
+
+
+def check_index(f: IO[bytes]):
+    '''
+    Check the index record and footer after the end record were completely written, if there are any
+    (files saved before indexes were added end at the end record). The index itself is skipped.
+    '''
+    offset = f.tell()
+    header = f.read(RECORD_HEADER.size)
+    if not header:
+        return
+    if len(header) < RECORD_HEADER.size:
+        raise FormatError("Unexpected end of file, agent was not completely saved")
+    kind, _, length = RECORD_HEADER.unpack(header)
+    if kind != b"I":
+        raise FormatError(f"Expected index record, got {kind!r}")
+    f.seek(length, 1)
+    footer = f.read()
+    if len(footer) != FOOTER.size + len(INDEX_MAGIC) or not footer.endswith(INDEX_MAGIC):
+        raise FormatError("Unexpected end of file, agent was not completely saved")
+    if FOOTER.unpack(footer[:FOOTER.size])[0] != offset:
+        raise FormatError("Agent file is inconsistent, footer doesn't point to the index")
+
+
+class FileBlobs(BlobStore):
+    '''In memory blob store which reads blobs saved in an agent file when they're first needed'''
+    def __init__(self, f: IO[bytes], offsets: dict[str, int], threshold: int = OUTLINE_MIN_CHARS, cache_size: int = 128):
+        super().__init__(path=None, threshold=threshold, cache_size=cache_size)
+        self._file = f
+        self._offsets = offsets
+
+    def put(self, data: str) -> tuple[str, bool]:
+        handle, new = super().put(data)
+        if new and self._offsets.pop(handle[len(HANDLE_PREFIX):], None) is not None:
+            # Was in the file, but is now in memory
+            return handle, False
+        return handle, new
+
+    def get(self, handle: str) -> str:
+        digest = handle[len(HANDLE_PREFIX):]
+        if digest not in self._blobs and digest in self._offsets:
+            self._blobs[digest] = read_record_at(self._file, self._offsets.pop(digest))[1][1]
+        return super().get(handle)
+
+    def to_json(self) -> dict:
+        # Everything has to be read to be saved elsewhere
+        for digest in list(self._offsets):
+            self.get(HANDLE_PREFIX + digest)
+        return super().to_json()
+
+
+class LazyStorage(GraphStorage):
+    '''
+    Graph storage over a binary agent file, where node objects are only read (and validated) when first accessed.
+    Edges, and node ids / types / whether they're pending, are read up front from the file's index. Accessed and added
+    nodes are kept in memory.
+    '''
+    def __init__(self, f: IO[bytes], node_index: list[list], edges: list[list], outlined: dict[str, int] = None):
+        self._file = f
+        # Digest -> offset of large outputs saved as blobs, put back into their nodes as they're read when the agent
+        # has no blob store (like a full load)
+        self._outlined = outlined
+        # Node id -> offset of its record, for nodes not read yet
+        self._offsets: dict[str, int] = {}
+        self._node_types: dict[str, str] = {}
+        self._nodes: dict[str, Node] = {}
+        # Nodes not read yet which were pending when saved
+        self._unread_pending: set[str] = set()
+        self._types = NodeTypes()
+        for node_id, type_name, offset, *pending in node_index:
+            self._offsets[node_id] = offset
+            self._node_types[node_id] = type_name
+            self._types.register(type_name)
+            # Indexes saved without the flag can't tell, so those nodes are read to check
+            if not pending or pending[0]:
+                self._unread_pending.add(node_id)
+        self._edges: set[tuple[str, str, str]] = set()
+        self._outgoing: dict[str, set[tuple[str, str, str]]] = {}
+        self._incoming: dict[str, set[tuple[str, str, str]]] = {}
+        for src_id, relation, dest_id in edges:
+            self._add_edge_ids((src_id, relation, dest_id))
+
+    def _add_edge_ids(self, key: tuple[str, str, str]):
+        self._edges.add(key)
+        self._outgoing.setdefault(key[0], set()).add(key)
+        self._incoming.setdefault(key[2], set()).add(key)
+
+    def _remove_edge_ids(self, key: tuple[str, str, str]):
+        self._edges.discard(key)
+        self._outgoing.get(key[0], set()).discard(key)
+        self._incoming.get(key[2], set()).discard(key)
+
+    def add_node(self, node: Node):
+        self._types.register(type(node).__name__)
+        self._node_types[node.id] = type(node).__name__
+        self._offsets.pop(node.id, None)
+        self._unread_pending.discard(node.id)
+        self._nodes[node.id] = node
+
+    def remove_node(self, node: Node):
+        self._nodes.pop(node.id, None)
+        self._offsets.pop(node.id, None)
+        self._unread_pending.discard(node.id)
+        del self._node_types[node.id]
+
+    def get_node(self, node_id: str) -> Node | None:
+        node = self._nodes.get(node_id)
+        if node is None and node_id in self._offsets:
+            data = read_record_at(self._file, self._offsets.pop(node_id))[1]
+            output = data.get("output")
+            if self._outlined is not None and is_handle(output):
+                data["output"] = read_record_at(self._file, self._outlined[output[len(HANDLE_PREFIX):]])[1][1]
+            node = Node.from_json(data)
+            node._cg = self.cg
+            self._nodes[node_id] = node
+            self._unread_pending.discard(node_id)
+        return node
+
+    def has_node(self, node: Node) -> bool:
+        return self._nodes.get(node.id) is node or node.id in self._offsets
+
+    def iter_nodes(self) -> Iterator[Node]:
+        return (self.get_node(node_id) for node_id in list(self._node_types))
+
+    def node_count(self) -> int:
+        return len(self._node_types)
+
+    def _nodes_of_types(self, type_names: list[str]) -> set[Node]:
+        type_names = set(type_names)
+        return {self.get_node(node_id) for node_id, type_name in self._node_types.items() if type_name in type_names}
+
+    def nodes_by_type(self, node_type: Type[Node]) -> set[Node]:
+        return self._nodes_of_types(self._types.matching_type(node_type))
+
+    def nodes_by_tag(self, *tags: str) -> set[Node]:
+        return self._nodes_of_types(self._types.matching_tags(tags))
+
+    def pending_nodes_by_type(self, node_type: Type[Node]) -> set[Node]:
+        type_names = set(self._types.matching_type(node_type))
+        # Nodes already read are checked as they are, since they may have been executed since
+        pending = {node for node in self._nodes.values() if type(node).__name__ in type_names and is_pending(node)}
+        unread = [node_id for node_id in self._unread_pending if self._node_types[node_id] in type_names]
+        pending.update(node for node in map(self.get_node, unread) if is_pending(node))
+        return pending
+
+    def count_by_type(self, node_type: Type[Node]) -> int:
+        type_names = set(self._types.matching_type(node_type))
+        return sum(1 for type_name in self._node_types.values() if type_name in type_names)
+
+    def add_edge(self, edge: Edge):
+        self._add_edge_ids((edge.src_node.id, edge.relation, edge.dest_node.id))
+        # Edges are kept by id, not on nodes
+        edge.src_node.edges.discard(edge)
+        edge.dest_node.edges.discard(edge)
+
+    def remove_edge(self, edge: Edge):
+        self._remove_edge_ids((edge.src_node.id, edge.relation, edge.dest_node.id))
+
+    def _to_edges(self, keys) -> set[Edge]:
+        return {Edge.detached(self.get_node(src), relation, self.get_node(dest)) for src, relation, dest in keys}
+
+    def iter_edges(self) -> Iterator[Edge]:
+        return iter(self._to_edges(list(self._edges)))
+
+    def edge_count(self) -> int:
+        return len(self._edges)
+
+    def incoming_edges(self, node: Node) -> set[Edge]:
+        return self._to_edges(list(self._incoming.get(node.id, ())))
+
+    def outgoing_edges(self, node: Node) -> set[Edge]:
+        return self._to_edges(list(self._outgoing.get(node.id, ())))
+
+    def close(self):
+        self._file.close()
+
+
+def read_agent_lazy(f: IO[bytes]) -> 'Agent':
+    '''
+    Load an agent from its file's index, reading nodes and large outputs only when they're accessed.
+    The file must stay open for the life of the agent (closed by agent.cg.storage.close()).
+    Falls back to a full load for files saved without an index (which fails if the file was damaged instead).
+    '''
+    from langur.agent import Agent
+
+    f.seek(-(FOOTER.size + len(INDEX_MAGIC)), 2)
+    footer = f.read()
+    if not footer.endswith(INDEX_MAGIC):
+        f.seek(0)
+        try:
+            return read_agent(f)
+        finally:
+            f.close()
+    kind, index = read_record_at(f, FOOTER.unpack(footer[:FOOTER.size])[0])
+    if kind != b"I":
+        raise FormatError(f"Expected index record, got {kind!r}")
+
+    f.seek(0)
+    llm_config, llm, header = read_header(f)
+    blob_offsets = {digest: offset for digest, offset in index["blobs"]}
+    outlined = None
+    if not header.get("blobs"):
+        blobs = None
+        outlined = blob_offsets
+    elif header["blobs"]["path"] is not None:
+        blobs = BlobStore.from_json(header["blobs"])
+    else:
+        # Large outputs saved as blobs are left as handles, so only read if used
+        blobs = FileBlobs(f, blob_offsets, threshold=header["blobs"]["threshold"], cache_size=header["blobs"].get("cache_size", 128))
+
+    workers = [Worker.from_json(read_record_at(f, offset)[1]) for offset in index["workers"]]
+    edges = [edge for offset in index["edges"] for edge in read_record_at(f, offset)[1]]
+    storage = LazyStorage(f, index["nodes"], edges, outlined=outlined)
+    cg = CognitionGraph(workers=workers, llm_config=llm_config, llm=llm, storage=storage, blobs=blobs)
+    return Agent(workers=workers, llm_config=llm_config, cg=cg)
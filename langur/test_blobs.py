@@ -0,0 +1,44 @@
+from langur import Langur
+from langur.blobs import BlobStore, is_handle
+from langur.testing import FILE_CONTENT as CONTENT, FakeLLMServer, Files
+from langur.workers.executor import ExecutorWorker
+from langur.workers.planner import PlannerWorker
+
+def test_blob_store_dedup(tmp_path):
+    """Test that identical content is stored once on disk and resolves back"""
+    store = BlobStore(str(tmp_path / "blobs"))
+    handle, new = store.put(CONTENT)
+    assert (handle, False) == (store.put(CONTENT)[0], store.put(CONTENT)[1]) and new
+    assert len(list((tmp_path / "blobs").rglob("*"))) == 2
+    assert BlobStore(str(tmp_path / "blobs")).resolve(handle) == CONTENT
+    assert store.resolve("short output") == "short output"
+
+def test_large_outputs_as_blobs(tmp_path):
+    """Test that large outputs are kept as shared handles, survive saving, and are resolved into context"""
+    plan = {
+        "nodes": [
+            {"id": "read_a", "description": "Read a", "action_input": {"type": "read_file", "path": "a.txt"}},
+            {"id": "read_b", "description": "Read a again", "action_input": {"type": "read_file", "path": "a.txt"}},
+            {"id": "count", "description": "Count", "action_input": {"type": "count_lines", "path": "a.txt"}},
+        ],
+        "edges": [{"from_id": "read_a", "to_id": "count"}, {"from_id": "read_b", "to_id": "count"}]
+    }
+    with FakeLLMServer(script={"PlanActions": [plan]}) as server:
+        agent = Langur("Count lines", llm_config=server.llm_config(), blobs=BlobStore())
+        agent.use(Files())
+        # Keep the duplicate read, so the two outputs are the same
+        for planner in agent.agent.cg.query_workers(PlannerWorker):
+            planner.optimize = False
+        agent.run()
+
+    cg = agent.agent.cg
+    read_a, read_b = cg.query_node_by_id("read_a"), cg.query_node_by_id("read_b")
+    assert is_handle(read_a.output) and read_a.output == read_b.output
+    assert not is_handle(cg.query_node_by_id("count").output)
+
+    agent.save(str(tmp_path / "agent.json"))
+    loaded = Langur.load(str(tmp_path / "agent.json")).agent.cg
+    assert len(loaded.blobs.to_json()["blobs"]) == 1
+    executor = next(iter(loaded.query_workers(ExecutorWorker)))
+    context = executor.build_context_rec(loaded.query_node_by_id("count"))
+    assert len(context) == 2 and all(CONTENT in item for item in context)
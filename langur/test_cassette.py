@@ -0,0 +1,37 @@
+import asyncio
+
+from langur.baml_client import types
+from langur.cassette import Cassette
+from langur.llm import LLMClient, LLMConfig
+
+def test_record_then_replay(tmp_path):
+    """Test that recorded outputs are replayed as the same BAML types, falling back to node matching"""
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = Cassette(path, "record")
+    graph = types.Graph(
+        nodes=[types.ActionNode(id="read_rubric", description="Read it", action_input={"type": "read_file", "file_path": None})],
+        edges=[]
+    )
+    recorder.record("PlanActions", {"goal": "Grade quizzes"}, graph, node_id="goal_1", prompt_tokens=100, completion_tokens=20)
+    recorder.record("FillParams", {"context": "took 1.3s"}, types.FilledParams(file_path="rubric.txt"), node_id="read_rubric")
+    recorder.record("CreateAssumptions", {"task": "t"}, [types.Assumption(assumption_id="a", assumption="b")])
+
+    client = LLMClient(LLMConfig(provider="anthropic", options={}, cassette_mode="replay", cassette_path=path))
+
+    async def run():
+        plan = await client.call("PlanActions", {"goal": "Grade quizzes"}, node_id="goal_1")
+        # Inputs differ from the recording, so matched by node instead
+        params = await client.call("FillParams", {"context": "took 2.7s"}, node_id="read_rubric")
+        assumptions = await client.call("CreateAssumptions", {"task": "t"})
+        return plan, params, assumptions
+
+    plan, params, assumptions = asyncio.run(run())
+    assert plan == graph
+    assert plan.nodes[0].action_input["type"] == "read_file"
+    assert params.model_dump() == {"file_path": "rubric.txt"}
+    assert assumptions == [types.Assumption(assumption_id="a", assumption="b")]
+    assert client.usage.by_function["PlanActions"].total_tokens == 120
+
+def test_cassette_settings_not_saved():
+    config = LLMConfig(provider="anthropic", options={}, cassette_mode="replay", cassette_path="x.jsonl")
+    assert "cassette_mode" not in config.model_dump(mode="json")
@@ -0,0 +1,53 @@
+import pytest
+
+from langur.llm import LLMClient, LLMConfig
+from langur.usage import BudgetExceededError, LLMBudget, LLMCallRecord, UsageTracker
+
+def make_client(budget: LLMBudget = None) -> LLMClient:
+    return LLMClient(LLMConfig(provider="anthropic", options={}), budget=budget)
+
+def test_usage_breakdown_round_trip():
+    """Test that usage accumulates per function/worker/node and survives serialization"""
+    usage = UsageTracker()
+    usage.record(LLMCallRecord("FillParams", worker_id="w1", node_id="a", prompt_tokens=10, completion_tokens=2, latency=0.5))
+    usage.record(LLMCallRecord("FillParams", worker_id="w1", node_id="b", prompt_tokens=5, completion_tokens=1, retries=1))
+    usage.record(LLMCallRecord("PlanActions", worker_id="w2", error="BamlClientError"))
+
+    assert usage.total.calls == 3
+    assert usage.total.errors == 1
+    assert usage.by_function["FillParams"].total_tokens == 18
+    assert usage.by_worker["w1"].retries == 1
+    assert usage.node_tokens("a") == 12
+    assert usage.node_tokens("missing") == 0
+
+    restored = UsageTracker.from_json(usage.to_json())
+    assert restored.to_json() == usage.to_json()
+
+def test_run_budget_aborts():
+    """Test that an exhausted run budget raises before making the call"""
+    client = make_client(LLMBudget(max_run_tokens=10))
+    client.usage.record(LLMCallRecord("Think", prompt_tokens=8, completion_tokens=2))
+    with pytest.raises(BudgetExceededError):
+        client.apply_budget({"context": "hi"})
+
+def test_node_budget_truncates_context():
+    """Test that the per-node budget keeps the tail of a truncatable argument"""
+    client = make_client(LLMBudget(max_node_tokens=10))
+    args = {"context": "a" * 40 + "b" * 20, "description": "x" * 8}
+    new_args = client.apply_budget(args, node_id="n", truncate="context")
+    assert new_args["description"] == args["description"]
+    assert new_args["context"].endswith("b" * 20)
+    assert len(new_args["context"]) < len(args["context"])
+    assert sum(len(v) for v in new_args.values()) // 4 <= 10
+
+def test_node_budget_abort_mode():
+    """Test that the per-node budget raises when degrading is disabled"""
+    client = make_client(LLMBudget(max_node_tokens=1, on_node_exceeded="abort"))
+    with pytest.raises(BudgetExceededError):
+        client.apply_budget({"context": "a" * 100}, node_id="n", truncate="context")
+
+def test_node_budget_truncation_not_enough():
+    """Test that the per-node budget raises when the other arguments alone exceed it"""
+    client = make_client(LLMBudget(max_node_tokens=10))
+    with pytest.raises(BudgetExceededError):
+        client.apply_budget({"context": "a" * 40, "description": "x" * 80}, node_id="n", truncate="context")
@@ -0,0 +1,33 @@
+import io
+import json
+import logging
+
+from langur.log import configure_logging, log_context, stop_logging
+from langur.workers.worker import Worker
+
+class EchoWorker(Worker):
+    pass
+
+def test_json_lines_include_context():
+    """Test that worker logs are written as JSON lines with worker, node and cycle fields"""
+    stream = io.StringIO()
+    configure_logging(level="INFO", json_lines=True, stream=stream)
+    try:
+        worker = EchoWorker(id="w1")
+        with log_context(cycle=3, node_id="read_rubric"):
+            worker.log("hello", "world", actions=2)
+        worker.log("filtered out", level=logging.DEBUG)
+    finally:
+        stop_logging()
+        configure_logging()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["message"] == "hello world"
+    assert record["worker_type"] == "EchoWorker"
+    assert record["worker_id"] == "w1"
+    assert record["node_id"] == "read_rubric"
+    assert record["cycle"] == 3
+    assert record["level"] == "INFO"
+    assert record["actions"] == 2
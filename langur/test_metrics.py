@@ -0,0 +1,35 @@
+import urllib.request
+
+from langur.metrics import MetricsRegistry, serve_metrics
+
+def test_prometheus_text_exposition():
+    """Test rendering of counters, gauges and histograms in the Prometheus text format"""
+    registry = MetricsRegistry()
+    calls = registry.counter("llm_calls_total", "Calls", ["function"])
+    calls.labels("FillParams").inc()
+    calls.labels("FillParams").inc(2)
+    registry.gauge("ready_actions", "Ready").set(4)
+    latency = registry.histogram("latency_seconds", "Latency", ["function"], buckets=(0.1, 1.0))
+    latency.labels("Think").observe(0.05)
+    latency.labels("Think").observe(0.5)
+    latency.labels("Think").observe(5)
+
+    text = registry.render()
+    assert "# TYPE llm_calls_total counter" in text
+    assert 'llm_calls_total{function="FillParams"} 3' in text
+    assert "ready_actions 4" in text
+    assert 'latency_seconds_bucket{function="Think",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{function="Think",le="1"} 2' in text
+    assert 'latency_seconds_bucket{function="Think",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{function="Think"} 3' in text
+
+def test_serve_metrics():
+    registry = MetricsRegistry()
+    registry.counter("cycles_total", "Cycles").inc()
+    server = serve_metrics(port=0, registry=registry)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+    finally:
+        server.shutdown()
+    assert "cycles_total 1" in body
@@ -0,0 +1,57 @@
+import asyncio
+
+from langur import Langur
+from langur.actions import ActionNode
+from langur.llm import LLMConfig
+from langur.runtime import Runtime, SharedLLMResources
+from langur.testing import Calculator, FakeLLMServer
+
+def make_agent(server: FakeLLMServer, task: str) -> Langur:
+    agent = Langur(task, llm_config=server.llm_config())
+    agent.use(Calculator())
+    return agent
+
+def test_runtime_runs_agents_concurrently():
+    """Test that agents share one loop and one client registry, and a failing agent doesn't stop the others"""
+    with FakeLLMServer(plan_size=2, plan_action_types=["add"]) as server:
+        runtime = Runtime(max_concurrent_llm_calls=2)
+        runs = [runtime.add(make_agent(server, f"Task {i}")) for i in range(4)]
+        broken = runtime.add(Langur("Broken", llm_config=server.llm_config().model_copy(update={"provider": "nonexistent"})))
+        runtime.run()
+
+    for agent_run in runs:
+        assert agent_run.error is None
+        assert len(agent_run.agent.agent.cg.query_nodes_by_type(ActionNode)) == 2
+    assert broken.error is not None
+    registries = {id(agent_run.agent.agent.cg.get_client_registry()) for agent_run in runs}
+    assert len(registries) == 1
+
+def test_runtime_response_cache():
+    """Test that identical calls across agents are only made once"""
+    with FakeLLMServer(plan_size=2, plan_action_types=["add"]) as server:
+        runtime = Runtime(cache_llm_responses=True)
+        runs = [runtime.add(make_agent(server, "Same task")) for _ in range(3)]
+        runtime.run()
+
+    assert all(agent_run.error is None for agent_run in runs)
+    assert server.requests["PlanActions"] == 1
+    assert server.requests["FillParams"] == 2
+
+def test_runtime_cache_keyed_by_dynamic_types():
+    """Test that calls differing only in their dynamic output types don't share cached responses"""
+    shared = SharedLLMResources(cache_responses=True)
+    config = LLMConfig(provider="anthropic", options={})
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return len(calls)
+
+    async def make_calls():
+        return [
+            await shared.cached(config, "FillParams", {"needed_inputs": "x"}, call, dynamic_types={"x": {"type": "integer"}}),
+            await shared.cached(config, "FillParams", {"needed_inputs": "x"}, call, dynamic_types={"x": {"type": "string"}}),
+            await shared.cached(config, "FillParams", {"needed_inputs": "x"}, call, dynamic_types={"x": {"type": "string"}}),
+        ]
+
+    assert asyncio.run(make_calls()) == [(1, False), (2, False), (2, True)]
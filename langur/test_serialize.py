@@ -0,0 +1,69 @@
+import pytest
+
+from langur import Langur
+from langur.actions import ActionNode
+from langur.agent import Agent
+from langur.serialize import FormatError, is_binary
+from langur.testing import Calculator, FakeLLMServer
+
+def test_binary_round_trip(tmp_path):
+    """Test that an agent saved in the binary format loads back the same as one saved as JSON"""
+    with FakeLLMServer(plan_size=3, plan_action_types=["add"], seed=0) as server:
+        agent = Langur("Add some numbers", llm_config=server.llm_config())
+        agent.use(Calculator())
+        agent.run()
+    agent.save(str(tmp_path / "agent.json"))
+    agent.save(str(tmp_path / "agent.bin"), format="binary")
+
+    assert is_binary(str(tmp_path / "agent.bin"))
+    from_json = Langur.load(str(tmp_path / "agent.json")).agent.to_json()
+    from_binary = Langur.load(str(tmp_path / "agent.bin")).agent.to_json()
+    for data in (from_json, from_binary):
+        data["graph"]["nodes"].sort(key=lambda node: node["id"])
+        data["graph"]["edges"].sort(key=lambda edge: (edge["src_node_id"], edge["relation"], edge["dest_node_id"]))
+    assert from_binary == from_json
+    assert from_binary["usage"]["total"]["calls"] == 4
+
+def test_binary_truncated(tmp_path):
+    """Test that loading an incompletely saved binary agent fails rather than silently losing state"""
+    path = tmp_path / "agent.bin"
+    Agent(workers=[Calculator()]).save(str(path), format="binary")
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(FormatError):
+        Agent.load(str(path))
+    with pytest.raises(FormatError):
+        Agent.load(str(path), lazy=True)
+
+def test_binary_lazy_load(tmp_path):
+    """Test that a lazily loaded agent only reads nodes and large outputs when they're used, and matches a full load"""
+    path = str(tmp_path / "agent.bin")
+    with FakeLLMServer(plan_size=3, plan_action_types=["add"], seed=0) as server:
+        agent = Langur("Add some numbers", llm_config=server.llm_config())
+        agent.use(Calculator())
+        agent.run()
+    action, pending_action, _ = sorted(agent.agent.cg.query_nodes_by_type(ActionNode), key=lambda node: node.id)
+    action.output = "x" * 5000
+    pending_action.output = None
+    agent.save(path, format="binary")
+
+    lazy = Agent.load(path, lazy=True)
+    storage = lazy.cg.storage
+    assert len(storage._nodes) == 0
+    assert lazy.cg.node_count() == agent.agent.cg.node_count()
+    assert lazy.cg.count_nodes_by_type(ActionNode) == 3
+    assert [node.id for node in lazy.cg.query_pending_nodes_by_type(ActionNode)] == [pending_action.id]
+    assert list(storage._nodes) == [pending_action.id]
+
+    node = lazy.cg.query_node_by_id(action.id)
+    assert len(storage._nodes) == 2
+    # Without a blob store, large outputs are put back into their nodes and new ones are kept in them, like a full load
+    assert node.output == "x" * 5000
+    assert lazy.cg.blobs is None and lazy.cg.store_output("y" * 5000) == "y" * 5000
+
+    data = lazy.to_json()
+    expected = Agent.load(path).to_json()
+    for d in (data, expected):
+        d["graph"]["nodes"].sort(key=lambda node: node["id"])
+        d["graph"]["edges"].sort(key=lambda edge: (edge["src_node_id"], edge["relation"], edge["dest_node_id"]))
+    assert data == expected and data["blobs"] is None
+    storage.close()
@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from langur.trace import Tracer, span, use_tracer
+
+def test_concurrent_spans_get_separate_lanes(tmp_path):
+    """Test that spans from concurrent tasks don't share a lane and export as chrome trace events"""
+    tracer = Tracer(baml_spans=False)
+
+    async def node(node_id: str):
+        with span("execute_node", node_id=node_id):
+            await asyncio.sleep(0.01)
+
+    async def run():
+        with use_tracer(tracer), span("Agent.run"):
+            await asyncio.gather(node("a"), node("b"))
+
+    asyncio.run(run())
+
+    path = tmp_path / "trace.json"
+    tracer.save(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert {e["name"] for e in spans} == {"Agent.run", "execute_node"}
+    node_spans = [e for e in spans if e["name"] == "execute_node"]
+    assert {e["args"]["node_id"] for e in node_spans} == {"a", "b"}
+    assert len({e["tid"] for e in node_spans}) == 2
+
+def test_span_without_tracer_is_noop():
+    with span("noop", x=1) as args:
+        args["y"] = 2
@@ -0,0 +1,80 @@
+import base64
+import json
+import re
+import urllib.request
+import zlib
+
+from langur import Langur
+from langur.agent import Agent
+from langur.testing import Calculator, FakeLLMServer
+from langur.viewer import GraphMirror, TimelineRecorder, serve_viewer
+
+def read_event(stream) -> tuple[str, dict]:
+    name = None
+    for line in stream:
+        line = line.decode().rstrip("\n")
+        if line.startswith("event: "):
+            name = line[len("event: "):]
+        elif line.startswith("data: "):
+            return name, json.loads(line[len("data: "):])
+
+def test_live_viewer_streams_changes():
+    """Test that the live viewer sends a snapshot, then only what changed"""
+    calculator = Calculator()
+    agent = Agent(workers=[calculator])
+    action_type = next(iter(calculator.get_action_node_types()))
+    agent.cg.add_node(action_type(id="a1", inputs={"x": 1, "y": 2}, purpose="Add", connector_id=calculator.id))
+    viewer = serve_viewer(agent.cg, port=0, interval=0)
+    try:
+        assert b"EventSource" in urllib.request.urlopen(viewer.url, timeout=5).read()
+        with urllib.request.urlopen(viewer.url + "events", timeout=5) as stream:
+            assert read_event(stream) == ("snapshot", {"nodes": [["a1", action_type.__name__, "pending"]], "edges": []})
+
+            with agent.cg.batch():
+                agent.cg.add_node(action_type(id="a2", inputs={"x": 1, "y": 2}, purpose="Add", connector_id=calculator.id))
+                agent.cg.add_edge_by_ids("a1", "dependency", "a2")
+                agent.cg.query_node_by_id("a1").output = "3"
+            assert read_event(stream) == ("diff", {"ops": [
+                ["n", "a2", action_type.__name__, "pending"],
+                ["e", "a1", "dependency", "a2"],
+                ["s", "a1", "done"],
+            ]})
+    finally:
+        viewer.shutdown()
+
+def test_timeline_records_cycle_changes(tmp_path):
+    """Test that a run's timeline holds the starting graph and each cycle's changes, which replay to the final graph"""
+    plan = {
+        "nodes": [
+            {"id": "first", "description": "Add", "action_input": {"type": "add", "x": 1, "y": 2}},
+            {"id": "second", "description": "Add", "action_input": {"type": "add", "x": 3, "y": 4}},
+        ],
+        "edges": [{"from_id": "first", "to_id": "second"}]
+    }
+    recorder = TimelineRecorder()
+    with FakeLLMServer(script={"PlanActions": [plan]}) as server:
+        agent = Langur("Add numbers", llm_config=server.llm_config())
+        agent.use(Calculator())
+        agent.run(recorder=recorder)
+    recorder.save(str(tmp_path / "timeline.html"))
+
+    html = (tmp_path / "timeline.html").read_text()
+    data = json.loads(zlib.decompress(base64.b64decode(re.search(r"const DATA = '([^']*)'", html).group(1))))
+    assert len(data["cycles"]) == len(recorder.cycles) > 1
+    nodes = {node_id: [node_type, status] for node_id, node_type, status in data["start"]["nodes"]}
+    edges = {tuple(edge) for edge in data["start"]["edges"]}
+    for _, changes in data["cycles"]:
+        for kind, *args in changes:
+            if kind == "n":
+                nodes[args[0]] = args[1:]
+            elif kind == "rn":
+                del nodes[args[0]]
+            elif kind == "e":
+                edges.add(tuple(args))
+            elif kind == "re":
+                edges.discard(tuple(args))
+            elif kind == "s":
+                nodes[args[0]][1] = args[1]
+    final = GraphMirror(agent.agent.cg)
+    assert nodes == final.nodes and edges == final.edges
+    assert nodes["second"][1] == "done"
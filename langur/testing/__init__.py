@@ -0,0 +1,2 @@
+from .connectors import FILE_CONTENT, Calculator, Files
+from .fake_llm import FakeLLMServer, Latency
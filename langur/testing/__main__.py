@@ -0,0 +1,3 @@
+from .fake_llm import main
+
+main()
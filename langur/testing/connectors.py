@@ -0,0 +1,27 @@
+'''
+Connectors for tests and examples. Defined once here, since workers and action types are registered by name for
+loading saved agents, and redefining one elsewhere would replace it.
+'''
+from langur.connector import Connector, action
+
+# What Files.read_file reads, large enough to be kept as a blob
+FILE_CONTENT = "line of a large file\n" * 500
+
+
+class Calculator(Connector):
+    @action
+    def add(self, x: int, y: int):
+        '''Add two numbers'''
+        return x + y
+
+
+class Files(Connector):
+    @action(idempotent=True)
+    def read_file(self, path: str):
+        '''Read a file'''
+        return FILE_CONTENT
+
+    @action
+    def count_lines(self, path: str):
+        '''Count lines in a file'''
+        return FILE_CONTENT.count("\n")
@@ -0,0 +1,394 @@
+'''
+Local stand-in for the Anthropic / OpenAI APIs, for measuring framework overhead separately from model latency
+(load tests, benchmarks, end-to-end tests without network access).
+
+Responses for Langur's BAML functions (PlanActions, FillParams, Think, CreateAssumptions) are either scripted
+or synthesized from the output schema in the prompt, with configurable latency distributions and error rates.
+
+Usage:
+    with FakeLLMServer(latency=Latency("lognormal", 0.5, 0.2), error_rate=0.01) as server:
+        agent = Langur("Do something", llm_config=server.llm_config())
+        ...
+
+Or standalone: python -m langur.testing --port 8765 --latency uniform:0.1,0.3
+'''
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Literal, Optional, Union
+
+from langur.llm import LLMConfig
+
+# Text which uniquely identifies each BAML function's prompt
+FUNCTION_MARKERS = {
+    "PlanActions": "Your job is to plan out the execution",
+    "FillParams": "Your job is to fill in missing inputs",
+    "CreateAssumptions": "create assumptions about how to complete the task",
+    "Think": "Your job is to consider the context",
+}
+
+# Scripted response: raw text, something to JSON encode, or a function of the prompt returning either
+ScriptedResponse = Union[str, dict, list, Callable[[str], Union[str, dict, list]]]
+
+
+@dataclass
+class Latency:
+    '''
+    Latency distribution, in seconds.
+    - fixed: a
+    - uniform: between a and b
+    - exponential: mean a
+    - lognormal: median a, sigma b (of the underlying normal)
+    '''
+    kind: Literal["fixed", "uniform", "exponential", "lognormal"] = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        raise ValueError(f"Unknown latency distribution: {self.kind}")
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Latency':
+        '''Parse e.g. "0.2", "uniform:0.1,0.3" or "lognormal:0.5,0.25"'''
+        if ":" not in spec:
+            return cls("fixed", float(spec))
+        kind, params = spec.split(":", 1)
+        values = [float(v) for v in params.split(",")]
+        return cls(kind, *values)
+
+
+def detect_function(prompt: str) -> Optional[str]:
+    for name, marker in FUNCTION_MARKERS.items():
+        if marker in prompt:
+            return name
+    return None
+
+
+def synthetic_value(name: str, typ: str) -> Any:
+    typ = typ.strip()
+    if typ.endswith(" or null"):
+        typ = typ[:-len(" or null")]
+    if typ.endswith("[]"):
+        return []
+    if typ.startswith("map<"):
+        return {}
+    if typ == "int":
+        return 1
+    if typ == "float":
+        return 1.0
+    if typ == "bool":
+        return True
+    if typ == "string":
+        return f"synthetic {name}"
+    return None
+
+
+def output_schema(prompt: str) -> str:
+    marker = "Answer in JSON using this schema:"
+    return prompt.split(marker, 1)[1] if marker in prompt else ""
+
+
+def parse_action_types(prompt: str) -> Dict[str, Dict[str, str]]:
+    '''Action type name -> {param: type} from the PlanActions output schema'''
+    action_types = {}
+    for match in re.finditer(r'\{\s*\n\s*type: "([^"]+)",\n((?:[ \t]*\w+: [^\n]*,\n)*)', output_schema(prompt)):
+        params = {}
+        for param_match in re.finditer(r"^\s*(\w+): ([^\n]*),$", match.group(2), re.M):
+            params[param_match.group(1)] = param_match.group(2)
+        action_types[match.group(1)] = params
+    return action_types
+
+
+def parse_fields(prompt: str) -> Dict[str, str]:
+    '''Top level {field: type} from a flat output schema (e.g. FillParams)'''
+    return dict(re.findall(r"^  (\w+): ([^\n]*),$", output_schema(prompt), re.M))
+
+
+class FakeLLMServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        script: Dict[str, List[ScriptedResponse]] = None,
+        latency: Latency = None,
+        function_latency: Dict[str, Latency] = None,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        plan_size: int = 3,
+        plan_shape: Literal["chain", "parallel"] = "chain",
+        plan_action_types: List[str] = None,
+        fill_at_plan: bool = False,
+        seed: int = None
+    ):
+        '''
+        Args:
+            port: Port to listen on, 0 to pick a free one (see .port once started).
+            script: Responses to give per BAML function, in order. Once exhausted, responses are synthesized.
+            latency: Latency distribution for all responses.
+            function_latency: Latency distributions overriding the default for specific BAML functions.
+            error_rate: Probability of failing a request with error_status.
+            plan_size: Number of actions in synthesized plans.
+            plan_shape: "chain" to make each action depend on the previous one, "parallel" for no dependencies.
+            plan_action_types: Only use these action types in synthesized plans (default: all available, round-robin).
+            fill_at_plan: Provide all action inputs in synthesized plans, so FillParams isn't needed.
+        '''
+        self.host = host
+        self.port = port
+        self.script = {name: list(responses) for name, responses in (script or {}).items()}
+        self.latency = latency if latency else Latency()
+        self.function_latency = function_latency or {}
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.plan_size = plan_size
+        self.plan_shape = plan_shape
+        self.plan_action_types = plan_action_types
+        self.fill_at_plan = fill_at_plan
+        self.rng = random.Random(seed)
+
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set[asyncio.Task] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def llm_config(self, provider: Literal["anthropic", "openai"] = "anthropic", **kwargs) -> LLMConfig:
+        '''LLMConfig which targets this server.'''
+        base_url = self.base_url if provider == "anthropic" else f"{self.base_url}/v1"
+        return LLMConfig(
+            provider=provider,
+            options={"model": "fake", "base_url": base_url, "api_key": "fake"},
+            **kwargs
+        )
+
+    # Responses
+
+    def synthesize(self, function_name: Optional[str], prompt: str) -> Any:
+        if function_name == "PlanActions":
+            action_types = parse_action_types(prompt)
+            names = [name for name in action_types if self.plan_action_types is None or name in self.plan_action_types]
+            if not names:
+                return {"nodes": [], "edges": []}
+            nodes = []
+            for i in range(self.plan_size):
+                name = names[i % len(names)]
+                action_input = {"type": name}
+                for param, typ in action_types[name].items():
+                    action_input[param] = synthetic_value(param, typ) if self.fill_at_plan else None
+                nodes.append({"id": f"{name}_{i}", "description": f"Synthetic {name} action", "action_input": action_input})
+            edges = []
+            if self.plan_shape == "chain":
+                edges = [{"from_id": a["id"], "to_id": b["id"]} for a, b in zip(nodes, nodes[1:])]
+            return {"nodes": nodes, "edges": edges}
+        if function_name == "FillParams":
+            return {name: synthetic_value(name, typ) for name, typ in parse_fields(prompt).items()}
+        if function_name == "CreateAssumptions":
+            return [
+                {"assumption_id": "synthetic_assumption_1", "assumption": "The task can be completed with the available actions"},
+                {"assumption_id": "synthetic_assumption_2", "assumption": "No extra information is needed"},
+            ]
+        return "Synthetic thought."
+
+    def respond(self, function_name: Optional[str], prompt: str) -> str:
+        scripted = self.script.get(function_name)
+        response = scripted.pop(0) if scripted else self.synthesize(function_name, prompt)
+        if callable(response):
+            response = response(prompt)
+        return response if isinstance(response, str) else json.dumps(response)
+
+    def anthropic_response(self, text: str, prompt: str) -> dict:
+        return {
+            "id": f"msg_fake_{sum(self.requests.values())}",
+            "type": "message",
+            "role": "assistant",
+            "model": "fake",
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}
+        }
+
+    def openai_response(self, text: str, prompt: str) -> dict:
+        return {
+            "id": f"chatcmpl-fake-{sum(self.requests.values())}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "fake",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4, "total_tokens": (len(prompt) + len(text)) // 4}
+        }
+
+    async def handle_request(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        is_anthropic = path.endswith("/messages")
+        if method != "POST" or not (is_anthropic or path.endswith("/chat/completions")):
+            return 404, {"error": {"type": "not_found_error", "message": f"No route for {method} {path}"}}
+
+        request = json.loads(body)
+        prompt_parts = [request.get("system") or ""] if is_anthropic else []
+        for message in request.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, str):
+                prompt_parts.append(content)
+            else:
+                prompt_parts.extend(part.get("text", "") for part in content or [])
+        prompt = "\n".join(part for part in prompt_parts if isinstance(part, str))
+
+        function_name = detect_function(prompt)
+        self.requests[function_name] += 1
+
+        delay = self.function_latency.get(function_name, self.latency).sample(self.rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors[function_name] += 1
+            return self.error_status, {"type": "error", "error": {"type": "api_error", "message": "Synthetic failure"}}
+
+        text = self.respond(function_name, prompt)
+        return 200, self.anthropic_response(text, prompt) if is_anthropic else self.openai_response(text, prompt)
+
+    # HTTP
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, payload = await self.handle_request(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {"type": "error", "error": {"type": "api_error", "message": repr(e)}}
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Clients keep connections alive, so close them rather than waiting for them
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> 'FakeLLMServer':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # Running in a background thread, for use alongside blocking calls like Langur.run
+
+    def start_in_thread(self):
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="langur-fake-llm", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop_thread(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'FakeLLMServer':
+        self.start_in_thread()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_thread()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake LLM provider (Anthropic / OpenAI wire format) for load testing Langur")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="0", help='e.g. "0.2", "uniform:0.1,0.3", "exponential:0.5", "lognormal:0.5,0.25"')
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--plan-size", type=int, default=3)
+    parser.add_argument("--plan-shape", choices=["chain", "parallel"], default="chain")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        host=args.host,
+        port=args.port,
+        latency=Latency.parse(args.latency),
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        plan_size=args.plan_size,
+        plan_shape=args.plan_shape,
+        seed=args.seed
+    )
+
+    async def serve():
+        await server.start()
+        print(f"Fake LLM server listening on {server.base_url} (Anthropic: base_url={server.base_url}, OpenAI: base_url={server.base_url}/v1)")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,32 @@
+from langur import Langur
+from langur.actions import ActionNode
+from langur.testing import Calculator, FakeLLMServer
+
+def test_agent_end_to_end():
+    """Test that an agent can plan, fill params and execute against synthesized responses"""
+    with FakeLLMServer(plan_size=3, plan_action_types=["add"], seed=0) as server:
+        agent = Langur("Add some numbers", llm_config=server.llm_config())
+        agent.use(Calculator())
+        agent.run()
+
+    actions = agent.agent.cg.query_nodes_by_type(ActionNode)
+    assert len(actions) == 3
+    assert all(node.output.endswith("result:\n2") for node in actions)
+    assert server.requests["PlanActions"] == 1
+    assert server.requests["FillParams"] == 3
+    assert agent.usage.total.calls == 4
+
+def test_scripted_openai():
+    """Test scripted responses over the OpenAI wire format"""
+    plan = {
+        "nodes": [{"id": "add_them", "description": "Add", "action_input": {"type": "add", "x": 2, "y": 3}}],
+        "edges": []
+    }
+    with FakeLLMServer(script={"PlanActions": [plan]}) as server:
+        agent = Langur("Add 2 and 3", llm_config=server.llm_config("openai"))
+        agent.use(Calculator())
+        agent.run()
+
+    actions = agent.agent.cg.query_nodes_by_type(ActionNode)
+    assert [node.output.endswith("result:\n5") for node in actions] == [True]
+    assert "FillParams" not in server.requests
@@ -0,0 +1,197 @@
+'''
+Span tracing for agent runs, exported as Chrome trace-event JSON.
+Open saved traces in https://ui.perfetto.dev (or chrome://tracing).
+
+Usage:
+    tracer = Tracer()
+    agent.run(tracer=tracer)
+    tracer.save("trace.json")
+'''
+import asyncio
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+_current_tracer: ContextVar[Optional['Tracer']] = ContextVar("langur_tracer", default=None)
+
+# BAML can only have one log event callback, so it forwards to whichever tracer attached last
+_baml_log_tracer: Optional['Tracer'] = None
+
+
+class Tracer:
+    '''
+    Records spans (complete "X" events) with worker / node ids as args.
+    Concurrently running asyncio tasks (e.g. workers within a cycle, or nodes being executed) are put in separate lanes (tids)
+    so their spans don't overlap, and lanes are reused once a task's spans are done.
+    '''
+    def __init__(self, baml_spans: bool = True):
+        '''
+        Args:
+            baml_spans: Also wrap BAML calls in BAML's own tracing (tagged with worker / node ids),
+                and forward any BAML log events into this trace.
+        '''
+        self.baml_spans = baml_spans
+        self.events: list[dict] = []
+        self._start = time.perf_counter()
+        self._pid = os.getpid()
+        # task key -> [lane, span depth]
+        self._active_lanes: dict[str, list[int]] = {}
+        self._free_lanes: list[int] = []
+        self._lane_count = 0
+
+    def now(self) -> float:
+        '''Microseconds since the tracer was created'''
+        return (time.perf_counter() - self._start) * 1e6
+
+    def _task_key(self) -> str:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return task.get_name() if task else f"thread-{threading.get_ident()}"
+
+    def _acquire_lane(self, key: str) -> int:
+        if key in self._active_lanes:
+            self._active_lanes[key][1] += 1
+            return self._active_lanes[key][0]
+        if self._free_lanes:
+            lane = heapq.heappop(self._free_lanes)
+        else:
+            self._lane_count += 1
+            lane = self._lane_count
+            self.events.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": lane, "args": {"name": f"lane {lane}"}})
+        self._active_lanes[key] = [lane, 1]
+        return lane
+
+    def _release_lane(self, key: str):
+        entry = self._active_lanes[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._active_lanes[key]
+            heapq.heappush(self._free_lanes, entry[0])
+
+    @contextmanager
+    def span(self, name: str, cat: str = "langur", **args: Any):
+        '''
+        Record a span around the body. Yields the span's args dict, which can be added to before the span ends.
+        '''
+        key = self._task_key()
+        lane = self._acquire_lane(key)
+        start = self.now()
+        try:
+            yield args
+        finally:
+            self.events.append({
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start,
+                "dur": self.now() - start,
+                "pid": self._pid,
+                "tid": lane,
+                "args": args
+            })
+            self._release_lane(key)
+
+    def instant(self, name: str, cat: str = "langur", **args: Any):
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "i",
+            "s": "t",
+            "ts": self.now(),
+            "pid": self._pid,
+            "tid": self._active_lanes.get(self._task_key(), [0])[0],
+            "args": args
+        })
+
+    def attach_baml(self):
+        '''Forward BAML log events (emitted when BAML tracing is configured) into this trace.'''
+        import langur.baml_client.tracing as baml_tracing
+        global _baml_log_tracer
+        _baml_log_tracer = self
+        baml_tracing.on_log_event(_forward_baml_log_event)
+
+    def detach_baml(self):
+        import langur.baml_client.tracing as baml_tracing
+        global _baml_log_tracer
+        if _baml_log_tracer is self:
+            _baml_log_tracer = None
+            baml_tracing.on_log_event(None)
+
+    def to_json(self) -> dict:
+        return {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms"
+        }
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f)
+
+
+def _forward_baml_log_event(event):
+    tracer = _baml_log_tracer
+    if tracer is None:
+        return
+    # Called from BAML's threads, so don't try to figure out a task lane
+    tracer.events.append({
+        "name": "baml_log_event",
+        "cat": "baml",
+        "ph": "i",
+        "s": "p",
+        "ts": tracer.now(),
+        "pid": tracer._pid,
+        "tid": 0,
+        "args": {
+            "event_id": event.metadata.event_id,
+            "parent_id": event.metadata.parent_id,
+            "root_event_id": event.metadata.root_event_id,
+            "start_time": event.start_time,
+            "prompt_chars": len(event.prompt) if event.prompt else 0,
+            "output_chars": len(event.raw_output) if event.raw_output else 0,
+        }
+    })
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _current_tracer.get()
+
+
+@contextmanager
+def use_tracer(tracer: Optional[Tracer]):
+    '''Make tracer the active tracer for everything run (and any tasks created) within the body.'''
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+def span(name: str, cat: str = "langur", **args: Any):
+    '''Span on the active tracer, or a no-op if not tracing.'''
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return nullcontext(args)
+    return tracer.span(name, cat, **args)
+
+
+def baml_traced(fn: Callable, **tags: str) -> Callable:
+    '''
+    If the active tracer wants it, wrap an async fn in BAML's own tracing so BAML spans are tagged
+    (e.g. with worker / node ids) and can be lined up with this trace.
+    '''
+    tracer = _current_tracer.get()
+    if tracer is None or not tracer.baml_spans:
+        return fn
+    import langur.baml_client.tracing as baml_tracing
+    async def tagged(*args, **kwargs):
+        baml_tracing.set_tags(**{k: v for k, v in tags.items() if v is not None})
+        return await fn(*args, **kwargs)
+    tagged.__name__ = fn.__name__
+    return baml_tracing.trace(tagged)
@@ -0,0 +1,128 @@
+'''
+Token / latency accounting for LLM (BAML function) calls, plus optional budgets.
+'''
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Literal, Optional
+
+from pydantic import BaseModel
+
+# Rough heuristic used when we need to estimate tokens before a prompt is sent
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+
+class LLMBudget(BaseModel):
+    '''
+    Optional limits on LLM usage. Any limit left as None is not enforced.
+
+    max_run_tokens: Total prompt + completion tokens the agent may use. Exceeding it aborts the run.
+    max_run_calls: Total number of BAML function calls the agent may make. Exceeding it aborts the run.
+    max_node_tokens: Tokens that may be spent on behalf of a single node (e.g. an action being filled in / executed).
+    on_node_exceeded: What to do when a call would exceed the per-node budget:
+        - "truncate": degrade gracefully by truncating the call's context to fit what's left
+        - "abort": raise BudgetExceededError
+    '''
+    max_run_tokens: Optional[int] = None
+    max_run_calls: Optional[int] = None
+    max_node_tokens: Optional[int] = None
+    on_node_exceeded: Literal["truncate", "abort"] = "truncate"
+
+
+@dataclass
+class UsageStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, other: 'UsageStats'):
+        self.calls += other.calls
+        self.errors += other.errors
+        self.retries += other.retries
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.latency += other.latency
+
+
+@dataclass
+class LLMCallRecord:
+    '''A single (possibly retried) BAML function call.'''
+    function_name: str
+    worker_id: Optional[str] = None
+    node_id: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    retries: int = 0
+    error: Optional[str] = None
+
+    def to_stats(self) -> UsageStats:
+        return UsageStats(
+            calls=1,
+            errors=1 if self.error is not None else 0,
+            retries=self.retries,
+            prompt_tokens=self.prompt_tokens,
+            completion_tokens=self.completion_tokens,
+            latency=self.latency
+        )
+
+
+@dataclass
+class UsageTracker:
+    '''
+    Accumulates LLM usage for an agent, broken down by BAML function, by worker and by node.
+    '''
+    total: UsageStats = field(default_factory=UsageStats)
+    by_function: Dict[str, UsageStats] = field(default_factory=lambda: defaultdict(UsageStats))
+    by_worker: Dict[str, UsageStats] = field(default_factory=lambda: defaultdict(UsageStats))
+    by_node: Dict[str, UsageStats] = field(default_factory=lambda: defaultdict(UsageStats))
+
+    def record(self, record: LLMCallRecord):
+        stats = record.to_stats()
+        self.total.add(stats)
+        self.by_function[record.function_name].add(stats)
+        if record.worker_id is not None:
+            self.by_worker[record.worker_id].add(stats)
+        if record.node_id is not None:
+            self.by_node[record.node_id].add(stats)
+
+    def node_tokens(self, node_id: str) -> int:
+        if node_id not in self.by_node:
+            return 0
+        return self.by_node[node_id].total_tokens
+
+    def summary(self) -> str:
+        lines = [f"Total: {self.total.calls} calls, {self.total.prompt_tokens} prompt + {self.total.completion_tokens} completion tokens, {self.total.latency:.2f}s"]
+        for name, stats in sorted(self.by_function.items()):
+            lines.append(f"  {name}: {stats.calls} calls, {stats.total_tokens} tokens, {stats.latency:.2f}s, {stats.retries} retries, {stats.errors} errors")
+        return "\n".join(lines)
+
+    def to_json(self) -> dict:
+        return {
+            "total": asdict(self.total),
+            "by_function": {k: asdict(v) for k, v in self.by_function.items()},
+            "by_worker": {k: asdict(v) for k, v in self.by_worker.items()},
+            "by_node": {k: asdict(v) for k, v in self.by_node.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'UsageTracker':
+        tracker = cls(total=UsageStats(**data["total"]))
+        for key in ("by_function", "by_worker", "by_node"):
+            breakdown = getattr(tracker, key)
+            for k, v in data.get(key, {}).items():
+                breakdown[k] = UsageStats(**v)
+        return tracker
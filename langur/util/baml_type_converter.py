@@ -1,7 +1,10 @@
 import random
 import string
-from typing import Dict, List, Literal, Optional, TypedDict, Union
-from langur.baml_client.type_builder import TypeBuilder, FieldType
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, TypedDict, Union
+from baml_py.type_builder import FieldType
+
+if TYPE_CHECKING:
+    from langur.baml_client.type_builder import TypeBuilder
 
 # Src: https://github.com/BoundaryML/berkeley-gorilla/blob/2db7841748ef3af9d365c206904002261844d9da/berkeley-function-call-leaderboard/model_handler/baml_handler.py
 
@@ -22,7 +25,7 @@ class ArrayParam(BaseParam):
     items: Union["BaseParam", "ArrayParam", "MapParameters"]
     description: str
 
-def get_type_base(p: MapParameters | BaseParam | ArrayParam, tb: TypeBuilder) -> FieldType:
+def get_type_base(p: MapParameters | BaseParam | ArrayParam, tb: 'TypeBuilder') -> FieldType:
     match p['type']:
         case "array":
             return get_type_base(p['items'], tb).list()    
@@ -67,7 +70,7 @@ def get_type_base(p: MapParameters | BaseParam | ArrayParam, tb: TypeBuilder) ->
             return tb.string()
     raise UnsupportedType(p['type'])
 
-def get_type(type: str, tb: TypeBuilder, required: bool):
+def get_type(type: str, tb: 'TypeBuilder', required: bool):
     base = get_type_base(type, tb)
     if required:
         return base
@@ -0,0 +1,52 @@
+'''
+Running agents from synchronous code, both in regular scripts / services and in Jupyter notebooks.
+
+Notebooks already have a running event loop, which asyncio.run refuses to nest in. nest_asyncio works around
+that by patching asyncio, but the patch is process-wide and slows down every task step, so it's only applied
+when actually needed (a running loop is detected) or when explicitly enabled.
+'''
+import asyncio
+import os
+from typing import Any, Callable, Coroutine, Optional
+
+_nested_enabled = False
+
+
+def enable_nested_event_loops():
+    '''
+    Patch asyncio (with nest_asyncio) to allow running agents synchronously from within a running event loop.
+    Applied automatically when needed, but can be called up front. Set LANGUR_NEST_ASYNCIO=1 to apply it on import.
+    '''
+    global _nested_enabled
+    if not _nested_enabled:
+        import nest_asyncio
+        nest_asyncio.apply()
+        _nested_enabled = True
+
+
+def run_sync(coro: Coroutine, loop_factory: Optional[Callable[[], asyncio.AbstractEventLoop]] = None) -> Any:
+    '''
+    Run a coroutine to completion from synchronous code.
+
+    Args:
+        loop_factory: Creates the event loop to run on, e.g. uvloop.new_event_loop.
+            Ignored if there is already a running loop (e.g. in a notebook), since that loop is used instead.
+    '''
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        running = False
+    else:
+        running = True
+
+    if running or _nested_enabled:
+        # Patched asyncio.run runs on the current loop
+        enable_nested_event_loops()
+        return asyncio.run(coro)
+
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(coro)
+
+
+if os.environ.get("LANGUR_NEST_ASYNCIO", "").lower() in ("1", "true", "yes"):
+    enable_nested_event_loops()
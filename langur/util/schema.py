@@ -7,7 +7,7 @@ from pydantic import Field, PydanticSchemaGenerationError, TypeAdapter
 from pydantic.fields import FieldInfo
 
 from langur.actions import ActionContext
-from langur.baml_client.type_builder import TypeBuilder, FieldType
+from baml_py.type_builder import FieldType
 from langur.util.baml_type_converter import get_type_base
 
 if TYPE_CHECKING:
@@ -175,6 +175,7 @@ def schema_from_function(
     # TODO: Should maybe just be one FieldType to captured top-level required properly?
     # Ideally should not be going Python -> JSON Schema -> BAML FieldType anyway, and do Python -> BAML FieldType instead.
     # Hm but maybe we have to to properly support langchain tool conversion
+    from langur.baml_client.type_builder import TypeBuilder
     tb = TypeBuilder()
     baml_types = {k: get_type_base(v, tb) for k, v in json_schema["properties"].items()}
     #baml_types = get_type_base(json_schema, tb)
@@ -0,0 +1,40 @@
+import asyncio
+import subprocess
+import sys
+
+from langur.util.event_loop import run_sync
+
+async def add(x: int, y: int) -> int:
+    await asyncio.sleep(0)
+    return x + y
+
+def test_import_does_not_patch_asyncio():
+    """Test that importing langur leaves asyncio unpatched"""
+    output = subprocess.run(
+        [sys.executable, "-c", "import asyncio, langur; print(getattr(asyncio, '_nest_patched', False))"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == "False"
+
+def test_run_sync_loop_factory():
+    """Test that a custom loop factory is used"""
+    loops = []
+    def factory():
+        loops.append(asyncio.new_event_loop())
+        return loops[-1]
+    assert run_sync(add(1, 2), loop_factory=factory) == 3
+    assert len(loops) == 1 and loops[0].is_closed()
+
+def test_run_sync_from_running_loop():
+    """Test that running synchronously from within a running loop (like in a notebook) works"""
+    output = subprocess.run(
+        [sys.executable, "-c", (
+            "import asyncio\n"
+            "from langur.util.event_loop import run_sync\n"
+            "async def inner(): return 42\n"
+            "async def outer(): return run_sync(inner())\n"
+            "print(asyncio.run(outer()))"
+        )],
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == "42"
@@ -1,6 +1,11 @@
 from typing import TypeVar, Type, Set, Dict, Generic, Iterable, Optional
 from collections import defaultdict
 
+from langur import metrics
+
+_INDEX_HIT = metrics.CACHE_LOOKUPS.labels("type_index", "hit")
+_INDEX_REBUILD = metrics.CACHE_LOOKUPS.labels("type_index", "miss")
+
 T = TypeVar('T')
 
 class TypeKey:
@@ -45,12 +50,16 @@ class TypeIndex(Generic[T]):
     def add(self, obj: T) -> None:
         """Add an object to the index"""
         self._objects.add(obj)
-        self._dirty = True
+        if not self._dirty:
+            for type_key in self._get_type_keys(obj):
+                self._type_index[type_key].add(obj)
 
     def remove(self, obj: T) -> None:
         """Remove an object from the index"""
         self._objects.discard(obj)
-        self._dirty = True
+        if not self._dirty:
+            for type_key in self._get_type_keys(obj):
+                self._type_index[type_key].discard(obj)
 
     def clear(self) -> None:
         """Clear the entire index"""
@@ -60,7 +69,10 @@ class TypeIndex(Generic[T]):
 
     def _ensure_index(self) -> None:
         """Rebuild type index if dirty"""
-        if self._dirty:
+        if not self._dirty:
+            _INDEX_HIT.inc()
+        else:
+            _INDEX_REBUILD.inc()
             self._type_index.clear()
             for obj in self._objects:
                 # Index object under each of its type keys
@@ -71,7 +83,8 @@ class TypeIndex(Generic[T]):
     def get_by_type(self, type_: Type[T]) -> Set[T]:
         """Get all objects of the specified type (including subclasses)"""
         self._ensure_index()
-        return self._type_index[self._get_type_key(type_)]
+        # A copy, since the index is updated in place as objects are added and removed
+        return set(self._type_index[self._get_type_key(type_)])
 
     def get_by_types_union(self, *types: Type[T]) -> Set[T]:
         """Get objects matching ANY of the given types"""
@@ -1,5 +1,17 @@
+import base64
+import json
 import os
+import threading
+import time
+import zlib
+from collections import deque
+from itertools import islice
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langur.graph.graph import CognitionGraph
 
 VIEWER_TEMPLATE = '''
 <!DOCTYPE html>
@@ -133,4 +145,583 @@ def generate_viewer(path):
     with open(output_path, 'w') as f:
         f.write(viewer_html)
     
-    return str(output_path)
\ No newline at end of file
+    return str(output_path)
+
+# Page and renderer shared by the live viewer and timelines: a canvas with an incremental force layout of the
+# nodes and edges changed with apply(op). Pages using it define statusLabel().
+_GRAPH_PAGE_HEAD = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>{{title}}</title>
+    <style>
+        body { margin: 0; font-family: Arial, sans-serif; overflow: hidden; }
+        #status { position: absolute; top: 10px; left: 10px; background: #ffffffdd; padding: 6px 10px; border-radius: 5px; font-size: 14px; }
+        #tooltip { position: absolute; display: none; background: #000000cc; color: white; padding: 4px 8px; border-radius: 4px; font-size: 12px; pointer-events: none; }
+        canvas { display: block; }
+    </style>
+</head>
+<body>
+    <div id="status"></div>
+    <div id="tooltip"></div>
+    <canvas id="graph"></canvas>
+'''
+
+_GRAPH_SCRIPT = '''
+        const canvas = document.getElementById('graph');
+        const ctx = canvas.getContext('2d');
+        const statusText = document.getElementById('status');
+        const tooltip = document.getElementById('tooltip');
+
+        // id -> {id, type, status, x, y, vx, vy}, and "src|relation|dest" -> {src, relation, dest}
+        let nodes = new Map();
+        let edges = new Map();
+        let heat = 1;
+        let view = {x: 0, y: 0, scale: 1};
+
+        const palette = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#17becf', '#bcbd22'];
+        const typeColors = new Map();
+        function colorFor(type) {
+            if (!typeColors.has(type)) typeColors.set(type, palette[typeColors.size % palette.length]);
+            return typeColors.get(type);
+        }
+
+        function addNode(id, type, status) {
+            const existing = nodes.get(id);
+            if (existing) { existing.type = type; existing.status = status; return; }
+            // Start new nodes near a random existing one, so the layout only has to adjust locally
+            const near = nodes.size ? [...nodes.values()][Math.floor(Math.random() * nodes.size)] : {x: 0, y: 0};
+            nodes.set(id, {id, type, status, x: near.x + Math.random() * 40 - 20, y: near.y + Math.random() * 40 - 20, vx: 0, vy: 0});
+        }
+
+        // Apply a change, returning the change which undoes it (or null)
+        function apply(op) {
+            const [kind, ...args] = op;
+            const node = nodes.get(args[0]);
+            const key = args.join('|');
+            if (kind === 'n') {
+                addNode(args[0], args[1], args[2]);
+                return node ? ['n', node.id, node.type, node.status] : ['rn', args[0]];
+            } else if (kind === 'rn' && node) {
+                nodes.delete(args[0]);
+                return ['n', node.id, node.type, node.status];
+            } else if (kind === 'e' && !edges.has(key)) {
+                edges.set(key, {src: args[0], relation: args[1], dest: args[2]});
+                return ['re', ...args];
+            } else if (kind === 're' && edges.has(key)) {
+                edges.delete(key);
+                return ['e', ...args];
+            } else if (kind === 's' && node) {
+                const old = node.status;
+                node.status = args[1];
+                return ['s', args[0], old];
+            }
+            return null;
+        }
+
+        function layoutStep() {
+            const cell = 80;
+            const grid = new Map();
+            for (const node of nodes.values()) {
+                const key = Math.floor(node.x / cell) + ',' + Math.floor(node.y / cell);
+                if (!grid.has(key)) grid.set(key, []);
+                grid.get(key).push(node);
+            }
+            // Repulsion between nearby nodes only
+            for (const node of nodes.values()) {
+                const cx = Math.floor(node.x / cell), cy = Math.floor(node.y / cell);
+                for (let dx = -1; dx <= 1; dx++) for (let dy = -1; dy <= 1; dy++) {
+                    for (const other of grid.get((cx + dx) + ',' + (cy + dy)) || []) {
+                        if (other === node) continue;
+                        let ox = node.x - other.x, oy = node.y - other.y;
+                        const d2 = ox * ox + oy * oy + 0.01;
+                        node.vx += ox / d2 * 30; node.vy += oy / d2 * 30;
+                    }
+                }
+                // Gravity towards the center
+                node.vx -= node.x * 0.002; node.vy -= node.y * 0.002;
+            }
+            for (const edge of edges.values()) {
+                const a = nodes.get(edge.src), b = nodes.get(edge.dest);
+                if (!a || !b) continue;
+                const dx = b.x - a.x, dy = b.y - a.y;
+                const d = Math.sqrt(dx * dx + dy * dy) + 0.01;
+                const f = (d - 50) * 0.02;
+                a.vx += dx / d * f; a.vy += dy / d * f;
+                b.vx -= dx / d * f; b.vy -= dy / d * f;
+            }
+            for (const node of nodes.values()) {
+                node.x += Math.max(-20, Math.min(20, node.vx * heat));
+                node.y += Math.max(-20, Math.min(20, node.vy * heat));
+                node.vx *= 0.5; node.vy *= 0.5;
+            }
+            heat *= 0.99;
+        }
+
+        function toScreen(node) {
+            return [(node.x - view.x) * view.scale + canvas.width / 2, (node.y - view.y) * view.scale + canvas.height / 2];
+        }
+
+        function draw() {
+            if (heat > 0.02) layoutStep();
+            ctx.clearRect(0, 0, canvas.width, canvas.height);
+            ctx.strokeStyle = '#00000055';
+            ctx.beginPath();
+            for (const edge of edges.values()) {
+                const a = nodes.get(edge.src), b = nodes.get(edge.dest);
+                if (!a || !b) continue;
+                const [ax, ay] = toScreen(a), [bx, by] = toScreen(b);
+                ctx.moveTo(ax, ay); ctx.lineTo(bx, by);
+                // Arrowhead partway along, so direction is visible
+                const mx = ax + (bx - ax) * 0.7, my = ay + (by - ay) * 0.7, angle = Math.atan2(by - ay, bx - ax);
+                ctx.moveTo(mx, my); ctx.lineTo(mx - 6 * Math.cos(angle - 0.4), my - 6 * Math.sin(angle - 0.4));
+                ctx.moveTo(mx, my); ctx.lineTo(mx - 6 * Math.cos(angle + 0.4), my - 6 * Math.sin(angle + 0.4));
+            }
+            ctx.stroke();
+            const radius = Math.max(2, 6 * Math.sqrt(view.scale));
+            const labels = nodes.size < 200 || view.scale > 2;
+            ctx.font = '11px Arial';
+            for (const node of nodes.values()) {
+                const [x, y] = toScreen(node);
+                if (x < -10 || y < -10 || x > canvas.width + 10 || y > canvas.height + 10) continue;
+                ctx.beginPath();
+                ctx.arc(x, y, radius, 0, 2 * Math.PI);
+                ctx.fillStyle = colorFor(node.type);
+                ctx.strokeStyle = colorFor(node.type);
+                // Pending actions are drawn hollow
+                if (node.status === 'pending') { ctx.fillStyle = 'white'; ctx.lineWidth = 2; ctx.fill(); ctx.stroke(); ctx.lineWidth = 1; }
+                else ctx.fill();
+                if (labels) { ctx.fillStyle = '#333'; ctx.fillText(node.id, x + radius + 2, y + 4); }
+            }
+            const done = [...nodes.values()].filter(node => node.status === 'done').length;
+            const pending = [...nodes.values()].filter(node => node.status === 'pending').length;
+            statusText.textContent = statusLabel() +
+                ` | ${nodes.size} nodes, ${edges.size} edges | actions: ${done} done, ${pending} pending`;
+            requestAnimationFrame(draw);
+        }
+
+        function resize() { canvas.width = window.innerWidth; canvas.height = window.innerHeight; }
+        window.addEventListener('resize', resize);
+        resize();
+
+        canvas.addEventListener('wheel', event => {
+            event.preventDefault();
+            view.scale *= event.deltaY < 0 ? 1.1 : 1 / 1.1;
+        });
+        let drag = null;
+        canvas.addEventListener('mousedown', event => { drag = {x: event.clientX, y: event.clientY}; });
+        window.addEventListener('mouseup', () => { drag = null; });
+        canvas.addEventListener('mousemove', event => {
+            if (drag) {
+                view.x -= (event.clientX - drag.x) / view.scale;
+                view.y -= (event.clientY - drag.y) / view.scale;
+                drag = {x: event.clientX, y: event.clientY};
+            }
+            let closest = null, best = 100;
+            for (const node of nodes.values()) {
+                const [x, y] = toScreen(node);
+                const d = (x - event.clientX) ** 2 + (y - event.clientY) ** 2;
+                if (d < best) { best = d; closest = node; }
+            }
+            tooltip.style.display = closest ? 'block' : 'none';
+            if (closest) {
+                tooltip.textContent = `${closest.id} (${closest.type}${closest.status ? ', ' + closest.status : ''})`;
+                tooltip.style.left = (event.clientX + 12) + 'px';
+                tooltip.style.top = (event.clientY + 12) + 'px';
+            }
+        });
+
+'''
+
+LIVE_VIEWER_TEMPLATE = _GRAPH_PAGE_HEAD.replace("{{title}}", "Langur Live Graph") + '''    <script>''' + _GRAPH_SCRIPT + '''
+        let connected = false;
+        function statusLabel() { return connected ? 'Live' : 'Disconnected, retrying...'; }
+
+        const source = new EventSource('/events');
+        source.onopen = () => { connected = true; };
+        source.onerror = () => { connected = false; };
+        source.addEventListener('snapshot', message => {
+            const data = JSON.parse(message.data);
+            const old = nodes;
+            nodes = new Map();
+            edges = new Map();
+            for (const [id, type, status] of data.nodes) {
+                addNode(id, type, status);
+                // Keep positions of nodes already laid out
+                if (old.has(id)) { nodes.get(id).x = old.get(id).x; nodes.get(id).y = old.get(id).y; }
+            }
+            for (const edge of data.edges) apply(['e', ...edge]);
+            heat = 1;
+        });
+        source.addEventListener('diff', message => {
+            for (const op of JSON.parse(message.data).ops) apply(op);
+            heat = Math.max(heat, 0.3);
+        });
+
+        requestAnimationFrame(draw);
+    </script>
+</body>
+</html>
+'''
+
+
+class GraphMirror:
+    '''
+    Compact copy of a cognition graph for viewers: node ids with their type and status ("pending" or "done" for
+    actions), and edges. Graph events are turned into compact changes, which the viewer pages apply the same way:
+        ["n", id, type, status], ["rn", id], ["e", src, relation, dest], ["re", src, relation, dest], ["s", id, status]
+    '''
+    def __init__(self, cg: 'CognitionGraph'):
+        # id -> [type, status], and (src, relation, dest) edges
+        self.nodes: dict[str, list] = {}
+        self.edges: set[tuple[str, str, str]] = set()
+        for node in cg.storage.iter_nodes():
+            self.nodes[node.id] = [type(node).__name__, _node_status(node.to_json())]
+        for edge in cg.storage.iter_edges():
+            self.edges.add((edge.src_node.id, edge.relation, edge.dest_node.id))
+
+    def apply(self, event) -> list | None:
+        '''Apply a graph event, returning the change it makes (or None if it isn't shown)'''
+        from langur.graph.events import EdgeAdded, EdgeRemoved, NodeAdded, NodeRemoved, NodeUpdated
+
+        if isinstance(event, NodeAdded):
+            status = _node_status(event.data)
+            self.nodes[event.node_id] = [event.node_type, status]
+            return ["n", event.node_id, event.node_type, status]
+        if isinstance(event, NodeRemoved):
+            self.nodes.pop(event.node_id, None)
+            return ["rn", event.node_id]
+        if isinstance(event, EdgeAdded):
+            self.edges.add((event.src_node_id, event.relation, event.dest_node_id))
+            return ["e", event.src_node_id, event.relation, event.dest_node_id]
+        if isinstance(event, EdgeRemoved):
+            self.edges.discard((event.src_node_id, event.relation, event.dest_node_id))
+            return ["re", event.src_node_id, event.relation, event.dest_node_id]
+        if isinstance(event, NodeUpdated) and event.field == "output":
+            status = "pending" if event.value is None else "done"
+            if event.node_id in self.nodes:
+                self.nodes[event.node_id][1] = status
+            return ["s", event.node_id, status]
+        return None
+
+    def diff(self, other: 'GraphMirror') -> list[list]:
+        '''Changes which turn this mirror into other'''
+        changes = [["re", *edge] for edge in self.edges - other.edges]
+        changes += [["rn", node_id] for node_id in self.nodes.keys() - other.nodes.keys()]
+        changes += [
+            ["n", node_id, *value] for node_id, value in other.nodes.items() if self.nodes.get(node_id) != value
+        ]
+        changes += [["e", *edge] for edge in other.edges - self.edges]
+        return changes
+
+    def snapshot(self) -> dict:
+        return {
+            "nodes": [[node_id, node_type, status] for node_id, (node_type, status) in self.nodes.items()],
+            "edges": [list(edge) for edge in self.edges]
+        }
+
+
+class LiveViewer:
+    '''
+    Local server for watching a cognition graph change live in the browser, see serve_viewer.
+
+    The viewer keeps a compact mirror of the graph (node id, type and status, and edges), updated from graph events,
+    plus a log of recent changes. A browser gets a snapshot of the mirror, then batches of changes as they happen
+    (over server-sent events), so updates cost O(changes) rather than re-rendering the whole graph.
+    '''
+    def __init__(self, cg: 'CognitionGraph', host: str = "127.0.0.1", port: int = 8765, history: int = 10000, interval: float = 0.1):
+        '''
+        Args:
+            port: Port to serve on, 0 for any free port (see .url).
+            history: Changes kept for clients catching up, clients further behind get a new snapshot instead.
+            interval: Minimum seconds between updates sent to a client, so bursts of changes are sent together.
+        '''
+        self.cg = cg
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._closed = False
+        self._mirror = GraphMirror(cg)
+        # Recent changes, the last with sequence number self._seq
+        self._log: deque[list] = deque(maxlen=history)
+        self._seq = 0
+
+        cg.add_listener(self._on_mutation)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="langur-viewer", daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _on_mutation(self, op: str, data: dict):
+        from langur.graph.events import to_events
+
+        if op not in _VIEWER_OPS:
+            return
+        # Called from the agent's thread, while clients are served from others.
+        # A batch's changes are logged together, so clients get them together.
+        with self._cond:
+            for event in to_events(op, data):
+                change = self._mirror.apply(event)
+                if change is not None:
+                    self._log.append(change)
+                    self._seq += 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> tuple[int, dict]:
+        '''(sequence number, compact payload of the whole graph as of it)'''
+        with self._cond:
+            return self._seq, self._mirror.snapshot()
+
+    def changes_since(self, seq: int) -> tuple[int, list[list] | None]:
+        '''(sequence number, changes after seq), with None for the changes if seq is too old to catch up from'''
+        with self._cond:
+            behind = self._seq - seq
+            if behind > len(self._log):
+                return self._seq, None
+            return self._seq, list(islice(self._log, len(self._log) - behind, None))
+
+    def _wait(self, seq: int, timeout: float) -> bool:
+        '''Wait until there are changes after seq, returns whether there are'''
+        with self._cond:
+            return self._cond.wait_for(lambda: self._seq > seq or self._closed, timeout=timeout) and not self._closed
+
+    def _handler(self):
+        viewer = self
+
+        class ViewerHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/":
+                    body = LIVE_VIEWER_TEMPLATE.encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif path == "/events":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.end_headers()
+                    try:
+                        self.stream()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # Browser went away
+                        pass
+                else:
+                    self.send_error(404)
+
+            def send_event(self, name: str, data: dict):
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode())
+                self.wfile.flush()
+
+            def stream(self):
+                seq, payload = viewer.snapshot()
+                self.send_event("snapshot", payload)
+                while not viewer._closed:
+                    if not viewer._wait(seq, timeout=15):
+                        # Keep the connection alive through proxies
+                        self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                        continue
+                    # Let changes accumulate a little, so they're sent together
+                    time.sleep(viewer.interval)
+                    new_seq, ops = viewer.changes_since(seq)
+                    if ops is None:
+                        seq, payload = viewer.snapshot()
+                        self.send_event("snapshot", payload)
+                    else:
+                        seq = new_seq
+                        self.send_event("diff", {"ops": ops})
+
+            def log_message(self, format, *args):
+                pass
+
+        return ViewerHandler
+
+    def shutdown(self):
+        '''Stop serving and following the graph'''
+        self.cg.remove_listener(self._on_mutation)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# Mutations the viewer shows (batches may contain them)
+_VIEWER_OPS = {"add_node", "remove_node", "add_edge", "remove_edge", "update_node", "batch"}
+
+
+def _node_status(data: dict) -> str:
+    '''"pending" or "done" for actions (anything with an output field), otherwise ""'''
+    if "output" not in data:
+        return ""
+    return "pending" if data["output"] is None else "done"
+
+
+def serve_viewer(cg: 'CognitionGraph', port: int = 8765, host: str = "127.0.0.1", **kwargs) -> LiveViewer:
+    '''
+    Serve a live view of the graph at http://{host}:{port}/ from a background thread, updated as it changes.
+    Call .shutdown() on the returned viewer to stop it.
+    '''
+    return LiveViewer(cg, host=host, port=port, **kwargs)
+
+
+TIMELINE_TEMPLATE = _GRAPH_PAGE_HEAD.replace("{{title}}", "Langur Timeline") + '''    <div id="controls">
+        <button id="playBtn">Play</button>
+        <button id="prevBtn">Prev</button>
+        <input id="slider" type="range" min="0" max="0" value="0">
+        <button id="nextBtn">Next</button>
+    </div>
+    <style>
+        #controls { position: absolute; bottom: 10px; left: 10px; right: 10px; display: flex; gap: 10px; align-items: center; background: #ffffffdd; padding: 6px 10px; border-radius: 5px; }
+        #slider { flex: 1; }
+    </style>
+    <script>''' + _GRAPH_SCRIPT + '''
+        // Graph at the start of the recording, then [seconds, changes] per cycle, deflated and base64 encoded
+        const DATA = '{{data}}';
+        const slider = document.getElementById('slider');
+        let cycles = [];
+        // Cycles applied so far, and the changes undoing each of them
+        let position = 0;
+        const undos = [];
+        let playing = null;
+
+        function statusLabel() {
+            if (position === 0) return `Start (${cycles.length} cycles)`;
+            return `Cycle ${position} of ${cycles.length}, ${cycles[position - 1][0].toFixed(1)}s`;
+        }
+
+        function seek(target) {
+            target = Math.max(0, Math.min(cycles.length, target));
+            while (position < target) {
+                const undo = [];
+                for (const op of cycles[position][1]) {
+                    const inverse = apply(op);
+                    if (inverse) undo.push(inverse);
+                }
+                undos[position++] = undo;
+            }
+            while (position > target) {
+                const undo = undos[--position];
+                for (let i = undo.length - 1; i >= 0; i--) apply(undo[i]);
+            }
+            slider.value = position;
+            heat = Math.max(heat, 0.3);
+        }
+
+        function stop() { clearInterval(playing); playing = null; document.getElementById('playBtn').textContent = 'Play'; }
+
+        slider.addEventListener('input', () => seek(Number(slider.value)));
+        document.getElementById('prevBtn').addEventListener('click', () => seek(position - 1));
+        document.getElementById('nextBtn').addEventListener('click', () => seek(position + 1));
+        document.getElementById('playBtn').addEventListener('click', () => {
+            if (playing) return stop();
+            if (position === cycles.length) seek(0);
+            document.getElementById('playBtn').textContent = 'Pause';
+            playing = setInterval(() => position < cycles.length ? seek(position + 1) : stop(), 500);
+        });
+        window.addEventListener('keydown', event => {
+            if (event.key === 'ArrowLeft') seek(position - 1);
+            else if (event.key === 'ArrowRight') seek(position + 1);
+        });
+
+        async function load() {
+            const bytes = Uint8Array.from(atob(DATA), c => c.charCodeAt(0));
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+            const data = JSON.parse(await new Response(stream).text());
+            for (const [id, type, status] of data.start.nodes) addNode(id, type, status);
+            for (const edge of data.start.edges) apply(['e', ...edge]);
+            cycles = data.cycles;
+            slider.max = cycles.length;
+            // Open on the final graph, so the layout settles with every node in place
+            seek(cycles.length);
+            heat = 1;
+            requestAnimationFrame(draw);
+        }
+        load();
+    </script>
+</body>
+</html>
+'''
+
+
+class TimelineRecorder:
+    '''
+    Records how a cognition graph changes each cycle of an agent's runs, to save as one self-contained HTML page
+    which can be scrubbed through cycle by cycle.
+
+    Only the graph as recording started and each cycle's changes are kept (compressed in the saved page), so the
+    page grows with the changes made, not with the number of cycles. Unlike generate_viewer, no HTML export of
+    the graph is made per cycle.
+
+    Usage:
+        recorder = TimelineRecorder()
+        agent.run(recorder=recorder)
+        recorder.save("timeline.html")
+    '''
+    def __init__(self):
+        self.cg: 'CognitionGraph' = None
+        self._mirror: GraphMirror | None = None
+        self._start: dict | None = None
+        self._started_at: float | None = None
+        # Changes in the current cycle, and (seconds since recording started, changes) for each finished cycle
+        self._changes: list[list] = []
+        self.cycles: list[tuple[float, list[list]]] = []
+
+    def start(self, cg: 'CognitionGraph'):
+        '''Follow changes to the graph, called by Agent.run'''
+        if self.cg is not None:
+            return
+        mirror = GraphMirror(cg)
+        if self._mirror is None:
+            self._start = mirror.snapshot()
+            self._started_at = time.perf_counter()
+        else:
+            # Changes made between runs are counted in the next cycle
+            self._changes.extend(self._mirror.diff(mirror))
+        self._mirror = mirror
+        self.cg = cg
+        cg.add_listener(self._on_mutation)
+
+    def _on_mutation(self, op: str, data: dict):
+        from langur.graph.events import to_events
+
+        if op not in _VIEWER_OPS:
+            return
+        for event in to_events(op, data):
+            change = self._mirror.apply(event)
+            if change is not None:
+                self._changes.append(change)
+
+    def end_cycle(self):
+        '''Finish recording a cycle, called by Agent.run'''
+        self.cycles.append((round(time.perf_counter() - self._started_at, 3), self._changes))
+        self._changes = []
+
+    def stop(self):
+        '''Stop following the graph, until started again'''
+        if self.cg is None:
+            return
+        self.cg.remove_listener(self._on_mutation)
+        self.cg = None
+        # e.g. a cycle interrupted by an error
+        if self._changes:
+            self.end_cycle()
+
+    def to_json(self) -> dict:
+        return {"start": self._start, "cycles": [[seconds, changes] for seconds, changes in self.cycles]}
+
+    def save(self, path: str):
+        '''Write the timeline as a single HTML file'''
+        if self._start is None:
+            raise RuntimeError("Nothing recorded, pass the recorder to Agent.run first")
+        data = json.dumps(self.to_json(), separators=(",", ":")).encode()
+        html = TIMELINE_TEMPLATE.replace("{{data}}", base64.b64encode(zlib.compress(data, 9)).decode())
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
@@ -3,7 +3,6 @@ import asyncio
 from langur.graph.node import Node
 from langur.workers.task import TaskNode, TaskWorker
 from langur.workers.worker import STATE_DONE, STATE_SETUP, Worker
-import langur.baml_client as baml
 
 
 class Assumption(Node):
@@ -19,11 +18,16 @@ class AssumptionWorker(Worker):
 
     async def create_assumptions(self, task_node: TaskNode):
         #print("CREATING ASSUMPTION FOR:", task_node)
-        result = await baml.b.CreateAssumptions(
-            task=task_node.task,
-            # TODO: maybe create a util on CG for this common observable context pattern
-            observables="\n".join([node.observe() for node in self.cg.query_nodes_by_tag("observable")]),
-            baml_options={"client_registry": self.cg.get_client_registry()}
+        result = await self.cg.llm.call(
+            "CreateAssumptions",
+            {
+                "task": task_node.task,
+                # TODO: maybe create a util on CG for this common observable context pattern
+                "observables": "\n".join([node.observe() for node in self.cg.query_nodes_by_tag("observable")]),
+            },
+            worker=self,
+            node_id=task_node.id,
+            truncate="observables"
         )
         #print(result)
         for assumption in result:
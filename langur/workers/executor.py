@@ -1,47 +1,95 @@
 import asyncio
+import heapq
+import logging
+import time
+from typing import Optional
+from pydantic import Field
 from langur.actions import ActionContext, ActionNode
-from langur.baml_client.type_builder import TypeBuilder
+from langur.log import log_context
+from langur import metrics
+from langur.trace import span
 from langur.workers.worker import STATE_DONE, Worker
-import langur.baml_client as baml
+
+
+# Weight of each new timing in the moving average of an action type's latency
+LATENCY_SMOOTHING = 0.3
 
 
 class ExecutorWorker(Worker):
     state: str = "WAITING"
+    # Run at most this many actions at once, starting the ones on the longest remaining path first. None runs
+    # the whole frontier at once each cycle.
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+    # Expected seconds per action type (moving average of past executions), to find the longest remaining paths
+    latency_estimates: dict[str, float] = {}
+
+    def is_ready(self, node: ActionNode) -> bool:
+        '''Whether an action is unexecuted, with only executed upstream actions'''
+        if node.output is not None:
+            return False
+        for upstream_node in node.upstream_nodes():
+            if "action" in upstream_node.get_tags() and upstream_node.output is None:
+                return False
+        return True
 
     def get_frontier(self) -> set[ActionNode]:
         '''
         Get the "frontier", i.e. unexecuted action nodes with only executed depedencies.
         '''
-        action_nodes = self.cg.query_nodes_by_type(ActionNode)
-
-        #print("action nodes:", action_nodes)
-
-        # Naive linear impl
-        frontier = set()
-        for node in action_nodes:
-            valid = True
-            if node.output is not None:
-                # Already executed
-                #print("already executed:", node)
-                valid = False
-            else:
-                for upstream_node in node.upstream_nodes():
-                    if "action" in upstream_node.get_tags() and upstream_node.output is None:
-                        #print(f"un-executed upstream: {node.id}<-{upstream_node.id}")
-                        # Upstream un-executed action
-                        valid = False
-                        break
-            if valid:
-                frontier.add(node)
+        with span("get_frontier", worker_id=self.id) as span_args:
+            action_nodes = self.cg.query_pending_nodes_by_type(ActionNode)
+
+            #print("action nodes:", action_nodes)
+
+            # Naive linear impl
+            frontier = {node for node in action_nodes if self.is_ready(node)}
+            span_args["size"] = len(frontier)
+            metrics.READY_ACTIONS.set(len(frontier))
 
         return frontier
 
+    def expected_latency(self, action_type: str) -> float:
+        '''Expected seconds for an action of this type, the average over known types if it hasn't run yet'''
+        if action_type in self.latency_estimates:
+            return self.latency_estimates[action_type]
+        if self.latency_estimates:
+            return sum(self.latency_estimates.values()) / len(self.latency_estimates)
+        return 1.0
+
+    def record_latency(self, action_type: str, seconds: float):
+        previous = self.latency_estimates.get(action_type)
+        estimate = seconds if previous is None else previous + LATENCY_SMOOTHING * (seconds - previous)
+        # Reassigned rather than updated in place so it's journaled like other fields
+        self.latency_estimates = {**self.latency_estimates, action_type: estimate}
+
+    def get_priorities(self, nodes: set[ActionNode]) -> dict[str, float]:
+        '''
+        Priority of each of the given actions and those downstream of them: the expected seconds from starting it until
+        its task can be done, i.e. the longest path through downstream actions weighted by their expected latencies.
+        '''
+        priorities = {}
+        # Iterative post-order, since plans can be deeper than the recursion limit
+        stack = [(node, False) for node in nodes]
+        while stack:
+            node, expanded = stack.pop()
+            if node.id in priorities:
+                continue
+            downstream = [n for n in node.downstream_nodes() if "action" in n.get_tags()]
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((n, False) for n in downstream if n.id not in priorities)
+                continue
+            longest = max((priorities.get(n.id, 0.0) for n in downstream), default=0.0)
+            priorities[node.id] = self.expected_latency(node.action_type_name()) + longest
+        return priorities
+
     async def fill_params(self, action_node: ActionNode, context: str):
         empty_params = [k for k, v in action_node.inputs.items() if v is None]
 
         if len(empty_params) == 0:
             return
 
+        from langur.baml_client.type_builder import TypeBuilder
         tb = TypeBuilder()
         
         # for now all params assumed to be strings
@@ -49,20 +97,23 @@ class ExecutorWorker(Worker):
         for param_name in empty_params:
             tb.FilledParams.add_property(param_name, action_node.input_schema[param_name])
 
-        params = await baml.b.FillParams(
-            context=context,
-            action_desc=action_node.purpose,
-            # TODO: actually use jinja features instead of this sillyness
-            filled_inputs="\n".join([f"{k}={v}" for k, v in action_node.inputs.items() if v is not None]),
-            needed_inputs="\n".join([f"{k}" for k, v in action_node.inputs.items() if v is None]),
-            baml_options={
-                "tb": tb,
-                "client_registry": self.cg.get_client_registry()
-            }
+        params = await self.cg.llm.call(
+            "FillParams",
+            {
+                "context": context,
+                "action_desc": action_node.purpose,
+                # TODO: actually use jinja features instead of this sillyness
+                "filled_inputs": "\n".join([f"{k}={v}" for k, v in action_node.inputs.items() if v is not None]),
+                "needed_inputs": "\n".join([f"{k}" for k, v in action_node.inputs.items() if v is None]),
+            },
+            tb=tb,
+            dynamic_types={param_name: action_node.input_json_schema.get(param_name) for param_name in empty_params},
+            worker=self,
+            node_id=action_node.id,
+            truncate="context"
         )
-        # Fill in node's params
-        for k, v in params.model_dump().items():
-            action_node.inputs[k] = v
+        # Fill in node's params (reassigned rather than updated in place so graph listeners see the change)
+        action_node.inputs = {**action_node.inputs, **params.model_dump()}
 
     def build_context_rec(self, action_node: ActionNode) -> list[str]:
         # Procedure: Get all upstream completed actions, append all outputs together
@@ -72,7 +123,7 @@ class ExecutorWorker(Worker):
             if node.output is None:
                 # Shouldn't happen, but if it somehow did would want to catch it
                 raise RuntimeError(f"Encountered incomplete action while building context: {node}")
-            context.append(node.output)
+            context.append(self.cg.resolve_output(node.output))
         for node in upstream:
             #context.extend()
             context = [*self.build_context_rec(node), *context]
@@ -107,26 +158,41 @@ class ExecutorWorker(Worker):
             cg=self.cg,
             conn=self.cg.query_worker_by_id(action_node.connector_id),
             ctx="",
-            purpose=action_node.purpose
+            purpose=action_node.purpose,
+            node=action_node
         )
 
-        # Build context
-        self.build_context(action_node, action_ctx)
-
-        #print("PREFILL:", action_node.inputs)
-
-        # If missing params, need to dynamically fill
-        await self.fill_params(action_node, action_ctx.ctx)
-
-        #print("POSTFILL:", action_node.inputs)
-
-        #print("Context:", context)
-        #print("ok executing FR:", action_ctx)
-        output = await action_node.execute(
-            action_ctx
-        )
-        # Make sure not to put in None, else it will count as un-executed and run infinitely
-        action_node.output = str(output) if output else ""
+        action_type = action_node.action_type_name()
+        start = time.perf_counter()
+        status = "error"
+        with span("execute_node", worker_id=self.id, node_id=action_node.id, action_type=action_type), log_context(node_id=action_node.id):
+            self.log(f"Executing {action_type} action", level=logging.DEBUG)
+            try:
+                # Build context
+                with span("build_context", node_id=action_node.id):
+                    self.build_context(action_node, action_ctx)
+
+                #print("PREFILL:", action_node.inputs)
+
+                # If missing params, need to dynamically fill
+                await self.fill_params(action_node, action_ctx.ctx)
+
+                #print("POSTFILL:", action_node.inputs)
+
+                #print("Context:", context)
+                #print("ok executing FR:", action_ctx)
+                with span(action_type, cat="action", node_id=action_node.id):
+                    output = await action_node.execute(
+                        action_ctx
+                    )
+                status = "ok"
+            finally:
+                duration = time.perf_counter() - start
+                metrics.ACTIONS_EXECUTED.labels(action_type, status).inc()
+                metrics.ACTION_DURATION.labels(action_type).observe(duration)
+            self.record_latency(action_type, duration)
+            # Make sure not to put in None, else it will count as un-executed and run infinitely
+            action_node.output = self.cg.store_output(str(output)) if output else ""
         return output
 
     async def execute_frontier(self):
@@ -134,12 +200,15 @@ class ExecutorWorker(Worker):
         frontier = self.get_frontier()
 
         # Status update
-        all_action_nodes = self.cg.query_nodes_by_type(ActionNode)
-        completed_action_nodes = list(filter(lambda n: n.output is not None, all_action_nodes))
-        self.log(f"{len(completed_action_nodes)}/{len(all_action_nodes)} actions executed")
+        action_count = self.cg.count_nodes_by_type(ActionNode)
+        pending_count = len(self.cg.query_pending_nodes_by_type(ActionNode))
+        self.log(f"{action_count - pending_count}/{action_count} actions executed")
 
         #print("Frontier:", frontier)
-        await asyncio.gather(*[self.execute_node(node) for node in frontier])
+        if self.max_concurrency is None:
+            await asyncio.gather(*[self.execute_node(node) for node in frontier])
+        else:
+            await self.execute_prioritized(frontier)
 
         is_done = len(self.get_frontier()) == 0
         #print("is done?", )
@@ -147,6 +216,35 @@ class ExecutorWorker(Worker):
             self.log("Done executing actions")
             self.state = STATE_DONE
     
+    async def execute_prioritized(self, frontier: set[ActionNode]):
+        '''
+        Keep up to max_concurrency actions running, starting the ready action with the highest priority (see get_priorities)
+        whenever one finishes, until no more are ready. Unlike the unlimited frontier, actions becoming ready are started
+        within the cycle, so a slot doesn't wait on the rest of the cycle's actions.
+        '''
+        priorities = self.get_priorities(frontier)
+        # Ties broken by id so the order is deterministic
+        ready = [(-priorities[node.id], node.id, node) for node in frontier]
+        heapq.heapify(ready)
+        queued = {node.id for node in frontier}
+        running: dict[asyncio.Task, ActionNode] = {}
+        try:
+            while ready or running:
+                while ready and len(running) < self.max_concurrency:
+                    _, _, node = heapq.heappop(ready)
+                    running[asyncio.ensure_future(self.execute_node(node))] = node
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = running.pop(task)
+                    task.result()
+                    for downstream_node in node.downstream_nodes():
+                        if "action" in downstream_node.get_tags() and downstream_node.id not in queued and self.is_ready(downstream_node):
+                            queued.add(downstream_node.id)
+                            heapq.heappush(ready, (-priorities[downstream_node.id], downstream_node.id, downstream_node))
+        finally:
+            for task in running:
+                task.cancel()
+
     async def cycle(self):
         # TODO super hacky, only works with exactly one executor and planner
         #if self.state == "WAITING" and len(self.cg.get_workers_with_state("WAITING")) == 1:
@@ -1,9 +1,8 @@
 from langur.actions import ActionNode
-from langur.baml_client.types import ActionNode as BAMLActionNode
-from langur.baml_client.type_builder import TypeBuilder
+from langur.graph.optimize import PlanReport, optimize_plan
 from langur.signals import Signal
+from langur import metrics
 from langur.workers.worker import STATE_DONE, STATE_SETUP, Worker
-import langur.baml_client as baml
 from langur.util.registries import action_node_type_registry
 
 from typing import TYPE_CHECKING, Type
@@ -11,10 +10,13 @@ from typing import TYPE_CHECKING, Type
 from langur.connector import Connector
 
 if TYPE_CHECKING:
+    from langur.baml_client.types import ActionNode as BAMLActionNode
     from .task import TaskNode
 
 class PlannerWorker(Worker):
     task_node_id: str
+    # Merge duplicate idempotent actions and drop redundant dependencies before adding plans (see langur.graph.optimize)
+    optimize: bool = True
 
     state: str = "WAITING"
 
@@ -31,7 +33,7 @@ class PlannerWorker(Worker):
             # TODO: redesign events/signals
             return Signal.PLAN_DONE
 
-    def derive_connector(self, node_data: BAMLActionNode) -> Connector:
+    def derive_connector(self, node_data: 'BAMLActionNode') -> Connector:
         '''
         Derive the connector that is associated with the given generated action node.
         TODO: Will eventually need a method for differentiating connectors which have the sames types of actions available
@@ -57,7 +59,7 @@ class PlannerWorker(Worker):
                 #action_node_types[action_node_type.action_type_name()] = action_node_type
         return connector
 
-    async def plan_task(self):
+    async def plan_task(self) -> PlanReport | None:
         #action_def_nodes: list[ActionDefinitionNode] = self.cg.query_nodes_by_tag("action_definition")
         connector_workers = self.cg.query_workers(Connector)
         action_node_types: dict[str, Type[ActionNode]] = {}
@@ -66,6 +68,7 @@ class PlannerWorker(Worker):
                 action_node_types[action_node_type.action_type_name()] = action_node_type
             #action_node_types.extend(worker.get_action_node_types())
     
+        from langur.baml_client.type_builder import TypeBuilder
         tb = TypeBuilder()
         action_input_schemas = []#TODO
         # Dynamically build action input types
@@ -91,14 +94,18 @@ class PlannerWorker(Worker):
         tb.ActionNode.add_property("action_input", tb.union(action_input_schemas)).description("Provide inputs if known else null. Do not hallicinate values.")
 
         task_node: 'TaskNode' = self.cg.query_node_by_id(self.task_node_id)
-        resp = await baml.b.PlanActions(
-            goal=task_node.task,
-            observables="\n".join([node.observe() for node in self.cg.query_nodes_by_tag("observable")]),
-            action_types="\n".join([f"- {action_type_name}: {action_node_type.definition}" for action_type_name, action_node_type in action_node_types.items()]),
-            baml_options={
-                "tb": tb,
-                "client_registry": self.cg.get_client_registry()
-            }
+        resp = await self.cg.llm.call(
+            "PlanActions",
+            {
+                "goal": task_node.task,
+                "observables": "\n".join([node.observe() for node in self.cg.query_nodes_by_tag("observable")]),
+                "action_types": "\n".join([f"- {action_type_name}: {action_node_type.definition}" for action_type_name, action_node_type in action_node_types.items()]),
+            },
+            tb=tb,
+            dynamic_types={name: node_type.input_json_schema for name, node_type in action_node_types.items()},
+            worker=self,
+            node_id=self.task_node_id,
+            truncate="observables"
         )
         
 
@@ -113,37 +120,53 @@ class PlannerWorker(Worker):
             action_input_without_type = node_data.action_input.copy()
             del action_input_without_type["type"]
 
-            node = action_node_type(
+            nodes.append(action_node_type(
                 id=node_data.id,
                 inputs=action_input_without_type,
                 purpose=node_data.description,
                 connector_id=self.derive_connector(node_data).id
+            ))
+        edges = [(edge_data.from_id, edge_data.to_id) for edge_data in resp.edges]
+
+        report = None
+        if self.optimize:
+            nodes, edges, report = optimize_plan(nodes, edges)
+            self.log(
+                f"Optimized plan: {report.nodes_removed} duplicate actions merged, {report.redundant_edges} redundant dependencies removed, "
+                f"critical path {report.critical_path_before} -> {report.critical_path_after} actions"
             )
-            nodes.append(node)
-            self.cg.add_node(
-                node
-            )
-            # self.cg.add_edge_by_ids(
-            #     src_id=node_data.action_input["type"],
-            #     dest_id=node.id,
-            #     relation="defines"
-            # )
-        
-        for edge_data in resp.edges:
-            self.cg.add_edge_by_ids(
-                src_id=edge_data.from_id,
-                dest_id=edge_data.to_id,
-                relation="dependency"
-            )
-        
-        # Connect leaves to task
-        for node in nodes:
-            if len(node.outgoing_edges()) == 0:
+            metrics.PLAN_ACTIONS_MERGED.inc(report.nodes_removed)
+            metrics.PLAN_EDGES_REMOVED.inc(report.redundant_edges)
+
+        # Added all at once, so a bad plan (e.g. an edge to a node that doesn't exist) leaves no partial plan behind
+        with self.cg.batch():
+            for node in nodes:
+                self.cg.add_node(node)
+                # self.cg.add_edge_by_ids(
+                #     src_id=node_data.action_input["type"],
+                #     dest_id=node.id,
+                #     relation="defines"
+                # )
+
+            for src_id, dest_id in edges:
                 self.cg.add_edge_by_ids(
-                    src_id=node.id,
-                    dest_id=self.task_node_id,
-                    relation="achieves"
+                    src_id=src_id,
+                    dest_id=dest_id,
+                    relation="dependency"
                 )
+        
+            # Connect leaves to task
+            for node in nodes:
+                if len(node.outgoing_edges()) == 0:
+                    self.cg.add_edge_by_ids(
+                        src_id=node.id,
+                        dest_id=self.task_node_id,
+                        relation="achieves"
+                    )
+
+        metrics.PLANS_CREATED.inc()
+        metrics.PLANNED_ACTIONS.inc(len(nodes))
+        return report
 
     
 
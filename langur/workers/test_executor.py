@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from pydantic import ValidationError
+
+from langur import Connector, action
+from langur.agent import Agent
+from langur.behavior import Execute
+from langur.workers.executor import ExecutorWorker
+
+started = []
+running = []
+
+class Sleeper(Connector):
+    @action
+    async def wait(self, name: str):
+        '''Wait a little'''
+        started.append(name)
+        running.append(name)
+        assert len(running) <= 2
+        await asyncio.sleep(0.01)
+        running.remove(name)
+        return name
+
+def test_critical_path_started_first():
+    """Test that with limited concurrency, actions on the longest remaining path are started first"""
+    started.clear()
+    running.clear()
+    sleeper = Sleeper()
+    executor = ExecutorWorker(max_concurrency=2)
+    agent = Agent(workers=[sleeper, executor])
+    action_type = next(iter(sleeper.get_action_node_types()))
+    for name in ["chain1", "chain2", "chain3", "a", "b", "c", "d"]:
+        agent.cg.add_node(action_type(id=name, inputs={"name": name}, purpose="Wait", connector_id=sleeper.id))
+    agent.cg.add_edge_by_ids("chain1", "dependency", "chain2")
+    agent.cg.add_edge_by_ids("chain2", "dependency", "chain3")
+
+    asyncio.run(agent.run(until=None))
+
+    # The chain is never left waiting, so its actions start in the first three of four rounds
+    assert started[0] == "chain1"
+    assert started.index("chain3") < 6
+    assert sorted(started) == sorted(["chain1", "chain2", "chain3", "a", "b", "c", "d"])
+    assert 0 < executor.latency_estimates["wait"] < 1
+
+def test_max_concurrency_validated():
+    """Test that a concurrency limit below 1 is rejected"""
+    with pytest.raises(ValidationError):
+        ExecutorWorker(max_concurrency=0)
+    with pytest.raises(ValueError):
+        Execute(max_concurrency=-1)
@@ -1,8 +1,10 @@
 from abc import ABC
+import logging
 
-from cuid2 import Cuid
 from pydantic import BaseModel, ConfigDict, Field
 
+from langur.log import get_logger
+
 from typing import TYPE_CHECKING, ClassVar, Dict, Type
 
 if TYPE_CHECKING:
@@ -14,7 +16,15 @@ STATE_SETUP = "SETUP"
 # end state for most workers
 STATE_DONE = "DONE"
 
-CUID = Cuid(length=10)
+_cuid = None
+
+def generate_id() -> str:
+    # cuid2 is imported on first use to keep `import langur` fast
+    global _cuid
+    if _cuid is None:
+        from cuid2 import Cuid
+        _cuid = Cuid(length=10)
+    return _cuid.generate()
 
 class Worker(BaseModel, ABC):
     '''
@@ -24,7 +34,7 @@ class Worker(BaseModel, ABC):
     '''
     
     
-    id: str = Field(default_factory=CUID.generate)
+    id: str = Field(default_factory=generate_id)
     # Workers are often state machines, this state is serialized and retained
     state: str = Field(default=STATE_SETUP)
 
@@ -52,6 +62,13 @@ class Worker(BaseModel, ABC):
     def __hash__(self):
         return hash((self.__class__.__name__, id(self)))
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # Report state (and other field) changes to the graph's listeners
+        cg = getattr(self, "_cognition_graph", None)
+        if cg is not None and cg._listeners and name in self.model_fields:
+            cg._emit("update_worker", id=self.id, field=name, value=self.model_dump(mode="json", include={name})[name])
+
     async def cycle(self) -> str | None:
         '''
         Do one cycle with this worker; the implementation will vary widely depending on the worker's purpose.
@@ -82,6 +99,16 @@ class Worker(BaseModel, ABC):
         del data_no_worker_type["worker_type"]
         return worker_class.model_validate(data_no_worker_type)
 
-    def log(self, *args, **kwargs):
-        print(f"[{self.__class__.__name__}::{self.id}] ", end="")
-        print(*args, **kwargs)
\ No newline at end of file
+    def log(self, *args, level: int = logging.INFO, **fields):
+        '''
+        Log a message tagged with this worker (and the current cycle / node), see langur.log.
+        Extra keyword fields are attached to the record.
+        '''
+        logger = get_logger()
+        if not logger.isEnabledFor(level):
+            return
+        logger.log(
+            level,
+            " ".join(str(arg) for arg in args),
+            extra={"worker_type": self.__class__.__name__, "worker_id": self.id, **fields}
+        )
\ No newline at end of file